@@ -1,6 +1,9 @@
 import json
 from django.db import transaction, IntegrityError
 from rest_framework import serializers
+from core.assets import store_upload
+from core.projections import Nested, Projection
+from core.serializers import UploadIdField, safe_image_url
 from .models import Post, Image, Link
 
 
@@ -13,54 +16,48 @@ class ImageSerializer(serializers.ModelSerializer):
         read_only_fields = ('post',)
 
     def get_image(self, obj):
-        """Return a Cloudinary URL only if it looks safe. Avoid returning malformed public IDs that would
-        generate invalid Cloudinary URLs (e.g. containing spaces or apostrophes)."""
-        try:
-            if not obj.image:
-                return None
-            url = obj.image.url
-            # if url contains encoded spaces or apostrophes, consider it invalid/unsafe
-            if not url:
-                return None
-            if '%20' in url or '%27' in url or ' ' in url:
-                return None
-            return url
-        except Exception:
-            return None
+        return safe_image_url(obj.image)
 
     def delete(self, instance):
-        # Delete the image from Cloudinary using the public_id
-        try:
-            public_id = None
-            # CloudinaryField yields a CloudinaryResource with public_id attribute
-            if hasattr(instance.image, 'public_id') and instance.image.public_id:
-                public_id = instance.image.public_id
-            # fall back: if image is a string URL, try to extract public_id from it (best-effort)
-            if not public_id and isinstance(instance.image, str) and instance.image:
-                # URL may contain /upload/<version>/<public_id>.<ext> - attempt simple extraction
-                try:
-                    parts = instance.image.split('/upload/')
-                    if len(parts) > 1:
-                        tail = parts[1]
-                        # strip any transformations and extension
-                        tail = tail.split('/')[-1]
-                        public_id = tail.split('.')[0]
-                except Exception:
-                    public_id = None
-            if public_id:
-                try:
-                    import cloudinary.uploader
-                    cloudinary.uploader.destroy(public_id, invalidate=True)
-                except Exception:
-                    # ignore errors from Cloudinary delete
-                    pass
-        finally:
-            # Delete the database record regardless
-            instance.delete()
+        # The remote asset is queued for deletion by core.signals on post_delete
+        # and destroyed in batches by `manage.py process_asset_deletions`.
+        instance.delete()
         return instance
 
 
 
+class ImageUploadSerializer(serializers.Serializer):
+    """Payload for `add_images`: image files and/or ids of finalized resumable uploads,
+    plus an optional JSON list of captions (files first, then uploads)."""
+    images = serializers.ListField(
+        child=serializers.ImageField(allow_empty_file=False, use_url=False),
+        required=False
+    )
+    upload_ids = serializers.ListField(child=UploadIdField(kind='image'), required=False)
+    images_meta = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('images') and not attrs.get('upload_ids'):
+            raise serializers.ValidationError("Provide images or upload_ids.")
+        return attrs
+
+    def validate_images_meta(self, value):
+        try:
+            meta = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            raise serializers.ValidationError("images_meta must be a JSON array of objects")
+        if not isinstance(meta, list):
+            raise serializers.ValidationError("images_meta must be a JSON array of objects")
+        return meta
+
+    def captions(self):
+        meta = self.validated_data.get('images_meta') or []
+        count = len(self.validated_data.get('images', [])) + len(self.validated_data.get('upload_ids', []))
+        for i in range(count):
+            item = meta[i] if i < len(meta) and isinstance(meta[i], dict) else {}
+            yield item.get('caption') or ''
+
+
 class LinkSerializer(serializers.ModelSerializer):
     class Meta:
         model = Link
@@ -133,7 +130,7 @@ class PostSerializer(serializers.ModelSerializer):
                 caption = ''
                 if i < len(images_meta) and isinstance(images_meta[i], dict) and 'caption' in images_meta[i]:
                     caption = images_meta[i]['caption']
-                Image.objects.create(post=instance, image=image_file, caption=caption)
+                Image.objects.create(post=instance, image=store_upload(image_file), caption=caption)
 
         # Handle links if provided
         if links_data is not None:
@@ -196,7 +193,7 @@ class PostSerializer(serializers.ModelSerializer):
                 caption = ''
                 if i < len(images_meta) and 'caption' in images_meta[i]:
                     caption = images_meta[i]['caption']
-                Image.objects.create(post=post, image=image_file, caption=caption)
+                Image.objects.create(post=post, image=store_upload(image_file), caption=caption)
 
             # Handle links
             for link_data in links_data:
@@ -223,3 +220,17 @@ class PostSerializer(serializers.ModelSerializer):
 
             return post
         return instance
+
+
+# PostSerializer's output built from values_list() rows, for the list endpoint (see core/projections.py)
+POST_LIST = Projection([
+    ('id', 'id'),
+    ('title', 'title'),
+    ('slug', 'slug'),
+    ('content', 'content'),
+    ('created_at', ('created_at', serializers.DateTimeField().to_representation)),
+    ('images', Nested(Image.objects.all(), 'post', [
+        ('id', 'id'), ('image', ('image', safe_image_url)), ('caption', 'caption'), ('post', 'post'),
+    ])),
+    ('links', Nested(Link.objects.all(), 'post', [('id', 'id'), ('url', 'url'), ('text', 'text'), ('order', 'order')])),
+])
@@ -7,7 +7,10 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
 
-from .models import Post, Image
+from rest_framework.renderers import JSONRenderer
+
+from .models import Link, Post, Image
+from .serializers import POST_LIST, PostSerializer
 
 User = get_user_model()
 
@@ -116,3 +119,12 @@ class BlogPostViewSetTests(APITestCase):
         self.post1.refresh_from_db()
         self.assertEqual(self.post1.title, 'Updated Title')
 
+    def test_list_projection_matches_serializer(self):
+        Image.objects.create(post=self.post1, image='image/upload/v1/blog/b.jpg', caption='Légende')
+        Image.objects.create(post=self.post1, image='image/upload/v1/blog/a b.jpg')
+        Link.objects.create(post=self.post1, url='https://example.com/2', text='B', order=2)
+        Link.objects.create(post=self.post1, url='https://example.com/1', text='A', order=1)
+        queryset = Post.objects.all()
+        expected = JSONRenderer().render(PostSerializer(queryset, many=True).data)
+        self.assertEqual(JSONRenderer().render(POST_LIST.serialize(POST_LIST.rows(queryset))), expected)
+        self.assertEqual(self.client.get(reverse('post-list')).content, expected)
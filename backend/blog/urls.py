@@ -1,8 +1,10 @@
 from rest_framework.routers import DefaultRouter
 
-from .views import BlogPostViewSet
+from core.async_reads import async_public_reads
+
+from .views import BlogPostViewSet, read_post, read_posts
 
 router = DefaultRouter()
 router.register(r'posts', BlogPostViewSet, basename='post')
 
-urlpatterns = router.urls
+urlpatterns = async_public_reads(router.urls, {'post-list': read_posts, 'post-detail': read_post})
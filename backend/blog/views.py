@@ -4,13 +4,18 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 
 from .models import Post, Image, Link
-from .serializers import PostSerializer, ImageSerializer, LinkSerializer
+from .serializers import POST_LIST, PostSerializer, ImageSerializer, ImageUploadSerializer, LinkSerializer
+from core.uploads import create_with_uploads
 from core.permissions import IsSuperUser
+from core.async_reads import async_reader, fetch_object
+from core.idempotency import idempotent
+from core.projections import ProjectionListMixin
 
 
-class BlogPostViewSet(viewsets.ModelViewSet):
+class BlogPostViewSet(ProjectionListMixin, viewsets.ModelViewSet):
     queryset = Post.objects.prefetch_related("images", "links").all()
     serializer_class = PostSerializer
+    list_projection = POST_LIST
     lookup_field = 'slug'
 
     def get_permissions(self):
@@ -18,6 +23,10 @@ class BlogPostViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return [IsSuperUser()]
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     @action(detail=False, methods=["delete"], permission_classes=[IsSuperUser])
     def delete_all(self, request):
         count, _ = Post.objects.all().delete()
@@ -28,8 +37,25 @@ class BlogPostViewSet(viewsets.ModelViewSet):
 
     # Image management endpoints
     @action(detail=True, methods=['post'], permission_classes=[IsSuperUser])
+    @idempotent
     def add_images(self, request, slug=None):
         post = self.get_object()
+        if request.FILES or (isinstance(request.data, dict) and 'upload_ids' in request.data):
+            # multipart upload (images=<file>&images=<file>) and/or resumable upload ids,
+            # with optional images_meta=[{"caption": ...}]
+            upload = ImageUploadSerializer(data=request.data)
+            upload.is_valid(raise_exception=True)
+            images = create_with_uploads(
+                upload.validated_data.get('images', []), upload.validated_data.get('upload_ids', []),
+                lambda values: [
+                    Image.objects.create(post=post, image=value, caption=caption)
+                    for value, caption in zip(values, upload.captions())
+                ],
+            )
+            return Response(
+                ImageSerializer(images, many=True).data,
+                status=status.HTTP_201_CREATED
+            )
         serializer = ImageSerializer(data=request.data, many=True)
         if serializer.is_valid():
             images = []
@@ -77,6 +103,7 @@ class BlogPostViewSet(viewsets.ModelViewSet):
 
     # Link management endpoints
     @action(detail=True, methods=['post'], permission_classes=[IsSuperUser])
+    @idempotent
     def add_links(self, request, slug=None):
         post = self.get_object()
         serializer = LinkSerializer(data=request.data, many=True)
@@ -115,3 +142,19 @@ class BlogPostViewSet(viewsets.ModelViewSet):
         links = post.links.all().order_by('order')
         serializer = LinkSerializer(links, many=True)
         return Response(serializer.data)
+
+
+# Async readers for ASGI (see core/async_reads.py)
+def public_posts():
+    return Post.objects.prefetch_related("images", "links")
+
+
+@async_reader()
+async def read_posts(request):
+    return await POST_LIST.aserialize(POST_LIST.rows(Post.objects.all()))
+
+
+@async_reader()
+async def read_post(request, slug):
+    post = await fetch_object(public_posts(), slug=slug)
+    return PostSerializer(post, context={'request': request}).data
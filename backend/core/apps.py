@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        # installs the query timer, which also catches slow queries outside requests
+        from . import instrumentation  # noqa: F401
+        from .async_reads import connect_invalidation
+        from .storage import configure_cloudinary
+
+        configure_cloudinary()
+        connect_invalidation()
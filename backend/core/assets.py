@@ -0,0 +1,260 @@
+"""Helpers for remote (Cloudinary) assets referenced by the models.
+
+Deleting a row never talks to Cloudinary directly: the public id is written to
+`PendingAssetDeletion` in the same transaction and `drain_asset_deletions`
+destroys the queued assets later, in batches, through the bulk Admin API.
+
+Uploads go through `store_upload`, which hashes the content and reuses an
+existing asset from the `StoredAsset` index when the same bytes were already
+uploaded. `release_asset` is its counterpart: the remote asset is only queued
+for deletion once its reference count drops to zero.
+"""
+import hashlib
+import logging
+import re
+from datetime import timedelta
+
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .instrumentation import timed
+from .models import PendingAssetDeletion, StoredAsset
+
+logger = logging.getLogger(__name__)
+
+# Cloudinary accepts at most 100 public ids per delete_resources call.
+MAX_DELETE_BATCH = 100
+
+# path of a delivery URL after /upload/: optional version, then the public id with its folders
+_DELIVERY_PATH = re.compile(r'^(?:v\d+/)?(?P<path>.*?)(?P<ext>\.[^./]*)?$')
+
+
+def public_id_of(value):
+    """Return the Cloudinary public id stored in a field value, or None.
+
+    Accepts a CloudinaryResource (CloudinaryField), a FieldFile backed by
+    cloudinary_storage (the name *is* the public id), a bare public id or,
+    as a best effort, a delivery URL of the form
+    .../upload/[v<version>/]<folders>/<name>.<ext>, whose public id keeps the
+    folders (and, for raw files, the extension).
+    """
+    if not value:
+        return None
+    if isinstance(value, CloudinaryResource):
+        return value.public_id or None
+    if isinstance(value, str):
+        if '/upload/' not in value:
+            return value
+        match = _DELIVERY_PATH.match(value.split('/upload/', 1)[1].split('?')[0])
+        path = match.group('path') + (match.group('ext') or '' if '/raw/upload/' in value else '')
+        return path.strip('/') or None
+    return getattr(value, 'name', None) or None
+
+
+def enqueue_asset_deletion(value, resource_type='image'):
+    """Queue the remote asset behind `value` for deletion. Returns the public id."""
+    public_id = public_id_of(value)
+    if public_id:
+        enqueue_asset_deletions([public_id], resource_type=resource_type)
+    return public_id
+
+
+def enqueue_asset_deletions(public_ids, resource_type='image'):
+    rows = [PendingAssetDeletion(public_id=pid, resource_type=resource_type) for pid in public_ids if pid]
+    if rows:
+        PendingAssetDeletion.objects.bulk_create(rows, ignore_conflicts=True)
+        transaction.on_commit(_schedule_drain)
+    return len(rows)
+
+
+def _schedule_drain():
+    # brings the periodic drain task forward instead of waiting for its next run
+    from .tasks import drain_asset_deletions
+
+    drain_asset_deletions.enqueue(key=drain_asset_deletions.name)
+
+
+def content_digest(file):
+    """SHA-256 of an uploaded file, read chunk by chunk. Leaves the file rewound."""
+    sha = hashlib.sha256()
+    size = 0
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    chunks = file.chunks() if hasattr(file, 'chunks') else iter(lambda: file.read(64 * 1024), b'')
+    for chunk in chunks:
+        sha.update(chunk)
+        size += len(chunk)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return sha.hexdigest(), size
+
+
+def _as_field_value(asset):
+    """Value to assign to the model field: a CloudinaryResource for images, the storage name for raw files."""
+    if asset.resource_type == 'raw':
+        return asset.public_id
+    return CloudinaryResource(
+        asset.public_id, version=asset.version or None, format=asset.format or None,
+        type='upload', resource_type=asset.resource_type,
+    )
+
+
+def _upload_options(resource_type):
+    if resource_type == 'raw':
+        # mirror cloudinary_storage.RawMediaCloudinaryStorage so About.cv URLs resolve the same way
+        return {'resource_type': 'raw', 'use_filename': True, 'tags': 'media',
+                'folder': settings.MEDIA_URL.strip('/') or None}
+    return {'resource_type': resource_type, 'type': 'upload'}
+
+
+def store_upload(file, resource_type='image'):
+    """Upload `file` unless identical content is already stored, and take a reference to it.
+
+    Returns a value suitable for assigning to the CloudinaryField (or, for raw
+    files, the FileField name).
+    """
+    import cloudinary.uploader
+
+    digest, size = content_digest(file)
+    asset = StoredAsset.objects.filter(resource_type=resource_type, digest=digest).first()
+    if asset and StoredAsset.objects.filter(pk=asset.pk).update(ref_count=F('ref_count') + 1):
+        return _as_field_value(asset)
+
+    options = {key: value for key, value in _upload_options(resource_type).items() if value is not None}
+    # large files go through the chunked upload API instead of one in-memory request body
+    upload = cloudinary.uploader.upload_large if size > cloudinary.uploader.UPLOAD_LARGE_CHUNK_SIZE else cloudinary.uploader.upload
+    with timed('storage'):
+        result = upload(file, **options)
+    asset = StoredAsset(
+        resource_type=resource_type, digest=digest, public_id=result['public_id'],
+        version=str(result.get('version') or ''), format=result.get('format') or '', size=size,
+    )
+    try:
+        with transaction.atomic():
+            asset.save()
+    except IntegrityError:
+        # a concurrent request stored the same bytes first: use theirs, drop ours
+        enqueue_asset_deletions([asset.public_id], resource_type=resource_type)
+        existing = StoredAsset.objects.get(resource_type=resource_type, digest=digest)
+        StoredAsset.objects.filter(pk=existing.pk).update(ref_count=F('ref_count') + 1)
+        return _as_field_value(existing)
+    return _as_field_value(asset)
+
+
+def replace_upload(current, file, resource_type='image'):
+    """`store_upload` for a field that currently holds `current`.
+
+    When the new file is byte-identical to the current one the extra
+    reference is dropped again, so re-uploading the same file is a no-op.
+    """
+    value = store_upload(file, resource_type=resource_type)
+    return drop_duplicate_reference(current, value, resource_type=resource_type)
+
+
+def drop_duplicate_reference(current, value, resource_type='image'):
+    """Release the reference just taken on `value` if the field already points at the same asset."""
+    if current and public_id_of(current) == public_id_of(value):
+        release_asset(value, resource_type=resource_type)
+    return value
+
+
+def release_asset(value, resource_type='image'):
+    """Drop one reference to the asset behind `value`; queue it for deletion on the last one.
+
+    Assets that predate the index (no StoredAsset row) are queued directly.
+    """
+    public_id = public_id_of(value)
+    if not public_id:
+        return None
+    with transaction.atomic():
+        asset = StoredAsset.objects.select_for_update().filter(
+            resource_type=resource_type, public_id=public_id
+        ).first()
+        if asset is not None and asset.ref_count > 1:
+            StoredAsset.objects.filter(pk=asset.pk).update(ref_count=F('ref_count') - 1)
+            return public_id
+        if asset is not None:
+            asset.delete()
+        enqueue_asset_deletions([public_id], resource_type=resource_type)
+    return public_id
+
+
+def _backoff(attempts):
+    # 1, 2, 4, ... minutes, capped at six hours
+    return timedelta(minutes=min(2 ** max(attempts - 1, 0), 360))
+
+
+def _claim_batch(batch_size, max_attempts, lease):
+    """Lease up to `batch_size` due rows so concurrent drainers never share work."""
+    now = timezone.now()
+    with transaction.atomic():
+        qs = PendingAssetDeletion.objects.filter(next_attempt_at__lte=now, attempts__lt=max_attempts)
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        ids = list(qs.order_by('next_attempt_at').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        PendingAssetDeletion.objects.filter(id__in=ids).update(next_attempt_at=now + lease)
+    return list(PendingAssetDeletion.objects.filter(id__in=ids))
+
+
+def drain_asset_deletions(batch_size=None, max_attempts=None):
+    """Destroy one batch of queued assets. Returns (deleted, failed) counts."""
+    import cloudinary.api
+
+    batch_size = min(batch_size or settings.ASSET_DELETION_BATCH_SIZE, MAX_DELETE_BATCH)
+    max_attempts = max_attempts or settings.ASSET_DELETION_MAX_ATTEMPTS
+    batch = _claim_batch(batch_size, max_attempts, lease=timedelta(minutes=5))
+
+    by_type = {}
+    for row in batch:
+        by_type.setdefault(row.resource_type, []).append(row)
+
+    deleted, failed = [], []
+    for resource_type, rows in by_type.items():
+        public_ids = [row.public_id for row in rows]
+        try:
+            result = cloudinary.api.delete_resources(
+                public_ids, resource_type=resource_type, type='upload', invalidate=True
+            )
+        except Exception as exc:
+            logger.warning("Bulk delete of %d %s assets failed: %s", len(rows), resource_type, exc)
+            failed.extend((row, str(exc)) for row in rows)
+            continue
+        statuses = result.get('deleted', {})
+        for row in rows:
+            status = statuses.get(row.public_id)
+            if status in ('deleted', 'not_found'):
+                deleted.append(row.id)
+            else:
+                failed.append((row, f"unexpected status: {status!r}"))
+
+    if deleted:
+        PendingAssetDeletion.objects.filter(id__in=deleted).delete()
+    now = timezone.now()
+    for row, error in failed:
+        attempts = row.attempts + 1
+        PendingAssetDeletion.objects.filter(id=row.id).update(
+            attempts=F('attempts') + 1,
+            last_error=error[:2000],
+            next_attempt_at=now + _backoff(attempts),
+        )
+    return len(deleted), len(failed)
+
+
+def referenced_public_ids():
+    """Yield (resource_type, public_id) for every asset still referenced in the database."""
+    from blog.models import Image
+    from projects.models import ProjectMedia
+    from .models import About, HeroSection
+
+    for model in (ProjectMedia, Image, HeroSection):
+        for value in model.objects.exclude(image__isnull=True).values_list('image', flat=True).iterator():
+            public_id = public_id_of(value)
+            if public_id:
+                yield 'image', public_id
+    for name in About.objects.exclude(cv__isnull=True).exclude(cv='').values_list('cv', flat=True).iterator():
+        yield 'raw', name
@@ -0,0 +1,211 @@
+"""Async read path for the public endpoints.
+
+Under ASGI (ASYNC_PUBLIC_VIEWS, switched on by portfolio/asgi.py) the public
+list and detail URLs resolve to async views. Rows are read with the async
+ORM (`aget`, `async for`), serialized with the existing DRF serializers (or
+the list projections of core/projections.py) and cached with the async
+cache API. A request therefore holds no thread of its own
+while it waits on a slow client, the cache or the database.
+
+Requests the async views do not cover (writes, authenticated or filtered
+requests, the browsable API, format suffixes) are passed to the DRF view,
+which then runs in a thread as any sync view does under ASGI. Both paths
+render with FastJSONRenderer and return the same bytes.
+
+Cached entries hold the body and its gzip/brotli variants (see
+core/compression.py), so a hit is served in the negotiated encoding without
+compressing again. They are keyed by a version that any save or delete of a
+public model bumps (see `invalidate_public_reads`); with a per-process cache other
+processes may serve the previous content for up to PUBLIC_READ_CACHE_TTL
+seconds.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.urls import URLPattern
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+
+from .compression import compressed_variants, negotiate, set_encoding
+from .metrics import count_cache
+from .renderers import FastJSONRenderer
+
+VERSION_KEY = 'public-read:version'
+
+# models whose rows appear in the public responses
+PUBLIC_MODELS = [
+    'core.HeroSection', 'core.About',
+    'projects.Project', 'projects.ProjectMedia', 'projects.ProjectSkillRef', 'projects.ProjectLink',
+    'blog.Post', 'blog.Image', 'blog.Link',
+    'experiences.Experience', 'experiences.ExperienceSkillRef', 'experiences.ExperienceLink',
+    'skills.Skill', 'skills.SkillReference',
+]
+
+
+def async_reader(*, params=()):
+    """Mark an async function as the reader of a public endpoint.
+
+    The reader is called with the DRF request and the URL kwargs and returns
+    the serialized data. `params` are the query parameters it handles; a
+    request with any other parameter goes to the DRF view.
+    """
+    def decorate(func):
+        func.query_params = frozenset(params)
+        return func
+    return decorate
+
+
+async def fetch_list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def fetch_object(queryset, **lookup):
+    """`aget` with the 404 responses of DRF's get_object()."""
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise NotFound(f"No {queryset.model._meta.object_name} matches the given query.")
+    except (TypeError, ValueError, ValidationError):
+        raise NotFound()
+
+
+async def paginate(queryset, request, pagination_class):
+    """`pagination_class().paginate_queryset()` with async queries.
+
+    Returns the page's objects and the paginator, whose
+    get_paginated_response() builds the page envelope; (all objects, None)
+    when the request disables pagination.
+    """
+    paginator = pagination_class()
+    paginator.request = request
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return await fetch_list(queryset), None
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        paginator.page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    return await fetch_list(paginator.page.object_list), paginator
+
+
+def _allow_header(drf_view):
+    """The Allow header the DRF view sends, from its class and viewset action map."""
+    view = drf_view.cls(**drf_view.initkwargs)
+    for method, action in (getattr(drf_view, 'actions', None) or {}).items():
+        setattr(view, method, getattr(view, action))
+    if hasattr(view, 'get') and not hasattr(view, 'head'):
+        view.head = view.get
+    return ', '.join(view.allowed_methods)
+
+
+def _servable(request, kwargs, params):
+    if request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META or 'format' in kwargs:
+        return False
+    accept = request.META.get('HTTP_ACCEPT', '')
+    # the browsable API and indented JSON are left to DRF's content negotiation
+    if 'text/html' in accept or 'indent' in accept:
+        return False
+    return set(request.GET) <= params
+
+
+def _response(body, status, allow, variants=None, request=None):
+    """The response for `body`, or for its compressed variant in the encoding `request` accepts."""
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', '')) if variants else None
+    response = HttpResponse(variants.get(encoding, body) if encoding else body, status=status, content_type='application/json')
+    response['Allow'] = allow
+    response['Vary'] = 'Accept'
+    if variants:
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding in variants:
+            set_encoding(response, encoding)
+    return response
+
+
+def async_public_read(drf_view, reader):
+    """An async view serving anonymous GETs with `reader` and everything else with `drf_view`."""
+    fallback = sync_to_async(drf_view)
+    renderer = FastJSONRenderer()
+    allow = _allow_header(drf_view)
+
+    @wraps(drf_view)
+    async def view(request, *args, **kwargs):
+        if not _servable(request, kwargs, reader.query_params):
+            return await fallback(request, *args, **kwargs)
+        ttl = settings.PUBLIC_READ_CACHE_TTL
+        if ttl:
+            key = f"public-read:{await cache.aget(VERSION_KEY, 0)}:{request.get_full_path()}"
+            entry = await cache.aget(key)
+            count_cache('public_read', entry is not None)
+            if entry is not None:
+                body, variants = entry
+                return _response(body, 200, allow, variants, request)
+        try:
+            data = await reader(Request(request), *args, **kwargs)
+        except APIException as exc:
+            return _response(renderer.render({'detail': exc.detail}), exc.status_code, allow)
+        body = renderer.render(data)
+        if not ttl:
+            return _response(body, 200, allow)
+        variants = compressed_variants(body)
+        await cache.aset(key, (body, variants), ttl)
+        return _response(body, 200, allow, variants, request)
+
+    return view
+
+
+class PublicReadPattern(URLPattern):
+    """A URL pattern resolving to the async view while ASYNC_PUBLIC_VIEWS is on, else to the DRF view."""
+
+    def __init__(self, pattern, drf_view, async_view, default_args=None, name=None):
+        self.async_view = async_view
+        super().__init__(pattern, drf_view, default_args, name)
+
+    @property
+    def callback(self):
+        return self.async_view if settings.ASYNC_PUBLIC_VIEWS else self.drf_view
+
+    @callback.setter
+    def callback(self, view):
+        self.drf_view = view
+
+
+def async_public_reads(urlpatterns, readers):
+    """Give the URL patterns named in `readers` an async view for ASGI deployments."""
+    return [
+        PublicReadPattern(pattern.pattern, pattern.callback, async_public_read(pattern.callback, readers[pattern.name]),
+                          pattern.default_args, pattern.name)
+        if getattr(pattern, 'name', None) in readers else pattern
+        for pattern in urlpatterns
+    ]
+
+
+def _bump_version():
+    cache.add(VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:  # evicted between add() and incr()
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_public_reads(**kwargs):
+    """Signal receiver: retire the cached public responses once the change is committed."""
+    transaction.on_commit(_bump_version)
+
+
+def connect_invalidation():
+    for label in PUBLIC_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(invalidate_public_reads, sender=model, dispatch_uid=f'public-read-save-{label}')
+        post_delete.connect(invalidate_public_reads, sender=model, dispatch_uid=f'public-read-delete-{label}')
@@ -0,0 +1,222 @@
+"""Micro-benchmarks run with ``manage.py microbench <name>``.
+
+A benchmark is a function registered with `@benchmark(name)` that takes the
+number of iterations and returns rows of (label, seconds per iteration).
+Benchmarks run against the configured database; seed it first for
+meaningful numbers.
+"""
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def compare(candidates, iterations, repeat=7):
+    """Best seconds per call of each (label, func), with the candidates interleaved.
+
+    Interleaving spreads machine noise evenly; the minimum over `repeat`
+    rounds is the least disturbed measurement, as with timeit.
+    """
+    best = {}
+    for label, func in candidates:
+        func()  # warm-up: imports, URL resolver, first query
+    for _ in range(repeat):
+        for label, func in candidates:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            elapsed = (time.perf_counter() - start) / iterations
+            best[label] = min(elapsed, best.get(label, elapsed))
+    return [(label, best[label]) for label, _ in candidates]
+
+
+def _handler(middleware):
+    """A request handler with its own middleware chain, as a WSGI worker would build it."""
+    with override_settings(MIDDLEWARE=middleware):
+        handler = BaseHandler()
+        handler.load_middleware()
+    return handler
+
+
+@benchmark('middleware')
+def middleware_overhead(iterations):
+    """Anonymous GET /api/core/hero/ through the previous full stack, the current one and none."""
+    from django.conf import settings
+
+    stateful = settings.STATEFUL_MIDDLEWARE
+    stacks = [
+        ('full stack (before)', [
+            'django.middleware.security.SecurityMiddleware',
+            stateful[0],
+            'django.middleware.common.CommonMiddleware',
+            *stateful[1:4],
+            'django.middleware.clickjacking.XFrameOptionsMiddleware',
+            *stateful[4:],
+            'corsheaders.middleware.CorsMiddleware',
+        ]),
+        ('path-aware (after)', settings.MIDDLEWARE),
+        ('no middleware', []),
+    ]
+    factory = RequestFactory()
+    candidates = []
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for label, middleware in stacks:
+            handler = _handler(middleware)
+            response = handler.get_response(factory.get('/api/core/hero/'))
+            assert response.status_code == 200, response.status_code
+            candidates.append((label, lambda h=handler: h.get_response(factory.get('/api/core/hero/'))))
+        return compare(candidates, iterations)
+
+
+def _wsgi_throughput(path, total, clients, latency, threads):
+    """Seconds per request for `clients` slow clients served by a WSGI worker with `threads` threads.
+
+    A sync server writes the response from the worker thread, so the thread
+    is held for the client's `latency` as well.
+    """
+    handler = WSGIHandler()
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'HTTP_HOST': 'testserver',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.url_scheme': 'http',
+    }
+
+    def serve(_):
+        body = b''.join(handler({**environ, 'wsgi.input': io.BytesIO()}, lambda status, headers, exc_info=None: None))
+        time.sleep(latency)
+        return body
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(serve, range(clients)))  # warm-up, one request per thread
+        start = time.perf_counter()
+        list(pool.map(serve, range(total)))
+    return (time.perf_counter() - start) / total
+
+
+def _asgi_throughput(path, total, clients, latency):
+    """Seconds per request for `clients` slow clients served by one ASGI event loop."""
+    handler = ASGIHandler()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver')], 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+    }
+
+    async def request():
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Future()  # the client stays connected; Django cancels this wait
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                await asyncio.sleep(latency)  # the client drains the response slowly
+
+        await handler(dict(scope), receive, send)
+
+    async def client(count):
+        for _ in range(count):
+            await request()
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(clients)))  # warm-up
+        start = time.perf_counter()
+        await asyncio.gather(*(client(total // clients) for _ in range(clients)))
+        return (time.perf_counter() - start) / (total // clients * clients)
+
+    return asyncio.run(run())
+
+
+@benchmark('asgi')
+def asgi_throughput(iterations, threads=8):
+    """Seconds per request (inverse throughput) of GET /api/core/hero/ under concurrent clients.
+
+    Two scenarios: 50 clients reading responses immediately, and 200 slow
+    clients taking 200 ms each. Compares a WSGI worker with 8 threads, ASGI
+    running the DRF views (each in a thread) and ASGI with the async views of
+    core/async_reads.py, with and without the response cache.
+    """
+    path = '/api/core/hero/'
+    rows = []
+    for clients, latency in [(50, 0), (200, 0.2)]:
+        scenario = f'{clients} clients, {latency * 1000:.0f} ms'
+        total = max(iterations, clients)
+        with override_settings(ALLOWED_HOSTS=['testserver'], PUBLIC_READ_CACHE_TTL=0):
+            with override_settings(ASYNC_PUBLIC_VIEWS=False):
+                rows.append((f'{scenario}: WSGI, {threads} threads', _wsgi_throughput(path, total, clients, latency, threads)))
+                rows.append((f'{scenario}: ASGI, DRF views', _asgi_throughput(path, total, clients, latency)))
+            with override_settings(ASYNC_PUBLIC_VIEWS=True):
+                rows.append((f'{scenario}: ASGI, async views', _asgi_throughput(path, total, clients, latency)))
+        with override_settings(ALLOWED_HOSTS=['testserver'], ASYNC_PUBLIC_VIEWS=True):
+            rows.append((f'{scenario}: ASGI, async + cache', _asgi_throughput(path, total, clients, latency)))
+    return rows
+
+
+def _seed_projects(count):
+    """`count` projects with two media, links and skills each; call inside a transaction that is rolled back."""
+    from projects.models import Project, ProjectLink, ProjectMedia, ProjectSkillRef
+    from skills.models import SkillReference
+
+    references = [
+        SkillReference.objects.create(name=f'bench-skill-{i}', icon=f'https://example.com/{i}.svg') for i in range(2)
+    ]
+    projects = Project.objects.bulk_create(
+        Project(title=f'Projet {i}', description='Description du projet ' * 10) for i in range(count)
+    )
+    ProjectMedia.objects.bulk_create(
+        ProjectMedia(project=project, image=f'image/upload/v1/projects/{project.pk}-{i}.jpg', order=i)
+        for project in projects for i in range(2)
+    )
+    ProjectLink.objects.bulk_create(
+        ProjectLink(project=project, url=f'https://example.com/{project.pk}/{i}', text='Lien', order=i)
+        for project in projects for i in range(2)
+    )
+    ProjectSkillRef.objects.bulk_create(
+        ProjectSkillRef(project=project, skill_reference=reference) for project in projects for reference in references
+    )
+
+
+@benchmark('serializers')
+def list_serialization(iterations, rows=1000):
+    """Seconds per row to read and render a list of 1000 projects (nested media, links and skills).
+
+    ProjectSerializer over a fully prefetched queryset against the values_list()
+    projection, rendered by DRF's JSONRenderer and by the orjson one. The rows
+    are created in a transaction that is rolled back.
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from core.renderers import FastJSONRenderer
+    from projects.models import Project
+    from projects.serializers import PROJECT_LIST, ProjectSerializer
+
+    with transaction.atomic():
+        _seed_projects(rows)
+        queryset = Project.objects.order_by('-pk')[:rows]
+        prefetched = queryset.prefetch_related('media', 'links', 'projectskillref_set__skill_reference')
+        candidates = [
+            ('ModelSerializer + JSONRenderer', lambda: JSONRenderer().render(ProjectSerializer(prefetched, many=True).data)),
+            ('values_list() + JSONRenderer', lambda: JSONRenderer().render(PROJECT_LIST.serialize(PROJECT_LIST.rows(queryset)))),
+            ('values_list() + orjson', lambda: FastJSONRenderer().render(PROJECT_LIST.serialize(PROJECT_LIST.rows(queryset)))),
+        ]
+        assert len({func() for _, func in candidates}) == 1, "the candidates render different bytes"
+        results = compare(candidates, max(iterations // 100, 1), repeat=3)
+        transaction.set_rollback(True)
+    return [(f'{label} (per row)', seconds / rows) for label, seconds in results]
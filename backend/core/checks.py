@@ -0,0 +1,21 @@
+"""System checks of the settings that only matter with several worker processes."""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_ratelimit_cache(app_configs, **kwargs):
+    if settings.CACHES.get('ratelimit', {}).get('BACKEND') not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        "The 'ratelimit' cache is local to each process, so the contact form throttles and "
+        "the login lockouts are counted per worker.",
+        hint='Unset RATELIMIT_CACHE_BACKEND to use the database cache, or point it (or CACHE_BACKEND) '
+             'at a shared backend such as django.core.cache.backends.redis.RedisCache.',
+        id='core.E001',
+    )]
@@ -0,0 +1,99 @@
+"""Negotiated gzip/brotli compression of API JSON.
+
+`CompressionMiddleware` compresses JSON responses under
+COMPRESSED_PATH_PREFIXES of at least COMPRESS_MIN_SIZE bytes, with brotli
+when the client accepts it and the ``brotli`` package is installed, else
+gzip. Responses that already carry a Content-Encoding are left alone: the
+public read cache (core/async_reads.py) stores the compressed variants
+built by `compressed_variants` next to the body when it fills an entry and
+serves the negotiated one directly, so cached responses are compressed once
+per fill instead of once per request.
+
+gzip output carries the random-length filename Django's GZipMiddleware adds
+against BREACH.
+"""
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# server preference among encodings of equal q-value
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+MAX_RANDOM_BYTES = 100  # as GZipMiddleware
+BROTLI_QUALITY = 5  # per-request compression; cache fills use the densest setting
+BROTLI_QUALITY_CACHED = 11
+
+_q_value = re.compile(r';\s*q=([0-9.]+)')
+
+
+def negotiate(accept_encoding):
+    """The encoding to use for an Accept-Encoding header, or None for identity."""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name = part.split(';', 1)[0].strip()
+        if not name:
+            continue
+        match = _q_value.search(part)
+        try:
+            accepted[name] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            accepted[name] = 0.0
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body, encoding, cached=False):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY_CACHED if cached else BROTLI_QUALITY)
+    return compress_string(body, max_random_bytes=MAX_RANDOM_BYTES)
+
+
+def compressed_variants(body):
+    """{encoding: compressed body} worth storing next to a cached `body`."""
+    if len(body) < settings.COMPRESS_MIN_SIZE:
+        return {}
+    variants = {encoding: compress(body, encoding, cached=True) for encoding in ENCODINGS}
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+def set_encoding(response, encoding):
+    """Mark `response`, whose content is already encoded, with its Content-Encoding."""
+    response.headers['Content-Length'] = str(len(response.content))
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+    response.headers['Content-Encoding'] = encoding
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or not request.path_info.startswith(tuple(settings.COMPRESSED_PATH_PREFIXES))
+            or not response.get('Content-Type', '').startswith('application/json')
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.COMPRESS_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        set_encoding(response, encoding)
+        return response
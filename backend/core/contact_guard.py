@@ -0,0 +1,144 @@
+"""Spam protection for the public contact form.
+
+Checks run cheapest first and none of them touches the application's tables:
+
+1. fixed-window throttles, per client IP and global (DRF throttle classes),
+2. a honeypot field and a minimum fill time, measured by the form itself,
+3. a duplicate filter on hash(email, subject, message) over a sliding window.
+
+State lives in the 'ratelimit' cache, shared by every process (a database
+cache unless the settings name a shared default cache), and every counter
+is updated with add()/incr(), which are atomic on Redis and memcached.
+Client IPs come from DRF's get_ident(), which trusts
+X-Forwarded-For only as far as NUM_PROXIES says. Every decision increments a counter that
+`contact_counters()` reports for monitoring.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from rest_framework.throttling import BaseThrottle
+
+cache = ConnectionProxy(caches, 'ratelimit')
+
+COUNTER_PREFIX = 'contact-guard:count:'
+COUNTERS = ('accepted', 'throttled_ip', 'throttled_global', 'honeypot', 'too_fast', 'duplicate')
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def _increment(key, timeout):
+    """Add one to the counter `key` and return its new value."""
+    # add() is a no-op when the counter exists; incr() is atomic on shared backends
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:  # evicted between add() and incr()
+        cache.set(key, 1, timeout=timeout)
+        return 1
+
+
+def record(event):
+    _increment(COUNTER_PREFIX + event, None)
+
+
+def contact_counters():
+    values = cache.get_many([COUNTER_PREFIX + name for name in COUNTERS])
+    return {name: values.get(COUNTER_PREFIX + name, 0) for name in COUNTERS}
+
+
+def parse_rate(rate):
+    """'5/minute' -> (limit 5, period 60 seconds)."""
+    num, period = rate.split('/')
+    return int(num), _PERIODS[period[0]]
+
+
+class WindowThrottle(BaseThrottle):
+    """At most <limit> POSTs per <period>, counted in fixed windows of the period.
+
+    The rate comes from CONTACT_THROTTLE_RATES[scope] as '<limit>/<period>'.
+    Each window is one cache counter incremented atomically, so a burst of
+    parallel requests is counted exactly.
+    """
+    scope = None
+
+    def get_bucket_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        rate = settings.CONTACT_THROTTLE_RATES.get(self.scope)
+        if not rate or request.method != 'POST':
+            return True
+        limit, period = parse_rate(rate)
+        now = time.time()
+        window = int(now // period)
+        key = f"contact-guard:window:{self.scope}:{self.get_bucket_key(request, view)}:{window}"
+        if _increment(key, period + 1) > limit:
+            self._wait = (window + 1) * period - now
+            record(f"throttled_{self.scope}")
+            return False
+        return True
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class ContactIPThrottle(WindowThrottle):
+    scope = 'ip'
+
+    def get_bucket_key(self, request, view):
+        return self.get_ident(request)
+
+
+class ContactGlobalThrottle(WindowThrottle):
+    scope = 'global'
+
+    def get_bucket_key(self, request, view):
+        return 'all'
+
+
+def screen(data):
+    """Honeypot and fill-time checks on the raw payload. Returns the rejection reason or None.
+
+    The form sends ``fill_ms``, the milliseconds between its display and its
+    submission on the browser's own clock, so a clock set differently from
+    the server's does not matter. A missing or unreadable value fails the
+    check: it means the form's script did not run.
+    """
+    if data.get(settings.CONTACT_HONEYPOT_FIELD):
+        return 'honeypot'
+    try:
+        elapsed = float(data.get('fill_ms')) / 1000
+    except (TypeError, ValueError):
+        return 'too_fast'
+    if not math.isfinite(elapsed) or elapsed < settings.CONTACT_MIN_FILL_SECONDS:
+        return 'too_fast'
+    return None
+
+
+def _fingerprint(data):
+    parts = [str(data.get(field) or '').strip() for field in ('email', 'subject', 'message')]
+    parts[0] = parts[0].lower()
+    return 'contact-guard:seen:' + hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def claim_submission(data):
+    """Reserve this (email, subject, message) for the dedup window.
+
+    Returns the reservation key, or None when the same submission was seen
+    within the window (which then slides forward).
+    """
+    key = _fingerprint(data)
+    window = settings.CONTACT_DUPLICATE_WINDOW
+    if cache.add(key, 1, timeout=window):
+        return key
+    cache.touch(key, window)
+    return None
+
+
+def release_submission(key):
+    """Forget a reservation whose message was not stored, so a corrected resend goes through."""
+    cache.delete(key)
@@ -0,0 +1,35 @@
+import django_filters
+from .models import ContactMessage
+
+
+class ContactMessageFilter(django_filters.FilterSet):
+    created_after = django_filters.DateFilter(
+        field_name='created_at',
+        lookup_expr='date__gte',
+        label='Received on or after this date (YYYY-MM-DD)'
+    )
+
+    created_before = django_filters.DateFilter(
+        field_name='created_at',
+        lookup_expr='date__lte',
+        label='Received on or before this date (YYYY-MM-DD)'
+    )
+
+    email = django_filters.CharFilter(
+        field_name='email',
+        lookup_expr='iexact',
+        label='Sender email (case-insensitive)'
+    )
+
+    email_domain = django_filters.CharFilter(
+        field_name='email',
+        method='filter_email_domain',
+        label='Sender email domain, e.g. example.com'
+    )
+
+    class Meta:
+        model = ContactMessage
+        fields = ['is_read', 'is_archived']
+
+    def filter_email_domain(self, queryset, name, value):
+        return queryset.filter(**{f'{name}__iendswith': f"@{value.lstrip('@')}"})
@@ -0,0 +1,132 @@
+"""``Idempotency-Key`` support for view methods that create rows or upload files.
+
+Decorate a view method with `idempotent`. The first request carrying a given
+key runs normally and its response is stored for IDEMPOTENCY_KEY_TTL seconds;
+a retry with the same key (same user, method and path) gets the stored
+response back without the view running again. A duplicate that arrives while
+the original is still running gets a 409 with ``Retry-After`` at once: waiting
+for the original would hold a whole worker per retry.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+from rest_framework.utils.encoders import JSONEncoder
+
+from .assets import content_digest
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def _scope(request):
+    user = getattr(request, 'user', None)
+    who = f"user:{user.pk}" if user is not None and user.is_authenticated else f"ip:{BaseThrottle().get_ident(request)}"
+    return f"{who} {request.method} {request.path}"[:255]
+
+
+def _describe(value):
+    if isinstance(value, UploadedFile):
+        digest, size = content_digest(value)
+        return {'file': value.name, 'size': size, 'content_type': value.content_type, 'sha256': digest}
+    return value
+
+
+def _fingerprint(request):
+    """Hash of the parsed payload; uploaded files are described by name, type and a hash of their content."""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = sorted((key, [_describe(v) for v in values]) for key, values in data.lists())
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _acquire(scope, key, fingerprint):
+    """Insert the in-progress marker. Returns (record, created)."""
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                scope=scope, key=key, fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+        return record, True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(scope=scope, key=key).first(), False
+
+
+def _replay(record):
+    data = json.loads(record.response_body) if record.response_body else None
+    return Response(data, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _is_stale(record, now):
+    if record.status == IdempotencyKey.STATUS_COMPLETED:
+        return record.expires_at <= now
+    # the original worker died without recording an outcome
+    return record.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+
+
+def idempotent(view_method):
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'detail': f"{HEADER} must be at most 255 characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        scope = _scope(request)
+        fingerprint = _fingerprint(request)
+        while True:
+            record, created = _acquire(scope, key, fingerprint)
+            if created:
+                break
+            if record is None:
+                continue  # the original failed and released the key between our two queries
+            if _is_stale(record, timezone.now()):
+                IdempotencyKey.objects.filter(pk=record.pk).delete()
+                continue
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {'detail': f"{HEADER} was already used with a different request payload."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status == IdempotencyKey.STATUS_COMPLETED:
+                return _replay(record)
+            return Response(
+                {'detail': 'A request with this Idempotency-Key is still being processed.'},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Retry-After': '1'},
+            )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500 or not hasattr(response, 'data'):
+            # server errors are not final: let the client retry for real
+            record.delete()
+            return response
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            status=IdempotencyKey.STATUS_COMPLETED,
+            status_code=response.status_code,
+            response_body=json.dumps(response.data, cls=JSONEncoder),
+        )
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(now=None):
+    count, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return count
@@ -0,0 +1,189 @@
+"""Per-request timing: total, SQL, storage SDK calls and JSON rendering.
+
+`RequestTimingMiddleware` measures every request while METRICS_ENABLED is
+on (the default once METRICS_TOKEN is set), and otherwise only those that
+are sampled (REQUEST_TIMING_SAMPLE_RATE) or may come from a superuser (they
+carry an Authorization header or a session cookie); without metrics, the
+sample rate is what bounds the cost. The measurements go to
+
+- the Prometheus request metrics (see core/metrics.py);
+- a ``Server-Timing`` header when the user turns out to be a superuser, so
+  the breakdown shows up in the browser's network panel;
+- one JSON log line on the ``core.instrumentation`` logger when sampled.
+
+The `Timings` of a measured request is also left on ``request.timings``
+(`manage.py bench` reads its query count).
+
+SQL is timed by an execute wrapper installed on every connection, which
+also hands queries over SLOW_QUERY_THRESHOLD_MS to core/slow_queries.py
+(in requests or not); storage
+and rendering by `timed()` blocks around Cloudinary calls and the JSON
+renderer. All of them check a context variable and cost a lookup when the
+request is not measured; the context variable also follows the request
+into the threads async views run sync code in. ``app`` is the remainder:
+view code and serializers.
+"""
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import slow_queries
+from .metrics import record_request
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timings', default=None)
+# the request while it is not measured, so that its slow queries still name the view
+_unmeasured = ContextVar('unmeasured_request', default=None)
+
+SEGMENTS = ('sql', 'storage', 'render')
+
+
+class Timings:
+    __slots__ = ('request', 'start', 'sql', 'storage', 'render', 'queries', 'slow_queries')
+
+    def __init__(self, request):
+        self.request = request
+        self.start = time.perf_counter()
+        self.sql = self.storage = self.render = 0.0
+        self.queries = 0
+        self.slow_queries = []
+
+    def as_dict(self, total):
+        durations = {'total': total, **{name: getattr(self, name) for name in SEGMENTS}}
+        durations['app'] = max(total - sum(durations[name] for name in SEGMENTS), 0.0)
+        return {name: round(seconds * 1000, 2) for name, seconds in durations.items()}
+
+
+class timed:
+    """Add the time spent in the block to the current request's `segment`, if it is measured."""
+    __slots__ = ('segment', 'timings', 'started')
+
+    def __init__(self, segment):
+        self.segment = segment
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            elapsed = time.perf_counter() - self.started
+            setattr(self.timings, self.segment, getattr(self.timings, self.segment) + elapsed)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if timings is None and not threshold:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        result = execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is not None:
+            timings.sql += elapsed
+            timings.queries += 1
+    if threshold and elapsed * 1000 >= threshold:
+        request = timings.request if timings is not None else _unmeasured.get()
+        slow_queries.capture(context['connection'], sql, params, many, elapsed, timings, request)
+    return result
+
+
+def install_query_timer(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_timer, dispatch_uid='request-timing-queries')
+
+
+def server_timing(durations, queries):
+    parts = []
+    for name, ms in durations.items():
+        part = f'{name};dur={ms}'
+        if name == 'sql':
+            part += f';desc="{queries} queries"'
+        parts.append(part)
+    return ', '.join(parts)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        sampled = random.random() < settings.REQUEST_TIMING_SAMPLE_RATE
+        privileged = 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES
+        if not (sampled or privileged or settings.METRICS_ENABLED):
+            return None, False
+        # connections opened before this module was imported have no timer yet
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+        request.timings = Timings(request)
+        return request.timings, sampled
+
+    def _finish(self, request, response, timings, sampled):
+        total = time.perf_counter() - timings.start
+        if settings.METRICS_ENABLED:
+            record_request(request, response.status_code, total, timings.queries)
+        durations = timings.as_dict(total)
+        if getattr(getattr(request, 'user', None), 'is_superuser', False):
+            response['Server-Timing'] = server_timing(durations, timings.queries)
+        if sampled:
+            logger.info(json.dumps({
+                'method': request.method, 'path': request.path, 'status': response.status_code,
+                'queries': timings.queries, **{f'{name}_ms': ms for name, ms in durations.items()},
+            }))
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings, sampled = self._start(request)
+        if timings is None:
+            token = _unmeasured.set(request)
+            try:
+                return self.get_response(request)
+            finally:
+                _unmeasured.reset(token)
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if timings.slow_queries:
+            slow_queries.record(timings.slow_queries)
+        return self._finish(request, response, timings, sampled)
+
+    async def __acall__(self, request):
+        timings, sampled = self._start(request)
+        if timings is None:
+            token = _unmeasured.set(request)
+            try:
+                return await self.get_response(request)
+            finally:
+                _unmeasured.reset(token)
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        if timings.slow_queries:
+            await sync_to_async(slow_queries.record)(timings.slow_queries)
+        return self._finish(request, response, timings, sampled)
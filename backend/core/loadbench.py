@@ -0,0 +1,400 @@
+"""HTTP load benchmark run with ``manage.py bench``.
+
+The application is served in-process by Django's WSGI handler, with
+`clients` threads issuing requests back to back, or by its ASGI handler,
+with `clients` coroutines on one event loop (ASYNC_PUBLIC_VIEWS on, as
+portfolio/asgi.py does). Requests go through the whole middleware stack
+but no socket, so the numbers are those of the application, not of a
+server.
+
+The requests follow a weighted mix (`MIX`) of public reads, searches,
+filters and admin calls, drawn with a seeded random generator against the
+rows of the database (fill it with ``manage.py seed_bench_data`` first).
+Admin requests carry the JWT of a ``bench-admin`` superuser; projects it
+creates are deleted after the run.
+
+`run` returns per-route latency percentiles, throughput and mean SQL
+queries per request (counted by core.instrumentation), plus every latency
+sample: results saved as JSON are baselines that `compare` tests against a
+later run with a Mann-Whitney U test, which makes no assumption about the
+shape of latency distributions.
+"""
+import asyncio
+import io
+import json
+import math
+import platform
+import random
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import django
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler, ASGIRequest
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from blog.models import Post
+from experiences.models import Experience
+from projects.models import Project
+from skills.models import SkillReference
+from users.authentication import issue_tokens
+from .models import ContactMessage
+from .seeding import WORDS
+
+FORMAT_VERSION = 1
+SERVERS = ('wsgi', 'asgi')
+ADMIN_USERNAME = 'bench-admin'
+CREATED_TITLE = 'bench-create'
+
+# request name: weight; the requests themselves are built by _request()
+MIX = {
+    'project-list': 10,
+    'project-search': 4,
+    'project-filter': 3,
+    'project-detail': 10,
+    'post-list': 6,
+    'post-detail': 8,
+    'experience-list': 6,
+    'experience-search': 3,
+    'skill-list': 4,
+    'hero': 3,
+    'about': 3,
+    'contact-admin-list': 3,
+    'contact-admin-filter': 2,
+    'admin-summary': 2,
+    'project-create': 1,
+}
+
+
+@dataclass
+class Job:
+    name: str
+    method: str
+    path: str
+    query: str = ''
+    body: bytes = b''
+    admin: bool = False
+
+
+@dataclass
+class Sample:
+    name: str
+    seconds: float
+    status: int
+    queries: int
+
+
+@dataclass
+class _Rows:
+    """What the requests are drawn from."""
+    project_ids: list
+    post_slugs: list
+    skill_names: list
+    experience_pages: int
+    contact_pages: int
+
+
+def _rows():
+    limit = 10_000
+    return _Rows(
+        project_ids=list(Project.objects.order_by('pk').values_list('pk', flat=True)[:limit]),
+        post_slugs=list(Post.objects.order_by('pk').values_list('slug', flat=True)[:limit]),
+        skill_names=list(SkillReference.objects.order_by('pk').values_list('name', flat=True)[:limit]),
+        experience_pages=max(math.ceil(Experience.objects.count() / 10), 1),
+        contact_pages=max(math.ceil(ContactMessage.objects.count() / 50), 1),
+    )
+
+
+def _request(name, rng, rows, serial):
+    if name == 'project-list':
+        return Job(name, 'GET', reverse('project-list'))
+    if name == 'project-search':
+        return Job(name, 'GET', reverse('project-list'), f'search={rng.choice(WORDS)}')
+    if name == 'project-filter':
+        return Job(name, 'GET', reverse('project-list'), f'skill={rng.choice(rows.skill_names)}')
+    if name == 'project-detail':
+        return Job(name, 'GET', reverse('project-detail', args=[rng.choice(rows.project_ids)]))
+    if name == 'post-list':
+        return Job(name, 'GET', reverse('post-list'))
+    if name == 'post-detail':
+        return Job(name, 'GET', reverse('post-detail', args=[rng.choice(rows.post_slugs)]))
+    if name == 'experience-list':
+        return Job(name, 'GET', reverse('experience-list'), f'page={rng.randint(1, rows.experience_pages)}')
+    if name == 'experience-search':
+        return Job(name, 'GET', reverse('experience-list'), f'search={rng.choice(WORDS)}')
+    if name == 'skill-list':
+        return Job(name, 'GET', reverse('skill-list'))
+    if name == 'hero':
+        return Job(name, 'GET', reverse('hero_list'))
+    if name == 'about':
+        return Job(name, 'GET', reverse('about_public'))
+    if name == 'contact-admin-list':
+        return Job(name, 'GET', reverse('contact_admin_list'), f'page={rng.randint(1, rows.contact_pages)}', admin=True)
+    if name == 'contact-admin-filter':
+        return Job(name, 'GET', reverse('contact_admin_list'), 'is_read=false&page_size=100', admin=True)
+    if name == 'admin-summary':
+        return Job(name, 'GET', reverse('admin_summary'), admin=True)
+    if name == 'project-create':
+        body = json.dumps({'title': f'{CREATED_TITLE} {serial}', 'description': ' '.join(rng.choices(WORDS, k=40))})
+        return Job(name, 'POST', reverse('project-list'), body=body.encode(), admin=True)
+    raise ValueError(f'Unknown request {name!r}')
+
+
+def parse_mix(text):
+    """{name: weight} from ``name=weight,...``; names missing from the text get no requests."""
+    weights = {}
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in MIX:
+            raise ValueError(f"Unknown request {name!r}; choose from {', '.join(MIX)}.")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def plan(weights, count, seed, rows):
+    """`count` jobs drawn from the mix; the same arguments and rows give the same jobs."""
+    rng = random.Random(seed)
+    # requests that pick a row are left out when there is none
+    picked = {'project-detail': rows.project_ids, 'project-filter': rows.skill_names, 'post-detail': rows.post_slugs}
+    names = [name for name, weight in weights.items() if weight > 0 and picked.get(name, True)]
+    if not names:
+        raise ValueError('The mix is empty, or the database has no rows for it.')
+    drawn = rng.choices(names, weights=[weights[name] for name in names], k=count)
+    return [_request(name, rng, rows, serial) for serial, name in enumerate(drawn)]
+
+
+def _headers(job, token):
+    headers = {'HTTP_HOST': 'testserver', 'HTTP_ACCEPT': 'application/json', 'HTTP_ACCEPT_ENCODING': 'gzip, br'}
+    if job.admin:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    if job.body:
+        headers.update({'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(job.body))})
+    return headers
+
+
+def _environ(job, token):
+    return {
+        'REQUEST_METHOD': job.method, 'PATH_INFO': job.path, 'QUERY_STRING': job.query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '443', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(job.body), **_headers(job, token),
+    }
+
+
+def _scope(job, token):
+    headers = [
+        (name[5:].lower().replace('_', '-') if name.startswith('HTTP_') else name.lower().replace('_', '-'), value)
+        for name, value in _headers(job, token).items()
+    ]
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': job.method,
+        'scheme': 'https', 'path': job.path, 'raw_path': job.path.encode(), 'query_string': job.query.encode(),
+        'root_path': '', 'headers': [(name.encode(), value.encode()) for name, value in headers],
+        'server': ('testserver', 443), 'client': ('127.0.0.1', 5000),
+    }
+
+
+def _sample(job, started, request, response):
+    seconds = time.perf_counter() - started
+    timings = getattr(request, 'timings', None)
+    return Sample(job.name, seconds, response.status_code, timings.queries if timings is not None else 0)
+
+
+def _run_wsgi(jobs, clients, token):
+    handler = WSGIHandler()
+
+    def serve(job):
+        started = time.perf_counter()
+        request = WSGIRequest(_environ(job, token))
+        response = handler.get_response(request)
+        sample = _sample(job, started, request, response)
+        response.close()
+        return sample
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        started = time.perf_counter()
+        samples = list(pool.map(serve, jobs))
+        return samples, time.perf_counter() - started
+
+
+def _run_asgi(jobs, clients, token):
+    handler = ASGIHandler()
+
+    async def serve(job):
+        # as ASGIHandler.handle: the sync code of a request runs in a thread of its own
+        async with ThreadSensitiveContext():
+            started = time.perf_counter()
+            request = ASGIRequest(_scope(job, token), io.BytesIO(job.body))
+            response = await handler.get_response_async(request)
+            sample = _sample(job, started, request, response)
+            await sync_to_async(response.close, thread_sensitive=True)()
+            return sample
+
+    async def client(queue, samples):
+        for index, job in queue:
+            samples[index] = await serve(job)
+
+    async def run():
+        queue = iter(enumerate(jobs))  # shared: each client takes the next job when it is done
+        samples = [None] * len(jobs)
+        started = time.perf_counter()
+        await asyncio.gather(*(client(queue, samples) for _ in range(clients)))
+        return samples, time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+def percentile(sorted_values, fraction):
+    """Linear interpolation between closest ranks, as numpy's default."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(samples, duration):
+    by_route = {}
+    for sample in samples:
+        by_route.setdefault(sample.name, []).append(sample)
+    routes = {}
+    for name in sorted(by_route):
+        route_samples = by_route[name]
+        latencies = sorted(sample.seconds * 1000 for sample in route_samples)
+        routes[name] = {
+            'requests': len(route_samples),
+            'errors': sum(sample.status >= 400 for sample in route_samples),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'rps': round(len(route_samples) / duration, 2),
+            'queries': round(statistics.fmean(sample.queries for sample in route_samples), 2),
+            'latencies_ms': [round(ms, 3) for ms in latencies],
+        }
+    return {'duration_s': round(duration, 3), 'throughput_rps': round(len(samples) / duration, 2), 'routes': routes}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _admin_token():
+    user, created = get_user_model().objects.get_or_create(
+        username=ADMIN_USERNAME, defaults={'is_superuser': True, 'is_staff': True, 'email': 'bench@example.com'},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    return issue_tokens(user)['access']
+
+
+def run(servers=SERVERS, weights=None, requests=2000, clients=8, seed=0, warmup=50, cache=True):
+    """Benchmark each of `servers`; returns the JSON-serializable results."""
+    weights = weights or dict(MIX)
+    rows = _rows()
+    token = _admin_token()
+    jobs = plan(weights, requests, seed, rows)
+    warmup_jobs = plan(weights, warmup, seed + 1, rows) if warmup else []
+    results = {
+        'version': FORMAT_VERSION,
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'requests': requests, 'clients': clients, 'seed': seed, 'cache': cache, 'mix': weights,
+        },
+        'servers': {},
+    }
+    measured = {
+        'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+        # every request measured by core.instrumentation, which counts its queries
+        'METRICS_ENABLED': True,
+        'REQUEST_TIMING_SAMPLE_RATE': 0,
+        'SLOW_QUERY_THRESHOLD_MS': 0,
+    }
+    if not cache:
+        measured['PUBLIC_READ_CACHE_TTL'] = 0
+    runners = {'wsgi': _run_wsgi, 'asgi': _run_asgi}
+    try:
+        for server in servers:
+            with override_settings(**measured, ASYNC_PUBLIC_VIEWS=server == 'asgi'):
+                if warmup_jobs:
+                    runners[server](warmup_jobs, clients, token)
+                samples, duration = runners[server](jobs, clients, token)
+            results['servers'][server] = summarize(samples, duration)
+    finally:
+        Project.objects.filter(title__startswith=f'{CREATED_TITLE} ').delete()
+    return results
+
+
+def mann_whitney(a, b):
+    """Two-sided p-value of the Mann-Whitney U test for samples `a` and `b`.
+
+    Normal approximation with tie and continuity corrections, which is what
+    scipy uses for samples this size (hundreds of latencies).
+    """
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    values = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    rank_sum, ties, i = 0.0, 0.0, 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1  # average rank of the tied run
+        rank_sum += rank * sum(1 for k in range(i, j + 1) if values[k][1] == 0)
+        count = j - i + 1
+        ties += count ** 3 - count
+        i = j + 1
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return min(math.erfc(max(z, 0) / math.sqrt(2)), 1.0)
+
+
+def compare(baseline, current, alpha=0.01, threshold=0.05):
+    """Route by route differences between two results; `verdict` is regression, improvement or ''.
+
+    A latency change counts when the Mann-Whitney p-value is below `alpha`
+    and the median moved by more than `threshold` (a fraction); more SQL
+    queries per request always count.
+    """
+    rows = []
+    for server in sorted(set(baseline['servers']) & set(current['servers'])):
+        before, after = baseline['servers'][server]['routes'], current['servers'][server]['routes']
+        for name in sorted(set(before) & set(after)):
+            old, new = before[name], after[name]
+            change = (new['p50_ms'] - old['p50_ms']) / old['p50_ms'] if old['p50_ms'] else 0.0
+            p_value = mann_whitney(old['latencies_ms'], new['latencies_ms'])
+            verdict = ''
+            if p_value < alpha and abs(change) > threshold:
+                verdict = 'regression' if change > 0 else 'improvement'
+            if new['queries'] > old['queries'] + 0.5:
+                verdict = 'regression'
+            rows.append({
+                'server': server, 'route': name, 'p50_before_ms': old['p50_ms'], 'p50_after_ms': new['p50_ms'],
+                'change': round(change, 4), 'p_value': p_value, 'queries_before': old['queries'],
+                'queries_after': new['queries'], 'verdict': verdict,
+            })
+    return rows
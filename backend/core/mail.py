@@ -0,0 +1,142 @@
+"""Queued outbound email.
+
+`queue_mail` only inserts an `OutboundEmail` row, so the HTTP request returns
+without waiting for SMTP. `flush_outbound_email` (run by the task worker)
+sends due messages in batches over a single backend connection and retries
+transient failures (4xx replies, dropped connections, timeouts) with backoff.
+"""
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import About, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def queue_mail(subject, body, to, *, from_email=None, reply_to=None):
+    email = OutboundEmail.objects.create(
+        subject=subject[:255], body=body, to=list(to), reply_to=list(reply_to or []),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+    transaction.on_commit(_schedule_flush)
+    return email
+
+
+def _schedule_flush():
+    from .tasks import send_queued_email
+
+    send_queued_email.enqueue(key=send_queued_email.name)
+
+
+def contact_notification_recipients():
+    """CONTACT_NOTIFICATION_EMAILS, or the hiring email of the About section."""
+    if settings.CONTACT_NOTIFICATION_EMAILS:
+        return list(settings.CONTACT_NOTIFICATION_EMAILS)
+    hiring_email = (
+        About.objects.exclude(hiring_email__isnull=True).exclude(hiring_email='')
+        .values_list('hiring_email', flat=True).first()
+    )
+    return [hiring_email] if hiring_email else []
+
+
+def notify_new_contact(contact):
+    recipients = contact_notification_recipients()
+    if not recipients:
+        return None
+    body = (
+        f"From: {contact.name or '-'} <{contact.email}>\n"
+        f"Subject: {contact.subject or '-'}\n"
+        f"Received: {contact.created_at:%Y-%m-%d %H:%M}\n\n"
+        f"{contact.message}\n"
+    )
+    return queue_mail(
+        subject=f"New contact message: {contact.subject or 'no subject'}",
+        body=body, to=recipients, reply_to=[contact.email],
+    )
+
+
+def _is_transient(exc):
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    # disconnects, refused connections and timeouts (SMTPException is an OSError too)
+    return isinstance(exc, OSError)
+
+
+def _backoff(attempts):
+    # 1, 2, 4, ... minutes, capped at one hour
+    return timedelta(minutes=min(2 ** max(attempts - 1, 0), 60))
+
+
+def _claim_batch(batch_size, lease):
+    """Lease up to `batch_size` due messages so concurrent senders never share work."""
+    now = timezone.now()
+    with transaction.atomic():
+        qs = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_QUEUED, send_after__lte=now)
+        if db_connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        ids = list(qs.order_by('send_after', 'id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        OutboundEmail.objects.filter(id__in=ids).update(send_after=now + lease)
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('send_after', 'id'))
+
+
+def _record_failure(email, exc, max_attempts):
+    attempts = email.attempts + 1
+    permanent = not _is_transient(exc) or attempts >= max_attempts
+    logger.warning("Sending email #%s failed (attempt %d, %s): %s", email.pk, attempts,
+                   'giving up' if permanent else 'will retry', exc)
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        attempts=F('attempts') + 1,
+        last_error=f"{type(exc).__name__}: {exc}"[:2000],
+        status=OutboundEmail.STATUS_FAILED if permanent else OutboundEmail.STATUS_QUEUED,
+        send_after=timezone.now() + _backoff(attempts),
+    )
+
+
+def flush_outbound_email(batch_size=None, max_attempts=None):
+    """Send one batch of due messages over one connection. Returns (sent, failed) counts."""
+    batch = _claim_batch(batch_size or settings.EMAIL_QUEUE_BATCH_SIZE, lease=timedelta(minutes=5))
+    if not batch:
+        return 0, 0
+    max_attempts = max_attempts or settings.EMAIL_MAX_ATTEMPTS
+
+    backend = get_connection(fail_silently=False)
+    is_open = False
+    sent = failed = 0
+    try:
+        for email in batch:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.to,
+                reply_to=email.reply_to or None, connection=backend,
+            )
+            try:
+                if not is_open:
+                    # an explicitly opened backend stays open across send() calls
+                    backend.open()
+                    is_open = True
+                message.send()
+            except Exception as exc:
+                failed += 1
+                _record_failure(email, exc, max_attempts)
+                if _is_transient(exc):
+                    backend.close()
+                    is_open = False
+                continue
+            OutboundEmail.objects.filter(pk=email.pk).update(
+                status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(), attempts=F('attempts') + 1, last_error='',
+            )
+            sent += 1
+    finally:
+        if is_open:
+            backend.close()
+    return sent, failed
@@ -0,0 +1,102 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadbench
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-benchmark the API in-process under WSGI and ASGI against the configured (seeded) database, "
+        "print latency percentiles, throughput and queries per route, and optionally save or compare baselines."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=[*loadbench.SERVERS, 'both'], default='both')
+        parser.add_argument('--requests', type=int, default=2000, help='Measured requests per server.')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent clients.')
+        parser.add_argument('--warmup', type=int, default=50, help='Unmeasured requests sent first.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the request sequence.')
+        parser.add_argument('--mix', default='',
+                            help=f"name=weight,... replacing the default mix; names: {', '.join(loadbench.MIX)}.")
+        parser.add_argument('--no-cache', action='store_true', help='Disable the public read cache.')
+        parser.add_argument('--output', help='Write the results (a baseline) to this JSON file.')
+        parser.add_argument('--baseline', help='Compare the results with this earlier JSON file.')
+        parser.add_argument('--diff', nargs=2, metavar=('BEFORE', 'AFTER'),
+                            help='Compare two saved results instead of running.')
+        parser.add_argument('--alpha', type=float, default=0.01, help='Significance level of the comparison.')
+        parser.add_argument('--threshold', type=float, default=0.05,
+                            help='Smallest median change, as a fraction, reported as a regression.')
+
+    def handle(self, *args, **options):
+        if options['diff']:
+            before, after = (self._load(path) for path in options['diff'])
+            return self._compare(before, after, options)
+
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING('DEBUG is on: every query is logged, latencies are inflated.'))
+        try:
+            weights = loadbench.parse_mix(options['mix']) if options['mix'] else None
+        except ValueError as exc:
+            raise CommandError(exc)
+        baseline = self._load(options['baseline']) if options['baseline'] else None
+        servers = loadbench.SERVERS if options['server'] == 'both' else (options['server'],)
+        try:
+            results = loadbench.run(
+                servers, weights, requests=options['requests'], clients=options['clients'], seed=options['seed'],
+                warmup=options['warmup'], cache=not options['no_cache'],
+            )
+        except ValueError as exc:
+            raise CommandError(f"{exc} Fill the database with `manage.py seed_bench_data` first.")
+
+        for server, result in results['servers'].items():
+            self._print(server, result)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            self._compare(baseline, results, options)
+
+    def _load(self, path):
+        try:
+            with open(path) as source:
+                results = json.load(source)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+        if results.get('version') != loadbench.FORMAT_VERSION:
+            raise CommandError(f"{path} is not a result file of this version of the benchmark.")
+        return results
+
+    def _print(self, server, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{server.upper()}: {result['throughput_rps']} req/s over {result['duration_s']}s"
+        ))
+        self.stdout.write(f"{'route':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'queries':>9}"
+                          f"{'errors':>8}")
+        for name, route in result['routes'].items():
+            self.stdout.write(
+                f"{name:<22}{route['requests']:>6}{route['p50_ms']:>10.2f}{route['p95_ms']:>10.2f}"
+                f"{route['p99_ms']:>10.2f}{route['rps']:>9.1f}{route['queries']:>9.1f}{route['errors']:>8}"
+            )
+
+    def _compare(self, before, after, options):
+        rows = loadbench.compare(before, after, alpha=options['alpha'], threshold=options['threshold'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Compared with {before['meta']['started_at']} ({before['meta']['git_commit'] or 'unknown commit'})"
+        ))
+        for row in rows:
+            line = (
+                f"{row['server']:<5} {row['route']:<22} p50 {row['p50_before_ms']:>9.2f} -> {row['p50_after_ms']:>9.2f} ms"
+                f" ({row['change']:+.1%}, p={row['p_value']:.3g})  queries {row['queries_before']:g} -> "
+                f"{row['queries_after']:g}"
+            )
+            if row['verdict'] == 'regression':
+                line = self.style.ERROR(f"{line}  REGRESSION")
+            elif row['verdict'] == 'improvement':
+                line = self.style.SUCCESS(f"{line}  improvement")
+            self.stdout.write(line)
+        regressions = sum(row['verdict'] == 'regression' for row in rows)
+        if regressions:
+            raise CommandError(f"{regressions} regression(s)")
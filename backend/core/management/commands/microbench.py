@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarking import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = "Run a registered micro-benchmark and print the time per iteration of each variant."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help=f"One of: {', '.join(sorted(BENCHMARKS))}.")
+        parser.add_argument('--iterations', type=int, default=500)
+
+    def handle(self, *args, **options):
+        func = BENCHMARKS.get(options['name'])
+        if func is None:
+            raise CommandError(f"Unknown benchmark {options['name']!r}; choose from {', '.join(sorted(BENCHMARKS))}.")
+        rows = func(options['iterations'])
+        width = max(len(label) for label, _ in rows)
+        for label, seconds in rows:
+            self.stdout.write(f"{label:<{width}} {seconds * 1e6:10.1f} µs/iter  ({seconds / rows[0][1]:.2f}x)")
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.assets import drain_asset_deletions
+
+
+class Command(BaseCommand):
+    help = "Destroy queued Cloudinary assets in batches (bulk delete_resources with retries)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Public ids per bulk delete call (max 100).')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting when it is empty.')
+        parser.add_argument('--interval', type=float, default=30.0, help='Seconds to sleep between polls with --loop.')
+
+    def handle(self, *args, **options):
+        total_deleted = total_failed = 0
+        while True:
+            deleted, failed = drain_asset_deletions(batch_size=options['batch_size'])
+            total_deleted += deleted
+            total_failed += failed
+            if deleted or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"{total_deleted} assets deleted, {total_failed} failures rescheduled."))
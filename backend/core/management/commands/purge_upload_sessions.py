@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.uploads import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete expired resumable upload sessions that were never attached, with their temporary files."
+
+    def handle(self, *args, **options):
+        count = purge_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(f"{count} expired upload sessions purged."))
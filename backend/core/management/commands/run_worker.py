@@ -0,0 +1,25 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core.taskqueue import Worker
+
+
+class Command(BaseCommand):
+    help = "Run background tasks from the database queue with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of worker threads.')
+        parser.add_argument('--poll-interval', type=float, default=None, help='Seconds to wait when no task is due.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is due instead of polling forever.')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=max(options['concurrency'], 1),
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+        )
+        # finish the running tasks, then exit
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        processed = worker.run()
+        self.stdout.write(self.style.SUCCESS(f"{processed} tasks processed."))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seeding import DEFAULT_SIZES, already_seeded, seed_bench_data, tag
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with deterministic fake skills, projects, posts, experiences and contact messages "
+        "for benchmarking. Use a dedicated database: the rows are not meant to be deleted one by one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Same seed and sizes, same rows.')
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiply every default size, e.g. 100 for about 30 million rows.')
+        for name, size in DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                                help=f'Number of rows (default {size} times --scale).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT and per transaction.')
+
+    def handle(self, *args, **options):
+        if already_seeded(options['seed']):
+            raise CommandError(f"Rows tagged {tag(options['seed'])} exist already; pass another --seed.")
+        sizes = {
+            name: options[name] if options[name] is not None else int(size * options['scale'])
+            for name, size in DEFAULT_SIZES.items()
+        }
+
+        def progress(step, seconds):
+            self.stdout.write(f"{step:<17} {sizes[step]:>10} {seconds:8.1f}s")
+
+        started = time.perf_counter()
+        counts = seed_bench_data(sizes, seed=options['seed'], batch_size=options['batch_size'], progress=progress)
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        for label, rows in sorted(counts.items()):
+            self.stdout.write(f"  {label:<30} {rows:>10}")
+        self.stdout.write(self.style.SUCCESS(f"{total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)"))
@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: the phases of a cold start up to the first response.
+PROBE = r'''
+import io, json, sys, time
+spawned = float(sys.argv[1])
+started = time.time()
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+application = WSGIHandler()
+t2 = time.perf_counter()
+host = next((h for h in settings.ALLOWED_HOSTS if h and '*' not in h and not h.startswith('.')), 'localhost')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[2], 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+    'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'SERVER_PROTOCOL': 'HTTP/1.1',
+    'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+}
+status = []
+b''.join(application(environ, lambda s, headers, exc_info=None: status.append(s)))
+t3 = time.perf_counter()
+print('STARTUP-PROFILE ' + json.dumps({
+    'interpreter': started - spawned,
+    'setup': t1 - t0, 'handler': t2 - t1, 'first_request': t3 - t2,
+    'total': time.time() - spawned, 'status': status[0],
+}))
+'''
+
+PHASES = [
+    ('interpreter', 'interpreter start'),
+    ('setup', 'django.setup() (settings, apps, models)'),
+    ('handler', 'WSGI handler (middleware)'),
+    ('first_request', 'first request (URLconf, views, query)'),
+    ('total', 'spawn to first response'),
+]
+
+
+def parse_importtime(stderr):
+    """Rows of (self us, cumulative us, depth, module) from ``-X importtime`` output, in print order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative), depth, name.strip()))
+    return rows
+
+
+def by_package(rows):
+    """Self time summed per top-level package, with the module that first imported it."""
+    totals = defaultdict(int)
+    importers = {}
+    # children are printed before their parent, so walk backwards to know the parents
+    stack = []
+    for self_us, _, depth, module in reversed(rows):
+        del stack[depth:]
+        package = module.split('.')[0]
+        totals[package] += self_us
+        if all(ancestor.split('.')[0] != package for ancestor in stack):
+            # outermost import of the package in this tree; the last one seen is the earliest
+            importers[package] = stack[-1] if stack else '(top level)'
+        stack.append(module)
+    return sorted(((us, package, importers.get(package, '')) for package, us in totals.items()), reverse=True)
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start time to the first response and the import cost per package, in fresh interpreters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/core/hero/', help="Path of the first request.")
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts to time; the best is reported.")
+        parser.add_argument('--top', type=int, default=20, help="Number of packages listed.")
+
+    def _spawn(self, path, importtime=False):
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join([str(settings.BASE_DIR), os.environ.get('PYTHONPATH', '')])}
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        args = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', PROBE]
+        result = subprocess.run(
+            [*args, repr(time.time()), path], capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+        )
+        for line in result.stdout.splitlines():
+            if line.startswith('STARTUP-PROFILE '):
+                return json.loads(line.split(' ', 1)[1]), result.stderr
+        raise CommandError(f"The probe process failed:\n{result.stderr[-2000:]}")
+
+    def handle(self, *args, **options):
+        runs = [self._spawn(options['path'])[0] for _ in range(max(options['runs'], 1))]
+        self.stdout.write(f"Cold start, GET {options['path']} ({runs[0]['status']}), best of {len(runs)} runs:")
+        for key, label in PHASES:
+            self.stdout.write(f"  {label:<42} {min(run[key] for run in runs) * 1000:8.1f} ms")
+
+        _, stderr = self._spawn(options['path'], importtime=True)
+        rows = parse_importtime(stderr)
+        packages = by_package(rows)
+        self.stdout.write(
+            f"\nImport time by package (-X importtime, self time), {len(rows)} modules, "
+            f"{sum(row[0] for row in rows) / 1000:.1f} ms in total:"
+        )
+        for self_us, package, importer in packages[:options['top']]:
+            self.stdout.write(f"  {package:<28} {self_us / 1000:8.1f} ms   imported by {importer}")
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.assets import enqueue_asset_deletions, referenced_public_ids
+from core.models import PendingAssetDeletion, StoredAsset
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile assets stored in Cloudinary with ProjectMedia, blog Image, HeroSection and About.cv "
+        "and report unreferenced ones; --delete queues them for deletion."
+    )
+
+    def add_arguments(self, parser):
+        # the Cloudinary account may hold assets of other apps: the scope is always explicit
+        parser.add_argument('--prefix', required=True,
+                            help="Only consider public ids starting with this prefix ('' for the whole account).")
+        parser.add_argument('--min-age', type=float, default=24.0,
+                            help='Ignore assets younger than this many hours (uploads still being attached).')
+        parser.add_argument('--dry-run', action='store_true', default=True,
+                            help='Report orphans without queueing them (the default).')
+        parser.add_argument('--delete', action='store_false', dest='dry_run',
+                            help='Queue the orphans for deletion.')
+
+    def _stored_assets(self, resource_type, prefix):
+        import cloudinary.api
+
+        cursor = None
+        while True:
+            options = {'type': 'upload', 'resource_type': resource_type, 'max_results': 500}
+            if prefix:
+                options['prefix'] = prefix
+            if cursor:
+                options['next_cursor'] = cursor
+            page = cloudinary.api.resources(**options)
+            yield from page.get('resources', [])
+            cursor = page.get('next_cursor')
+            if not cursor:
+                break
+
+    def handle(self, *args, **options):
+        referenced = set(referenced_public_ids())
+        queued = set(PendingAssetDeletion.objects.values_list('resource_type', 'public_id'))
+        cutoff = timezone.now() - timedelta(hours=options['min_age'])
+
+        total = 0
+        for resource_type in ('image', 'raw'):
+            orphans = []
+            for resource in self._stored_assets(resource_type, options['prefix']):
+                key = (resource_type, resource['public_id'])
+                if key in referenced or key in queued:
+                    continue
+                created_at = parse_datetime(resource.get('created_at') or '')
+                if created_at and created_at > cutoff:
+                    continue
+                orphans.append(resource['public_id'])
+            total += len(orphans)
+            for public_id in orphans:
+                self.stdout.write(f"orphan {resource_type}: {public_id}")
+            if orphans and not options['dry_run']:
+                # stale index entries would otherwise hand the deleted asset out again
+                StoredAsset.objects.filter(resource_type=resource_type, public_id__in=orphans).delete()
+                enqueue_asset_deletions(orphans, resource_type=resource_type)
+
+        verb = 'found' if options['dry_run'] else 'queued for deletion'
+        self.stdout.write(self.style.SUCCESS(f"{total} orphaned assets {verb}."))
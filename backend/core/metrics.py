@@ -0,0 +1,112 @@
+"""Prometheus metrics, aggregated across worker processes.
+
+Request metrics are labelled with the URL name of the route (e.g.
+``project-list``, ``post-detail``, ``contact_create``), never the raw path,
+and recorded by core.instrumentation.RequestTimingMiddleware:
+request counts by status, latency and SQL query count histograms. Caches
+count their hits and misses with `count_cache`. Queue depths are read from
+the database when /metrics is scraped.
+
+With several worker processes (gunicorn), set PROMETHEUS_MULTIPROC_DIR to
+an empty directory shared by the workers, cleared before the server
+starts: each process then writes its samples to memory-mapped files there
+and the endpoint sums them, including the counts of workers that have
+since exited. Without it, only the metrics of the serving process are
+exposed.
+"""
+import os
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseNotFound
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+REQUESTS = Counter(
+    'portfolio_http_requests_total', 'HTTP requests by route, method and status.', ['route', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'portfolio_http_request_duration_seconds', 'Time to produce the response, by route.', ['route', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+QUERIES = Histogram(
+    'portfolio_http_request_db_queries', 'SQL queries per request, by route.', ['route'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+CACHE = Counter('portfolio_cache_requests_total', 'Cache lookups by cache and result.', ['cache', 'result'])
+
+
+def route(request):
+    match = getattr(request, 'resolver_match', None)
+    # unresolved paths share one label so that scans cannot create series
+    return match.view_name if match is not None and match.view_name else 'unresolved'
+
+
+def record_request(request, status, seconds, queries):
+    name = route(request)
+    REQUESTS.labels(name, request.method, str(status)).inc()
+    LATENCY.labels(name, request.method).observe(seconds)
+    QUERIES.labels(name).observe(queries)
+
+
+def count_cache(cache, hit):
+    CACHE.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+class QueueCollector:
+    """Depth of the background queues, read from the database at scrape time."""
+
+    def collect(self):
+        from .models import OutboundEmail, PendingAssetDeletion
+        from .taskqueue import queue_stats
+
+        stats = queue_stats()
+        tasks = GaugeMetricFamily('portfolio_task_queue_tasks', 'Background tasks by status.', labels=['status'])
+        for status, count in stats['counts'].items():
+            tasks.add_metric([status], count)
+        yield tasks
+        yield GaugeMetricFamily('portfolio_task_queue_due', 'Queued tasks whose run time has come.', value=stats['due'])
+        yield GaugeMetricFamily(
+            'portfolio_task_queue_oldest_due_seconds', 'Age of the oldest due task.', value=stats['oldest_due_seconds'],
+        )
+        emails = dict(OutboundEmail.objects.values_list('status').annotate(n=Count('id')).order_by())
+        yield GaugeMetricFamily(
+            'portfolio_outbound_email_queued', 'Emails waiting to be sent.', value=emails.get(OutboundEmail.STATUS_QUEUED, 0),
+        )
+        yield GaugeMetricFamily(
+            'portfolio_asset_deletions_pending', 'Cloudinary assets queued for deletion.',
+            value=PendingAssetDeletion.objects.count(),
+        )
+
+
+class _ProcessMetrics:
+    """The default registry's metrics, for a registry that also holds the per-scrape collectors."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def _registry():
+    registry = CollectorRegistry()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(_ProcessMetrics())
+    registry.register(QueueCollector())
+    return registry
+
+
+def metrics_view(request):
+    """Prometheus text format; requires ``Authorization: Bearer <METRICS_TOKEN>``, and 404s without a token configured."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        return HttpResponseNotFound()
+    if not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        response = HttpResponse('Unauthorized', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
+
@@ -0,0 +1,112 @@
+"""Path-aware middleware.
+
+The API authenticates with JWT only, so sessions, CSRF, messages,
+`request.user` from the session and axes are dead weight on ``/api/``
+routes. `StatefulMiddlewareStack` sits in MIDDLEWARE in place of those
+middleware and runs the ones listed in STATEFUL_MIDDLEWARE for every path
+except the STATELESS_PATH_PREFIXES. Other paths get the same behaviour as
+if they were listed in MIDDLEWARE directly, hooks (process_view,
+process_exception, process_template_response) included.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+def is_stateless(request):
+    return request.path_info.startswith(tuple(settings.STATELESS_PATH_PREFIXES))
+
+
+class StatefulMiddlewareStack:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self._build(settings.STATEFUL_MIDDLEWARE)
+        if self.is_async:
+            self.process_view = self._aprocess_view
+        else:
+            self.process_view = self._process_view
+        # the exception-handling stack is always synchronous in Django
+        self.process_exception = self._process_exception
+        self.process_template_response = self._process_template_response
+
+    def _build(self, middleware_paths):
+        """Chain the inner middleware the way BaseHandler.load_middleware does."""
+        adapt = BaseHandler().adapt_method_mode
+        self._view_hooks, self._template_hooks, self._exception_hooks = [], [], []
+        handler, handler_is_async = self.get_response, self.is_async
+        for path in reversed(middleware_paths):
+            middleware = import_string(path)
+            can_sync = getattr(middleware, 'sync_capable', True)
+            can_async = getattr(middleware, 'async_capable', False)
+            middleware_is_async = False if (not handler_is_async and can_sync) else can_async
+            adapted = adapt(middleware_is_async, handler, handler_is_async, debug=settings.DEBUG, name=f"middleware {path}")
+            try:
+                instance = middleware(adapted)
+            except MiddlewareNotUsed:
+                continue
+            if instance is None:
+                raise ImproperlyConfigured(f"Middleware factory {path} returned None.")
+            if hasattr(instance, 'process_view'):
+                self._view_hooks.insert(0, adapt(self.is_async, instance.process_view))
+            if hasattr(instance, 'process_template_response'):
+                self._template_hooks.append(adapt(self.is_async, instance.process_template_response))
+            if hasattr(instance, 'process_exception'):
+                self._exception_hooks.append(adapt(False, instance.process_exception))
+            handler = convert_exception_to_response(instance)
+            handler_is_async = middleware_is_async
+        self._chain = adapt(self.is_async, handler, handler_is_async)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if is_stateless(request):
+            return self.get_response(request)
+        return self._chain(request)
+
+    async def __acall__(self, request):
+        if is_stateless(request):
+            return await self.get_response(request)
+        return await self._chain(request)
+
+    def _process_view(self, request, view_func, view_args, view_kwargs):
+        if is_stateless(request):
+            return None
+        for hook in self._view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if is_stateless(request):
+            return None
+        for hook in self._view_hooks:
+            response = await hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def _process_exception(self, request, exception):
+        if is_stateless(request):
+            return None
+        for hook in self._exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    def _process_template_response(self, request, response):
+        if is_stateless(request):
+            return response
+        for hook in self._template_hooks:
+            response = hook(request, response)
+        return response
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_about_hiring_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAssetDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.CharField(max_length=255)),
+                ('resource_type', models.CharField(default='image', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['next_attempt_at'],
+                'constraints': [models.UniqueConstraint(fields=('public_id', 'resource_type'), name='unique_pending_asset_deletion')],
+            },
+        ),
+    ]
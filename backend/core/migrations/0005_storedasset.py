@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_pendingassetdeletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_type', models.CharField(default='image', max_length=20)),
+                ('digest', models.CharField(max_length=64)),
+                ('public_id', models.CharField(max_length=255)),
+                ('version', models.CharField(blank=True, max_length=30)),
+                ('format', models.CharField(blank=True, max_length=20)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('resource_type', 'digest'), name='unique_stored_asset_digest'), models.UniqueConstraint(fields=('resource_type', 'public_id'), name='unique_stored_asset_public_id')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['created_at'], name='contact_unread_idx'),
+        ),
+    ]
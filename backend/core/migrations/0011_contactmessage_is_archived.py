@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_contactmessage_unread_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactmessage',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_contactmessage_is_archived'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('statement', models.TextField()),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('total_ms', models.FloatField()),
+                ('max_ms', models.FloatField()),
+                ('view', models.CharField(blank=True, max_length=200)),
+                ('frame', models.CharField(max_length=500)),
+                ('sql', models.TextField()),
+                ('params', models.TextField(blank=True)),
+                ('plan', models.TextField(blank=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-total_ms'],
+            },
+        ),
+    ]
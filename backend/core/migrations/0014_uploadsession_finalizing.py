@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_ratelimit_cache_table'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Uploading'), ('finalizing', 'Finalizing'), ('complete', 'Complete'), ('attached', 'Attached')], default='uploading', max_length=20),
+        ),
+    ]
@@ -1,7 +1,11 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from cloudinary.models import CloudinaryField
-from cloudinary_storage.storage import RawMediaCloudinaryStorage
+
+from .storage import RawMediaStorage
 
 
 class HeroSection(models.Model):
@@ -34,7 +38,7 @@ class HeroSection(models.Model):
 class About(models.Model):
 	title = models.CharField(max_length=200, default='About')
 	description = models.TextField(blank=True)
-	cv = models.FileField(storage=RawMediaCloudinaryStorage(), blank=True, null=True)  # Suppression de l'argument incorrect
+	cv = models.FileField(storage=RawMediaStorage(), blank=True, null=True)  # Suppression de l'argument incorrect
 	hiring_email = models.EmailField(blank=True, null=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
@@ -59,6 +63,240 @@ class ContactMessage(models.Model):
 	message = models.TextField()
 	created_at = models.DateTimeField(default=timezone.now)
 	is_read = models.BooleanField(default=False)
+	is_archived = models.BooleanField(default=False)
+
+	class Meta:
+		indexes = [
+			# small partial index: the admin badge only ever counts unread messages
+			models.Index(fields=['created_at'], condition=models.Q(is_read=False), name='contact_unread_idx'),
+		]
 
 	def __str__(self):
 		return f"{self.email} - {self.subject or 'no-subject'}"
+
+
+class PendingAssetDeletion(models.Model):
+	"""A remote (Cloudinary) asset waiting to be destroyed.
+
+	Rows are written in the same transaction as the database delete that
+	orphaned the asset and drained in batches by `process_asset_deletions`.
+	"""
+	public_id = models.CharField(max_length=255)
+	resource_type = models.CharField(max_length=20, default='image')
+	attempts = models.PositiveSmallIntegerField(default=0)
+	last_error = models.TextField(blank=True)
+	next_attempt_at = models.DateTimeField(default=timezone.now)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['next_attempt_at']
+		constraints = [
+			models.UniqueConstraint(fields=['public_id', 'resource_type'], name='unique_pending_asset_deletion')
+		]
+
+	def __str__(self):
+		return f"{self.resource_type}:{self.public_id}"
+
+
+class StoredAsset(models.Model):
+	"""Content-addressed index of uploaded assets.
+
+	Identical uploads (same SHA-256 digest) share one Cloudinary asset;
+	`ref_count` tracks how many rows point at it so the asset is only queued
+	for deletion when the last reference goes away.
+	"""
+	resource_type = models.CharField(max_length=20, default='image')
+	digest = models.CharField(max_length=64)
+	public_id = models.CharField(max_length=255)
+	version = models.CharField(max_length=30, blank=True)
+	format = models.CharField(max_length=20, blank=True)
+	size = models.PositiveBigIntegerField(default=0)
+	ref_count = models.PositiveIntegerField(default=1)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['resource_type', 'digest'], name='unique_stored_asset_digest'),
+			models.UniqueConstraint(fields=['resource_type', 'public_id'], name='unique_stored_asset_public_id'),
+		]
+
+	def __str__(self):
+		return f"{self.resource_type}:{self.public_id} ({self.ref_count})"
+
+
+class UploadSession(models.Model):
+	"""A resumable, chunked upload.
+
+	Chunks are appended to a temporary file on disk (see core/uploads.py);
+	once finalized the file is stored like any other upload and the session
+	can be attached to a ProjectMedia, blog Image, HeroSection or About row by id.
+	"""
+	STATUS_UPLOADING = 'uploading'
+	STATUS_FINALIZING = 'finalizing'
+	STATUS_COMPLETE = 'complete'
+	STATUS_ATTACHED = 'attached'
+	STATUS_CHOICES = [
+		(STATUS_UPLOADING, 'Uploading'),
+		(STATUS_FINALIZING, 'Finalizing'),
+		(STATUS_COMPLETE, 'Complete'),
+		(STATUS_ATTACHED, 'Attached'),
+	]
+	KIND_CHOICES = [
+		('image', 'Image'),
+		('raw', 'File'),
+	]
+
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='image')
+	filename = models.CharField(max_length=255)
+	content_type = models.CharField(max_length=100, blank=True)
+	size = models.PositiveBigIntegerField()
+	sha256 = models.CharField(max_length=64)
+	received = models.PositiveBigIntegerField(default=0)
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+	stored_value = models.CharField(max_length=255, blank=True)
+	created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+	created_at = models.DateTimeField(auto_now_add=True)
+	expires_at = models.DateTimeField()
+
+	class Meta:
+		ordering = ['-created_at']
+
+	def __str__(self):
+		return f"{self.filename} ({self.received}/{self.size})"
+
+
+class IdempotencyKey(models.Model):
+	"""Outcome of a request sent with an ``Idempotency-Key`` header.
+
+	A row is inserted (status in_progress) before the view runs; concurrent
+	duplicates wait for it and later retries replay the stored response.
+	"""
+	STATUS_IN_PROGRESS = 'in_progress'
+	STATUS_COMPLETED = 'completed'
+	STATUS_CHOICES = [
+		(STATUS_IN_PROGRESS, 'In progress'),
+		(STATUS_COMPLETED, 'Completed'),
+	]
+
+	scope = models.CharField(max_length=255)
+	key = models.CharField(max_length=255)
+	fingerprint = models.CharField(max_length=64)
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_IN_PROGRESS)
+	status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+	response_body = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	expires_at = models.DateTimeField()
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key_per_scope')
+		]
+		indexes = [models.Index(fields=['expires_at'])]
+
+	def __str__(self):
+		return f"{self.scope} {self.key} ({self.status})"
+
+
+class Task(models.Model):
+	"""A unit of background work, run by `manage.py run_worker` (see core/taskqueue.py).
+
+	Workers claim due rows (highest priority first) with SELECT ... FOR UPDATE
+	SKIP LOCKED where the database supports it. Failed runs are retried with
+	backoff until max_attempts, after which the task is parked as dead.
+	"""
+	STATUS_QUEUED = 'queued'
+	STATUS_RUNNING = 'running'
+	STATUS_SUCCEEDED = 'succeeded'
+	STATUS_DEAD = 'dead'
+	STATUS_CHOICES = [
+		(STATUS_QUEUED, 'Queued'),
+		(STATUS_RUNNING, 'Running'),
+		(STATUS_SUCCEEDED, 'Succeeded'),
+		(STATUS_DEAD, 'Dead'),
+	]
+
+	name = models.CharField(max_length=200)
+	args = models.JSONField(default=list, blank=True)
+	kwargs = models.JSONField(default=dict, blank=True)
+	# at most one queued/running task per key: used to coalesce repeated enqueues
+	key = models.CharField(max_length=200, null=True, blank=True)
+	priority = models.SmallIntegerField(default=0)
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+	attempts = models.PositiveIntegerField(default=0)
+	max_attempts = models.PositiveIntegerField(default=5)
+	run_at = models.DateTimeField(default=timezone.now)
+	locked_at = models.DateTimeField(null=True, blank=True)
+	locked_by = models.CharField(max_length=200, blank=True)
+	last_error = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	finished_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		ordering = ['-priority', 'run_at', 'id']
+		constraints = [
+			models.UniqueConstraint(
+				fields=['key'], condition=models.Q(status__in=['queued', 'running']),
+				name='unique_active_task_key',
+			)
+		]
+		indexes = [models.Index(fields=['status', 'run_at'])]
+
+	def __str__(self):
+		return f"{self.name} ({self.status})"
+
+
+class OutboundEmail(models.Model):
+	"""An email waiting to be sent by the background sender (see core/mail.py)."""
+	STATUS_QUEUED = 'queued'
+	STATUS_SENT = 'sent'
+	STATUS_FAILED = 'failed'
+	STATUS_CHOICES = [
+		(STATUS_QUEUED, 'Queued'),
+		(STATUS_SENT, 'Sent'),
+		(STATUS_FAILED, 'Failed'),
+	]
+
+	subject = models.CharField(max_length=255)
+	body = models.TextField()
+	from_email = models.CharField(max_length=255)
+	to = models.JSONField(default=list)
+	reply_to = models.JSONField(default=list, blank=True)
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+	attempts = models.PositiveIntegerField(default=0)
+	last_error = models.TextField(blank=True)
+	send_after = models.DateTimeField(default=timezone.now)
+	created_at = models.DateTimeField(auto_now_add=True)
+	sent_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		ordering = ['created_at']
+		indexes = [models.Index(fields=['status', 'send_after'])]
+
+	def __str__(self):
+		return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class SlowQuery(models.Model):
+	"""Queries over SLOW_QUERY_THRESHOLD_MS sharing a fingerprint (see core/slow_queries.py).
+
+	The sample columns hold the latest occurrence.
+	"""
+	fingerprint = models.CharField(max_length=40, unique=True)
+	statement = models.TextField()  # normalized SQL
+	count = models.PositiveIntegerField(default=1)
+	total_ms = models.FloatField()
+	max_ms = models.FloatField()
+	view = models.CharField(max_length=200, blank=True)
+	frame = models.CharField(max_length=500)
+	sql = models.TextField()
+	params = models.TextField(blank=True)
+	plan = models.TextField(blank=True)
+	first_seen = models.DateTimeField(auto_now_add=True)
+	last_seen = models.DateTimeField(default=timezone.now)
+
+	class Meta:
+		ordering = ['-total_ms']
+
+	def __str__(self):
+		return f"{self.statement[:80]} ({self.count}x)"
@@ -0,0 +1,218 @@
+"""Detection of N+1 queries: relations lazy-loaded once per item of a list.
+
+While detection is on (N_PLUS_ONE_DETECTION, see below), an execute wrapper
+looks at the stack of every SELECT issued during a request. A query run
+from a serializer field of an item of a list serialization (a nested
+``many=True`` serializer, or the serializer of a list response) is a lazy
+load: it will run again for every other item. It is attributed to
+
+- the serializer field whose value needed it, e.g.
+  ``ProjectSkillRefSerializer.skill_reference``;
+- the model relation behind that field, e.g. ``ProjectSkillRef.skill_reference``;
+- the lookup path from the serialized queryset, from which the missing
+  call is named: ``select_related()`` when every step is a forward
+  foreign key or one-to-one, ``prefetch_related()`` otherwise.
+
+Lazy loads are grouped by field and by statement, with literals replaced
+as in core/slow_queries.py, so that the loads of every item count as one.
+In ``warn`` mode each group is logged once, with its count, on the
+``core.nplusone`` logger when the response is produced; in ``raise`` mode
+the first lazy load raises `NPlusOneError` from the query, so the
+traceback shows where it happened. Lists built from core/projections.py
+read their relations with one query each and are never flagged.
+
+The default is ``warn`` with DEBUG, ``raise`` while running the tests, and
+off otherwise, where the wrapper costs a context variable lookup per query.
+`detect()` turns detection on around any block, e.g. in a shell.
+"""
+import logging
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import ListSerializer, Serializer
+
+from .slow_queries import normalize
+
+logger = logging.getLogger(__name__)
+
+MODES = ('warn', 'raise')
+
+_detector = ContextVar('nplusone_detector', default=None)
+
+_SERIALIZER = Serializer.to_representation.__code__
+_LIST_SERIALIZER = ListSerializer.to_representation.__code__
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def _relation(model, name):
+    """The relation of `model` reached through the attribute `name`, or None."""
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+        accessor = field.get_accessor_name() if field.auto_created and not field.concrete else field.name
+        if accessor == name:
+            return field
+    return None
+
+
+def _relations(steps):
+    """(model, attribute, relation) from the serialized queryset to the innermost field, or None.
+
+    `steps` are the (serializer, field, instance) of the Serializer frames,
+    innermost first. The innermost field may end with a plain attribute
+    (``source='skill_reference.name'``); every other attribute must be a relation.
+    """
+    relations = []
+    for depth, (_, field, instance) in enumerate(reversed(steps), start=1):
+        model = type(instance)
+        if not field.source_attrs or not hasattr(model, '_meta'):
+            return None
+        found = False
+        for attribute in field.source_attrs:
+            relation = _relation(model, attribute)
+            if relation is None:
+                if depth == len(steps) and found:
+                    break
+                return None
+            relations.append((model, attribute, relation))
+            model = relation.related_model
+            found = True
+    return relations
+
+
+def _single(relation):
+    return relation.many_to_one or (relation.one_to_one and relation.concrete)
+
+
+class LazyLoad:
+    """Where a lazy load comes from, read from the stack of its query."""
+    __slots__ = ('field', 'relation', 'path', 'single')
+
+    def __init__(self, field, relation, path, single):
+        self.field = field  # 'Serializer.field'
+        self.relation = relation  # 'Model.attribute', or None when the field is not a relation
+        self.path = path  # lookup from the serialized queryset, or None
+        self.single = single
+
+    @classmethod
+    def find(cls, frame):
+        """The lazy load the query issued under `frame` is, or None if it is not one."""
+        steps = []  # (serializer, field, instance) of the enclosing Serializer frames, innermost first
+        in_list = False
+        while frame is not None:
+            if frame.f_code is _SERIALIZER and 'field' in frame.f_locals:
+                steps.append((frame.f_locals['self'], frame.f_locals['field'], frame.f_locals['instance']))
+            elif frame.f_code is _LIST_SERIALIZER and steps:
+                in_list = True
+            frame = frame.f_back
+        if not in_list:
+            return None
+
+        serializer, field, _ = steps[0]
+        name = f'{type(serializer).__name__}.{field.field_name}'
+        relations = _relations(steps)
+        if not relations:  # e.g. a SerializerMethodField, or a property
+            return cls(name, None, None, False)
+        owner, attribute, _ = relations[-1]
+        return cls(
+            name, f'{owner.__name__}.{attribute}', '__'.join(attribute for _, attribute, _ in relations),
+            all(_single(relation) for *_, relation in relations),
+        )
+
+    def advice(self):
+        if self.path is None:
+            return 'read what it needs with select_related()/prefetch_related() on the queryset'
+        call = 'select_related' if self.single else 'prefetch_related'
+        return f"add {call}('{self.path}') to the queryset"
+
+    def describe(self, count, statement):
+        loads = f'lazy-loads {self.relation}' if self.relation else 'queries'
+        queries = f'{count} query' if count == 1 else f'{count} queries'
+        return f'N+1: {self.field} {loads} for each item of a list ({queries}: {statement}); {self.advice()}'
+
+
+class _Detector:
+    def __init__(self, mode):
+        self.mode = mode
+        self.groups = {}  # (field, relation, path, statement): [LazyLoad, count]
+
+    def seen(self, load, sql):
+        statement = normalize(sql)
+        group = self.groups.setdefault((load.field, load.relation, load.path, statement), [load, 0])
+        group[1] += 1
+        if self.mode == 'raise':
+            raise NPlusOneError(load.describe(group[1], statement))
+
+    def report(self):
+        for (*_, statement), (load, count) in self.groups.items():
+            logger.warning(load.describe(count, statement))
+
+
+def _watch_query(execute, sql, params, many, context):
+    detector = _detector.get()
+    if detector is not None and sql.lstrip()[:6].upper() == 'SELECT':
+        load = LazyLoad.find(sys._getframe(1))
+        if load is not None:
+            detector.seen(load, sql)
+    return execute(sql, params, many, context)
+
+
+def install_query_watch(connection, **kwargs):
+    if _watch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_watch_query)
+
+
+connection_created.connect(install_query_watch, dispatch_uid='nplusone-queries')
+
+
+@contextmanager
+def detect(mode='warn'):
+    """Watch the queries of the block for lazy loads in lists; yields the groups found."""
+    if mode not in MODES:
+        raise ValueError(f'N+1 detection mode must be one of {", ".join(MODES)}, not {mode!r}')
+    # connections opened before this module was imported have no watch yet
+    for connection in connections.all(initialized_only=True):
+        install_query_watch(connection)
+    detector = _Detector(mode)
+    token = _detector.set(detector)
+    try:
+        yield detector.groups
+    finally:
+        _detector.reset(token)
+    if mode == 'warn':
+        detector.report()
+
+
+class NPlusOneMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.N_PLUS_ONE_DETECTION:
+            return self.get_response(request)
+        with detect(settings.N_PLUS_ONE_DETECTION):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not settings.N_PLUS_ONE_DETECTION:
+            return await self.get_response(request)
+        with detect(settings.N_PLUS_ONE_DETECTION):
+            return await self.get_response(request)
@@ -0,0 +1,207 @@
+"""On-demand profiling of single requests, for superusers.
+
+A superuser adds ``?_profile=1`` to any request, or sends ``X-Profile: 1``,
+and gets back the cProfile report of that request as text instead of the
+response: the view, serializers, ORM queries, Cloudinary calls and the
+rendering, sorted by cumulative time (``_profile=tottime`` or ``calls`` for
+another order). The status of the real response is in
+``X-Profiled-Status``. With PROFILE_DIR set, the raw stats are also saved
+there (named in ``X-Profile-File``) to be compared later with
+``python -m pstats`` or snakeviz.
+
+``_profile=memory`` measures memory instead, with tracemalloc: the peak of
+the Python heap above its level at the start of the request, and the
+allocation sites of what is still held when the response is ready (the
+rows, serialized data and rendered body of a list), by size. The peak is in
+``X-Peak-Memory`` (bytes), and the snapshot is saved to PROFILE_DIR as a
+``.snapshot`` file for ``tracemalloc.Snapshot.load``. tracemalloc counts the
+allocations of every thread, so measure on an otherwise idle worker. It
+follows Python allocations, not the RSS of the process, which never goes
+down and so cannot be measured per request.
+
+The flag is honoured only once the session or JWT of the request is
+checked to be a superuser's; anyone else gets the normal response. Without
+the flag the middleware costs a header lookup and a substring test of the
+query string. Under ASGI the profiled request runs in one thread, which
+also runs its sync code (DRF views, ORM), so the report covers the same
+frames as under WSGI.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sysconfig
+import tracemalloc
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.authentication import ClaimsJWTAuthentication
+
+from .metrics import route
+
+SORT_KEYS = ('cumulative', 'tottime', 'calls')
+REPORT_LINES = 80
+MEMORY = 'memory'
+MEMORY_SITES = 25
+
+
+def _flag(request):
+    value = request.META.get('HTTP_X_PROFILE')
+    if value is None and '_profile=' in request.META.get('QUERY_STRING', ''):
+        value = request.GET.get('_profile')
+    return value
+
+
+def _is_superuser(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:  # session, outside the API
+        return user.is_superuser
+    try:
+        authenticated = ClaimsJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_superuser
+
+
+def _relative(text):
+    # paths relative to the project, to site-packages and to the standard library
+    paths = sysconfig.get_paths()
+    for prefix in (str(settings.BASE_DIR), paths['purelib'], paths['stdlib']):
+        text = text.replace(os.path.join(prefix, ''), '')
+    return text
+
+
+def _report(profiler, sort):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(REPORT_LINES)
+    return _relative(stream.getvalue())
+
+
+def _save(request, extension, dump):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = f"{timezone.now():%Y%m%dT%H%M%S%f}-{route(request)}-{request.method}.{extension}"
+    dump(os.path.join(settings.PROFILE_DIR, name))
+    return name
+
+
+def _consume(response):
+    if response.streaming and not response.is_async:
+        for _ in response.streaming_content:
+            pass
+
+
+def _text_report(request, response, text):
+    report = HttpResponse(
+        f'{request.method} {request.get_full_path()} -> {response.status_code}\n\n{text}',
+        content_type='text/plain; charset=utf-8',
+    )
+    report['X-Profiled-Status'] = str(response.status_code)
+    report['Cache-Control'] = 'no-store'
+    return report
+
+
+def profile(request, get_response, flag):
+    """The report of ``get_response(request)`` run under cProfile."""
+    sort = flag if flag in SORT_KEYS else SORT_KEYS[0]
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = get_response(request)
+        _consume(response)
+    finally:
+        profiler.disable()
+    response.close()
+    report = _text_report(request, response, _report(profiler, sort))
+    if settings.PROFILE_DIR:
+        report['X-Profile-File'] = _save(request, 'prof', profiler.dump_stats)
+    return report
+
+
+def trace_memory(call, *args):
+    """Run ``call(*args)`` under tracemalloc; returns (result, peak bytes, snapshot).
+
+    The peak is counted from the heap level at the start of the call; the
+    snapshot is taken when the call returns, with its result still alive.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        result = call(*args)
+        peak = tracemalloc.get_traced_memory()[1] - start
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return result, peak, snapshot
+
+
+def _size(count):
+    return f'{count / 1024 ** 2:.2f} MiB' if count >= 1024 ** 2 else f'{count / 1024:.1f} KiB'
+
+
+def _memory_report(peak, snapshot):
+    statistics = snapshot.statistics('lineno')
+    lines = [
+        f'Peak: {_size(peak)} above the start of the request',
+        f'Held at the end: {_size(sum(stat.size for stat in statistics))} '
+        f'in {sum(stat.count for stat in statistics)} blocks',
+        '',
+        f'Top {MEMORY_SITES} allocation sites still held at the end of the request:',
+    ]
+    for stat in statistics[:MEMORY_SITES]:
+        frame = stat.traceback[0]
+        lines.append(f'{_size(stat.size):>12} {stat.count:>8} blocks  {frame.filename}:{frame.lineno}')
+    return _relative('\n'.join(lines) + '\n')
+
+
+def profile_memory(request, get_response, flag=MEMORY):
+    """The tracemalloc report of ``get_response(request)``."""
+    def respond():
+        response = get_response(request)
+        _consume(response)
+        return response
+
+    response, peak, snapshot = trace_memory(respond)
+    response.close()
+    report = _text_report(request, response, _memory_report(peak, snapshot))
+    report['X-Peak-Memory'] = str(peak)
+    if settings.PROFILE_DIR:
+        report['X-Profile-File'] = _save(request, 'snapshot', snapshot.dump)
+    return report
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        flag = _flag(request)
+        if flag is None or not _is_superuser(request):
+            return self.get_response(request)
+        return (profile_memory if flag == MEMORY else profile)(request, self.get_response, flag)
+
+    async def __acall__(self, request):
+        flag = _flag(request)
+        if flag is None or not await sync_to_async(_is_superuser)(request):
+            return await self.get_response(request)
+        # the thread running the profiler also runs the request's thread-sensitive sync code
+        run = profile_memory if flag == MEMORY else profile
+        return await sync_to_async(run)(request, async_to_sync(self.get_response), flag)
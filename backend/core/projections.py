@@ -0,0 +1,119 @@
+"""Read-only list representations built from ``values_list()`` rows.
+
+A `Projection` produces the same dicts as a read-only ModelSerializer
+without instantiating models or serializer fields per row. It reads the
+parent rows with one ``values_list()`` query and each `Nested` relation with
+one more query for all the parents, grouped by parent id. Values are
+converted with the DRF field the serializer declares (e.g. DateTimeField),
+so the output is identical and the renderer produces the same bytes.
+Relations without a Meta ordering are read with the same unordered query
+prefetch_related() would run.
+
+Viewsets use it for their list action through `ProjectionListMixin`. Keep
+a projection next to the serializer it mirrors and covered by a test
+comparing the two.
+"""
+from collections import defaultdict
+
+from django.db.models import QuerySet
+from rest_framework.response import Response
+
+
+class Nested:
+    """The related rows of `queryset` whose `parent` lookup matches the parent's pk, as a list of dicts."""
+
+    def __init__(self, queryset, parent, fields):
+        self.queryset = queryset
+        self.parent = parent
+        self.projection = Projection(fields)
+
+    def _query(self, parent_ids):
+        return self.projection.rows(self.queryset.filter(**{f'{self.parent}__in': parent_ids}), self.parent)
+
+    def group(self, parent_ids):
+        """Dicts per parent id."""
+        rows = list(self._query(parent_ids))
+        return self._grouped(rows, self.projection._children(rows))
+
+    async def agroup(self, parent_ids):
+        rows = [row async for row in self._query(parent_ids)]
+        return self._grouped(rows, await self.projection._achildren(rows))
+
+    def _grouped(self, rows, children):
+        groups = defaultdict(list)
+        for item, row in zip(self.projection._build(rows, children), rows):
+            groups[row[-1]].append(item)
+        return groups
+
+
+class Projection:
+    """Dicts with the keys of `fields`, in order.
+
+    Each field is a (key, spec) pair where spec is a ``values_list()``
+    lookup, a (lookup, convert) pair whose `convert` is applied to non-null
+    values, or a `Nested` relation.
+    """
+
+    def __init__(self, fields):
+        self.columns = []
+        self.plan = []
+        self.nested = []
+        for key, spec in fields:
+            if isinstance(spec, Nested):
+                self.plan.append((key, None, None, spec))
+                self.nested.append(spec)
+                continue
+            lookup, convert = (spec, None) if isinstance(spec, str) else spec
+            self.plan.append((key, len(self.columns), convert, None))
+            self.columns.append(lookup)
+
+    def rows(self, queryset, *extra):
+        """The ``values_list()`` queryset serialize() takes; sliceable, so it can be paginated."""
+        return queryset.prefetch_related(None).values_list(*self.columns, 'pk', *extra)
+
+    def serialize(self, rows):
+        """The dicts for `rows`: the queryset from rows() or a page of it."""
+        rows = list(rows)
+        return self._build(rows, self._children(rows))
+
+    async def aserialize(self, rows):
+        if isinstance(rows, QuerySet):
+            rows = [row async for row in rows]
+        return self._build(rows, await self._achildren(rows))
+
+    def _pks(self, rows):
+        return [row[len(self.columns)] for row in rows]
+
+    def _children(self, rows):
+        pks = self._pks(rows)
+        return {nested: nested.group(pks) for nested in self.nested} if pks else {}
+
+    async def _achildren(self, rows):
+        pks = self._pks(rows)
+        return {nested: await nested.agroup(pks) for nested in self.nested} if pks else {}
+
+    def _build(self, rows, children):
+        pk = len(self.columns)
+        items = []
+        for row in rows:
+            item = {}
+            for key, index, convert, nested in self.plan:
+                if nested is not None:
+                    item[key] = children[nested].get(row[pk], [])
+                    continue
+                value = row[index]
+                item[key] = value if value is None or convert is None else convert(value)
+            items.append(item)
+        return items
+
+
+class ProjectionListMixin:
+    """A viewset list action serialized by `list_projection`; filtering and pagination are unchanged."""
+    list_projection = None
+
+    def list(self, request, *args, **kwargs):
+        rows = self.list_projection.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.list_projection.serialize(page))
+        return Response(self.list_projection.serialize(rows))
@@ -0,0 +1,41 @@
+"""JSON renderer backed by orjson when it is installed.
+
+`FastJSONRenderer` returns the bytes DRF's JSONRenderer returns for the same
+data: compact separators, UTF-8 output, U+2028/U+2029 escaped, and types
+orjson does not handle itself (datetimes, Decimal, lazy strings, querysets)
+converted by DRF's encoder. Anything orjson refuses (non-string keys,
+integers beyond 64 bits) and indented output go to the stdlib renderer.
+Floats are the one difference: orjson writes 1e16 where json writes 1e+16,
+and null for NaN; no public field is a float.
+"""
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib renderer is used
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
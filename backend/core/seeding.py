@@ -0,0 +1,260 @@
+"""Deterministic fake data at production scale, for benchmarks.
+
+`seed_bench_data` bulk-creates the skill catalog, skills, projects with
+media, links and skills, posts with images and links, experiences with
+skills and links, and contact messages, plus a hero section and the about
+page when there is none. Every value is drawn from one
+``random.Random(seed)``, so a seed and a set of sizes always produce the
+same rows, whatever the primary keys. Media are fake Cloudinary public ids
+under ``bench/``: nothing is uploaded, and nothing should be deleted from
+Cloudinary for them. Rows are inserted with ``bulk_create`` in batches, each
+in its own transaction, so neither signals nor per-row saves run; the
+public read and admin summary caches are invalidated once at the end.
+
+Names carry a ``bench<seed>`` tag, so the rows of a run can be told apart
+and a second run with the same seed is refused (see `already_seeded`).
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from blog.models import Image, Link, Post
+from experiences.models import Experience, ExperienceLink, ExperienceSkillRef
+from projects.models import Project, ProjectLink, ProjectMedia, ProjectSkillRef
+from skills.models import Skill, SkillReference
+from .async_reads import invalidate_public_reads
+from .models import About, ContactMessage, HeroSection
+from .slow_queries import suppressed
+from .summary import invalidate_admin_summary
+
+DEFAULT_SIZES = {
+    'skill_references': 300,
+    'skills': 150,
+    'projects': 10_000,
+    'posts': 5_000,
+    'experiences': 2_000,
+    'contacts': 50_000,
+}
+
+# children per parent, drawn uniformly between the bounds
+PROJECT_MEDIA = (1, 3)  # the API accepts up to three images
+PROJECT_LINKS = (0, 3)
+PROJECT_SKILLS = (1, 6)
+POST_IMAGES = (0, 4)
+POST_LINKS = (0, 3)
+EXPERIENCE_SKILLS = (1, 5)
+EXPERIENCE_LINKS = (0, 2)
+
+WORDS = (
+    'application', 'web', 'api', 'django', 'react', 'données', 'tableau', 'analyse', 'mobile', 'cloud',
+    'service', 'plateforme', 'gestion', 'portfolio', 'recherche', 'modèle', 'apprentissage', 'réseau',
+    'performance', 'sécurité', 'interface', 'utilisateur', 'projet', 'équipe', 'client', 'serveur',
+    'base', 'requête', 'cache', 'déploiement', 'conteneur', 'pipeline', 'test', 'qualité', 'design',
+    'système', 'temps', 'réel', 'automatisation', 'intégration', 'migration', 'optimisation', 'image',
+    'vision', 'texte', 'python', 'javascript', 'typescript', 'postgresql', 'docker', 'kubernetes',
+)
+COMPANIES = ('Atlas', 'Nova', 'Orion', 'Sigma', 'Helios', 'Vega', 'Lumen', 'Kairos', 'Zenith', 'Astra')
+CITIES = ('Casablanca', 'Rabat', 'Marrakech', 'Paris', 'Lyon', 'Montréal', 'Remote')
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+# long texts are drawn from a pool of paragraphs: building each one word by word is the slowest part
+PARAGRAPH_POOL = 500
+
+
+def tag(seed):
+    return f'bench{seed}'
+
+
+def already_seeded(seed):
+    return SkillReference.objects.filter(name__startswith=f'{tag(seed)}-').exists()
+
+
+def _batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield range(start, min(start + batch_size, count))
+
+
+class _Generator:
+    def __init__(self, seed, batch_size):
+        self.rng = random.Random(seed)
+        self.tag = tag(seed)
+        self.batch_size = batch_size
+        self.counts = {}
+        self.pool = [self.words(30, 80).capitalize() + '.' for _ in range(PARAGRAPH_POOL)]
+
+    def words(self, low, high):
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(low, high)))
+
+    def paragraphs(self, count):
+        return '\n\n'.join(self.rng.choices(self.pool, k=count))
+
+    def between(self, bounds):
+        return self.rng.randint(*bounds)
+
+    def sample(self, population, bounds):
+        return self.rng.sample(population, min(self.between(bounds), len(population)))
+
+    def create(self, objs):
+        if objs:
+            model = type(objs[0])
+            created = model.objects.bulk_create(objs, batch_size=self.batch_size)
+            self.counts[model._meta.label] = self.counts.get(model._meta.label, 0) + len(created)
+            return created
+        return []
+
+    def skill_references(self, count):
+        references = []
+        for batch in _batches(count, self.batch_size):
+            with transaction.atomic():
+                references += self.create([
+                    SkillReference(
+                        name=f'{self.tag}-{self.rng.choice(WORDS)}-{i}', id_icon=f'bench-{i}',
+                        icon=f'https://skillicons.dev/icons?i=bench-{i}',
+                    ) for i in batch
+                ])
+        return [reference.pk for reference in references]
+
+    def skills(self, reference_ids, count):
+        for batch in _batches(min(count, len(reference_ids)), self.batch_size):
+            with transaction.atomic():
+                self.create([Skill(reference_id=reference_ids[i]) for i in batch])
+
+    def projects(self, count, reference_ids):
+        for batch in _batches(count, self.batch_size):
+            with transaction.atomic():
+                projects = self.create([
+                    Project(title=f'{self.words(2, 5).capitalize()} {i}', description=self.paragraphs(2))
+                    for i in batch
+                ])
+                media, links, skills = [], [], []
+                for i, project in zip(batch, projects):
+                    media += [
+                        ProjectMedia(project=project, image=f'image/upload/v1/bench/projects/{self.tag}-{i}-{n}.jpg',
+                                     order=n)
+                        for n in range(self.between(PROJECT_MEDIA))
+                    ]
+                    links += [
+                        ProjectLink(project=project, url=f'https://example.com/{self.tag}/projects/{i}/{n}',
+                                    text=self.words(1, 3), order=n)
+                        for n in range(self.between(PROJECT_LINKS))
+                    ]
+                    skills += [
+                        ProjectSkillRef(project=project, skill_reference_id=reference_id)
+                        for reference_id in self.sample(reference_ids, PROJECT_SKILLS)
+                    ]
+                self.create(media)
+                self.create(links)
+                self.create(skills)
+
+    def posts(self, count):
+        for batch in _batches(count, self.batch_size):
+            with transaction.atomic():
+                posts = []
+                for i in batch:
+                    title = f'{self.words(3, 8).capitalize()} {self.tag} {i}'
+                    content = self.paragraphs(self.rng.randint(2, 6))
+                    posts.append(Post(title=title, slug=slugify(title), content=content))
+                posts = self.create(posts)
+                images, links = [], []
+                for i, post in zip(batch, posts):
+                    images += [
+                        Image(post=post, image=f'image/upload/v1/bench/blog/{self.tag}-{i}-{n}.jpg',
+                              caption=self.words(0, 4))
+                        for n in range(self.between(POST_IMAGES))
+                    ]
+                    links += [
+                        Link(post=post, url=f'https://example.com/{self.tag}/posts/{i}/{n}',
+                             text=self.words(1, 3), order=n)
+                        for n in range(self.between(POST_LINKS))
+                    ]
+                self.create(images)
+                self.create(links)
+
+    def experiences(self, count, reference_ids):
+        types = [value for value, _ in Experience.EXPERIENCE_TYPE_CHOICES]
+        for batch in _batches(count, self.batch_size):
+            with transaction.atomic():
+                experiences = []
+                for i in batch:
+                    start = date(2010, 1, 1) + timedelta(days=self.rng.randrange(5000))
+                    current = self.rng.random() < 0.1
+                    experiences.append(Experience(
+                        title=f'{self.words(1, 3).capitalize()} {i}', company=self.rng.choice(COMPANIES),
+                        location=self.rng.choice(CITIES), experience_type=self.rng.choice(types), start_date=start,
+                        end_date=None if current else start + timedelta(days=self.rng.randint(30, 1500)),
+                        description=self.paragraphs(1), is_current=current,
+                    ))
+                experiences = self.create(experiences)
+                skills, links = [], []
+                for i, experience in zip(batch, experiences):
+                    skills += [
+                        ExperienceSkillRef(experience=experience, skill_reference_id=reference_id)
+                        for reference_id in self.sample(reference_ids, EXPERIENCE_SKILLS)
+                    ]
+                    links += [
+                        ExperienceLink(experience=experience, url=f'https://example.com/{self.tag}/experiences/{i}/{n}',
+                                       text=self.words(1, 3), order=n)
+                        for n in range(self.between(EXPERIENCE_LINKS))
+                    ]
+                self.create(skills)
+                self.create(links)
+
+    def contacts(self, count):
+        for batch in _batches(count, self.batch_size):
+            with transaction.atomic():
+                self.create([
+                    ContactMessage(
+                        name=f'Contact {i}', email=f'contact{i}@{self.tag}.example.com', subject=self.words(0, 6),
+                        message=self.paragraphs(1), is_read=self.rng.random() < 0.8,
+                        is_archived=self.rng.random() < 0.3,
+                        created_at=EPOCH + timedelta(seconds=self.rng.randrange(5 * 365 * 86400)),
+                    ) for i in batch
+                ])
+
+    def site(self):
+        if not HeroSection.objects.exists():
+            self.create([HeroSection(headline=self.words(3, 6).capitalize(), subheadline=self.words(6, 12))])
+        if not About.objects.exists():
+            self.create([About(description=self.paragraphs(3), hiring_email=f'hiring@{self.tag}.example.com')])
+
+
+class _Steps:
+    def __init__(self, progress):
+        self.progress = progress
+
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        yield
+        if self.progress is not None:
+            self.progress(name, time.perf_counter() - started)
+
+
+def seed_bench_data(sizes, seed=0, batch_size=5000, progress=None):
+    """Create the rows for `sizes` (see DEFAULT_SIZES); returns {model label: rows created}.
+
+    `progress`, if given, is called with each step name and its duration in seconds.
+    """
+    generator = _Generator(seed, batch_size)
+    steps = _Steps(progress)
+    # batches of thousands of rows are expected to be slow; they are not offenders
+    with suppressed():
+        with steps.step('skill_references'):
+            reference_ids = generator.skill_references(sizes['skill_references'])
+        with steps.step('skills'):
+            generator.skills(reference_ids, sizes['skills'])
+        with steps.step('projects'):
+            generator.projects(sizes['projects'], reference_ids)
+        with steps.step('posts'):
+            generator.posts(sizes['posts'])
+        with steps.step('experiences'):
+            generator.experiences(sizes['experiences'], reference_ids)
+        with steps.step('contacts'):
+            generator.contacts(sizes['contacts'])
+        generator.site()
+    invalidate_public_reads()
+    invalidate_admin_summary()
+    return generator.counts
@@ -1,20 +1,121 @@
+import re
+
+from cloudinary import CloudinaryResource
 from rest_framework import serializers
-from .models import HeroSection, About, ContactMessage
+from .assets import drop_duplicate_reference, replace_upload, store_upload
+from .filters import ContactMessageFilter
+from .instrumentation import timed
+from .models import HeroSection, About, ContactMessage, SlowQuery, Task, UploadSession
+from .storage import resource_url
+from .uploads import attach_upload, create_session
+
+
+def safe_image_url(image):
+    """Return a Cloudinary URL only if it looks safe. Avoid returning malformed public IDs that would
+    generate invalid Cloudinary URLs (e.g. containing spaces or apostrophes)."""
+    try:
+        if not image:
+            return None
+        with timed('storage'):
+            url = resource_url(image) if isinstance(image, CloudinaryResource) else image.url
+        if not url:
+            return None
+        if '%20' in url or '%27' in url or ' ' in url:
+            return None
+        return url
+    except Exception:
+        return None
+
+
+class UploadIdField(serializers.UUIDField):
+    """Write-only reference to a finalized UploadSession of the given kind."""
+
+    def __init__(self, kind='image', **kwargs):
+        self.kind = kind
+        kwargs.setdefault('write_only', True)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        upload_id = super().to_internal_value(data)
+        session = UploadSession.objects.filter(pk=upload_id, kind=self.kind).first()
+        if session is None:
+            raise serializers.ValidationError(f"Unknown upload {upload_id}.")
+        if session.status != UploadSession.STATUS_COMPLETE:
+            raise serializers.ValidationError(f"Upload {upload_id} is not finalized or was already attached.")
+        return session
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'kind', 'filename', 'content_type', 'size', 'sha256', 'received', 'status', 'expires_at']
+        read_only_fields = ['id', 'received', 'status', 'expires_at']
+
+    def validate_sha256(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value or ''):
+            raise serializers.ValidationError("sha256 must be a 64 character hex digest.")
+        return value.lower()
+
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("size must be positive.")
+        return value
+
+    def create(self, validated_data):
+        return create_session(user=self.context['request'].user, **validated_data)
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ['id', 'name', 'args', 'kwargs', 'priority', 'status', 'attempts', 'max_attempts',
+                  'run_at', 'locked_at', 'locked_by', 'last_error', 'created_at', 'finished_at']
+
+
+class SlowQuerySerializer(serializers.ModelSerializer):
+    mean_ms = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SlowQuery
+        fields = ['fingerprint', 'statement', 'count', 'total_ms', 'mean_ms', 'max_ms', 'view', 'frame',
+                  'sql', 'params', 'plan', 'first_seen', 'last_seen']
+
+    def get_mean_ms(self, obj):
+        return round(obj.total_ms / obj.count, 2)
 
 
 class HeroSectionSerializer(serializers.ModelSerializer):
     # Expose image URL for read, but allow image uploads via standard ImageField for write
     image = serializers.ImageField(required=False, allow_null=True)
+    # alternatively, the id of a finalized resumable upload (see UploadSessionCreateView)
+    upload_id = UploadIdField(kind='image', required=False)
 
     class Meta:
         model = HeroSection
-        fields = ['id', 'headline', 'subheadline', 'image', 'instagram', 'linkedin', 'github', 'order', 'is_active']
+        fields = ['id', 'headline', 'subheadline', 'image', 'upload_id', 'instagram', 'linkedin', 'github', 'order', 'is_active']
+
+    def create(self, validated_data):
+        session = validated_data.pop('upload_id', None)
+        if session is not None:
+            validated_data['image'] = attach_upload(session)
+        elif validated_data.get('image'):
+            validated_data['image'] = store_upload(validated_data['image'])
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        session = validated_data.pop('upload_id', None)
+        if session is not None:
+            validated_data['image'] = drop_duplicate_reference(instance.image, attach_upload(session))
+        elif validated_data.get('image'):
+            validated_data['image'] = replace_upload(instance.image, validated_data['image'])
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
         if getattr(instance, 'image'):
             try:
-                rep['image'] = instance.image.url
+                with timed('storage'):
+                    rep['image'] = instance.image.url
             except Exception:
                 rep['image'] = None
         else:
@@ -23,9 +124,28 @@ class HeroSectionSerializer(serializers.ModelSerializer):
 
 
 class AboutSerializer(serializers.ModelSerializer):
+    # alternatively, the id of a finalized resumable upload (see UploadSessionCreateView)
+    cv_upload_id = UploadIdField(kind='raw', required=False)
+
     class Meta:
         model = About
-        fields = ['id', 'title', 'description', 'cv', 'hiring_email', 'updated_at']
+        fields = ['id', 'title', 'description', 'cv', 'cv_upload_id', 'hiring_email', 'updated_at']
+
+    def create(self, validated_data):
+        session = validated_data.pop('cv_upload_id', None)
+        if session is not None:
+            validated_data['cv'] = attach_upload(session)
+        elif validated_data.get('cv'):
+            validated_data['cv'] = store_upload(validated_data['cv'], resource_type='raw')
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        session = validated_data.pop('cv_upload_id', None)
+        if session is not None:
+            validated_data['cv'] = drop_duplicate_reference(instance.cv, attach_upload(session), resource_type='raw')
+        elif validated_data.get('cv'):
+            validated_data['cv'] = replace_upload(instance.cv, validated_data['cv'], resource_type='raw')
+        return super().update(instance, validated_data)
 
 
 class ContactMessageSerializer(serializers.ModelSerializer):
@@ -51,5 +171,54 @@ class ContactMessageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ContactMessage
-        fields = ['id', 'name', 'email', 'subject', 'message', 'created_at', 'is_read']
-        read_only_fields = ['created_at', 'is_read']
+        fields = ['id', 'name', 'email', 'subject', 'message', 'created_at', 'is_read', 'is_archived']
+        read_only_fields = ['created_at', 'is_read', 'is_archived']
+
+
+class ContactBulkActionSerializer(serializers.Serializer):
+    """Apply one action to the messages selected by `ids` or by `filter`.
+
+    `filter` takes the ContactMessageFilter parameters (is_read, is_archived,
+    created_after, created_before, email, email_domain). Each action is a
+    single UPDATE or DELETE statement.
+    """
+    ACTIONS = {
+        'mark_read': {'is_read': True},
+        'mark_unread': {'is_read': False},
+        'archive': {'is_archived': True},
+        'unarchive': {'is_archived': False},
+        'delete': None,
+    }
+
+    action = serializers.ChoiceField(choices=list(ACTIONS))
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=10000)
+    filter = serializers.DictField(required=False)
+
+    def validate_filter(self, value):
+        unknown = set(value) - set(ContactMessageFilter.base_filters)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filter(s): {', '.join(sorted(unknown))}.")
+        if not value:
+            # an empty filter would select every message
+            raise serializers.ValidationError("Filter must not be empty.")
+        filterset = ContactMessageFilter(data=value, queryset=ContactMessage.objects.all())
+        if not filterset.is_valid():
+            raise serializers.ValidationError(filterset.errors)
+        return filterset
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either ids or filter.")
+        return attrs
+
+    def save(self):
+        if 'ids' in self.validated_data:
+            queryset = ContactMessage.objects.filter(pk__in=self.validated_data['ids'])
+        else:
+            queryset = self.validated_data['filter'].qs
+        changes = self.ACTIONS[self.validated_data['action']]
+        if changes is None:
+            affected, _ = queryset.order_by().delete()
+        else:
+            affected = queryset.order_by().update(**changes)
+        return affected
@@ -0,0 +1,68 @@
+"""Model signal handlers that keep remote storage in sync with the database.
+
+post_delete fires for plain deletes, queryset deletes and cascades alike
+(e.g. deleting a Project removes its ProjectMedia rows), so every path that
+drops a row referencing a Cloudinary asset releases its reference; the asset
+is queued for removal once no row uses it any more.
+
+Creating or deleting a project, post or experience also drops the cached
+admin summary, whose totals count them.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from blog.models import Image, Post
+from experiences.models import Experience
+from projects.models import Project, ProjectMedia
+from .assets import public_id_of, release_asset
+from .models import About, HeroSection
+from .summary import invalidate_admin_summary
+
+
+@receiver(post_delete, sender=ProjectMedia, dispatch_uid='core.project_media_asset')
+@receiver(post_delete, sender=Image, dispatch_uid='core.blog_image_asset')
+@receiver(post_delete, sender=HeroSection, dispatch_uid='core.hero_image_asset')
+def release_image(sender, instance, **kwargs):
+    release_asset(instance.image, resource_type='image')
+
+
+@receiver(post_delete, sender=About, dispatch_uid='core.about_cv_asset')
+def release_cv(sender, instance, **kwargs):
+    release_asset(instance.cv, resource_type='raw')
+
+
+# HeroSection and About are singletons whose file can be replaced in place;
+# remember the previous public id so the replaced asset does not leak.
+_TRACKED_FIELDS = {HeroSection: ('image', 'image'), About: ('cv', 'raw')}
+
+
+@receiver(pre_save, sender=HeroSection, dispatch_uid='core.hero_track_previous')
+@receiver(pre_save, sender=About, dispatch_uid='core.about_track_previous')
+def remember_previous_asset(sender, instance, **kwargs):
+    field, _ = _TRACKED_FIELDS[sender]
+    instance._previous_public_id = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+        instance._previous_public_id = public_id_of(previous)
+
+
+@receiver(post_save, sender=HeroSection, dispatch_uid='core.hero_replace_asset')
+@receiver(post_save, sender=About, dispatch_uid='core.about_replace_asset')
+def release_replaced_asset(sender, instance, **kwargs):
+    field, resource_type = _TRACKED_FIELDS[sender]
+    previous = getattr(instance, '_previous_public_id', None)
+    if previous and previous != public_id_of(getattr(instance, field)):
+        release_asset(previous, resource_type=resource_type)
+
+
+@receiver(post_save, sender=Project, dispatch_uid='core.summary_project_saved')
+@receiver(post_save, sender=Post, dispatch_uid='core.summary_post_saved')
+@receiver(post_save, sender=Experience, dispatch_uid='core.summary_experience_saved')
+@receiver(post_delete, sender=Project, dispatch_uid='core.summary_project_deleted')
+@receiver(post_delete, sender=Post, dispatch_uid='core.summary_post_deleted')
+@receiver(post_delete, sender=Experience, dispatch_uid='core.summary_experience_deleted')
+def refresh_admin_summary(sender, created=True, **kwargs):
+    # edits leave the totals as they are; on commit, so a concurrent read cannot cache the old count
+    if created:
+        transaction.on_commit(invalidate_admin_summary)
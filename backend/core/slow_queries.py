@@ -0,0 +1,163 @@
+"""Slow query log with the query plan captured when it happens.
+
+The execute wrapper of core/instrumentation.py times every query while
+SLOW_QUERY_THRESHOLD_MS is set and hands those over the threshold to
+`capture`, which keeps the ones issued from the code of SLOW_QUERY_APPS:
+it notes the innermost frame of that code and the route of the request,
+runs ``EXPLAIN`` on the same connection (without ANALYZE: the statement is
+not executed again) and logs the lot as one JSON line on the
+``core.slow_queries`` logger.
+
+Queries are grouped by fingerprint: the SQL with literals replaced by ``?``
+and IN lists collapsed, so that e.g. the LIKE searches of every
+``?search=`` term count as one statement. `record` adds each capture to
+the `SlowQuery` row of its fingerprint, written once the response is
+produced; the superuser report (/api/core/admin/slow-queries/) ranks them
+by total time.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, router, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .metrics import route
+
+logger = logging.getLogger(__name__)
+
+# set while capturing or recording, so that the EXPLAIN and the writes are not captured in turn
+_capturing = ContextVar('slow_query_capturing', default=False)
+
+# frames of these modules wrap every query and never tell where it comes from
+_WRAPPERS = ('core/instrumentation.py', 'core/slow_queries.py', 'core/middleware.py')
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+PARAMS_MAX_LENGTH = 1000
+
+_string = re.compile(r"'(?:[^']|'')*'")
+_number = re.compile(r'\b\d+(?:\.\d+)?\b')
+_placeholder = re.compile(r'%s|\?')
+_in_list = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_spaces = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """`sql` with literals and placeholders as ``?``, IN lists as ``IN (...)`` and single spaces."""
+    sql = _placeholder.sub('?', _number.sub('?', _string.sub('?', sql)))
+    return _spaces.sub(' ', _in_list.sub('IN (...)', sql)).strip()
+
+
+def fingerprint(statement):
+    return hashlib.sha1(statement.encode()).hexdigest()
+
+
+def _origin():
+    """``path:line in function`` of the innermost frame from SLOW_QUERY_APPS code, or None."""
+    base = os.path.join(str(settings.BASE_DIR), '')
+    apps = tuple(os.path.join(base, app, '') for app in settings.SLOW_QUERY_APPS)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(apps):
+            path = os.path.relpath(filename, base).replace(os.sep, '/')
+            if path not in _WRAPPERS:
+                return f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def _savepoint(connection):
+    # a failed statement aborts the whole transaction on PostgreSQL; SQLite carries on, and cannot
+    # open a savepoint while the captured statement still has rows to return (INSERT ... RETURNING)
+    return transaction.atomic(using=connection.alias) if connection.vendor == 'postgresql' else nullcontext()
+
+
+def explain(connection, sql, params):
+    """The plan of `sql` as text, or '' for statements that cannot be explained."""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return ''
+    # EXPLAIN (ANALYZE false) on PostgreSQL, EXPLAIN QUERY PLAN on SQLite
+    options = {'analyze': False} if connection.vendor == 'postgresql' else {}
+    try:
+        prefix = connection.ops.explain_query_prefix(**options)
+        with _savepoint(connection), connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except (DatabaseError, ValueError) as exc:
+        return f'(no plan: {exc})'
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+@contextmanager
+def suppressed():
+    """Capture nothing in the block, e.g. bulk loads whose batches are slow by design."""
+    token = _capturing.set(True)
+    try:
+        yield
+    finally:
+        _capturing.reset(token)
+
+
+def capture(connection, sql, params, many, seconds, timings, request=None):
+    """Log a query that took `seconds`, and record it now or, within a measured request, once it is answered."""
+    if _capturing.get():
+        return
+    frame = _origin()
+    if frame is None:
+        return
+    with suppressed():
+        statement = normalize(sql)
+        entry = {
+            'fingerprint': fingerprint(statement),
+            'ms': round(seconds * 1000, 2),
+            'view': route(request) if request is not None else '',
+            'frame': frame,
+            'sql': sql,
+            'params': repr(params)[:PARAMS_MAX_LENGTH],
+            'plan': '' if many else explain(connection, sql, params),
+        }
+        logger.warning(json.dumps(entry))
+        entry['statement'] = statement
+        if timings is not None:
+            timings.slow_queries.append(entry)
+        else:
+            _record(entry)
+
+
+def record(entries):
+    with suppressed():
+        for entry in entries:
+            _record(entry)
+
+
+def _record(entry):
+    from .models import SlowQuery
+
+    sample = {name: entry[name] for name in ('view', 'frame', 'sql', 'params', 'plan')}
+    update = {
+        'count': F('count') + 1,
+        'total_ms': F('total_ms') + entry['ms'],
+        'max_ms': Greatest('max_ms', Value(entry['ms'])),
+        'last_seen': timezone.now(),
+        **sample,
+    }
+    rows = SlowQuery.objects.filter(fingerprint=entry['fingerprint'])
+    try:
+        with _savepoint(connections[router.db_for_write(SlowQuery)]):
+            if not rows.update(**update):
+                SlowQuery.objects.create(
+                    fingerprint=entry['fingerprint'], statement=entry['statement'],
+                    total_ms=entry['ms'], max_ms=entry['ms'], **sample,
+                )
+    except IntegrityError:  # first seen concurrently by another worker
+        rows.update(**update)
+    except DatabaseError:
+        logger.exception('Could not record slow query %s', entry['fingerprint'])
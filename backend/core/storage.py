@@ -0,0 +1,64 @@
+"""Cloudinary storage without importing it at startup.
+
+``cloudinary_storage.storage`` pulls in ``requests`` and
+``cloudinary_storage.app_settings`` pulls in ``django.test``; importing them
+from models.py put both on every cold start although only About.cv uploads
+and URLs use them. `RawMediaStorage` imports the storage on first use and
+`configure_cloudinary` applies the credentials the way app_settings does.
+
+`resource_url` memoizes the delivery URLs of stored images: the SDK rebuilds
+the transformation string for every URL, about 0.3 ms each, which made up
+most of the cost of serializing a list of projects or posts.
+"""
+from django.conf import settings
+from django.utils.functional import LazyObject
+
+RESOURCE_URL_CACHE_SIZE = 10000
+_resource_urls = {}
+
+
+class RawMediaStorage(LazyObject):
+    """`RawMediaCloudinaryStorage`, imported and instantiated on first use.
+
+    Deconstructs to the wrapped storage, so migrations see the same field.
+    """
+
+    def _setup(self):
+        from cloudinary_storage.storage import RawMediaCloudinaryStorage
+        self._wrapped = RawMediaCloudinaryStorage()
+
+    def __bool__(self):
+        # FileField evaluates `storage or default_storage` at class creation
+        return True
+
+
+def configure_cloudinary():
+    """Credentials from CLOUDINARY_STORAGE, and https URLs, for the Cloudinary SDK.
+
+    Without CLOUDINARY_STORAGE the SDK reads CLOUDINARY_URL from the
+    environment on import (see settings.py).
+    """
+    import cloudinary
+
+    options = getattr(settings, 'CLOUDINARY_STORAGE', {})
+    if all(options.get(key) for key in ('CLOUD_NAME', 'API_KEY', 'API_SECRET')):
+        cloudinary.config(
+            cloud_name=options['CLOUD_NAME'],
+            api_key=options['API_KEY'],
+            api_secret=options['API_SECRET'],
+        )
+    cloudinary.config(secure=options.get('SECURE', True))
+    _resource_urls.clear()
+
+
+def resource_url(resource):
+    """`resource.url` of a CloudinaryResource, memoized per stored value in this process."""
+    if resource.url_options:
+        return resource.url
+    key = resource.get_prep_value()
+    url = _resource_urls.get(key)
+    if url is None:
+        url = resource.url
+        if len(_resource_urls) < RESOURCE_URL_CACHE_SIZE:
+            _resource_urls[key] = url
+    return url
@@ -0,0 +1,53 @@
+"""Counts shown in the admin chrome (unread badge, dashboard totals).
+
+All counts come from one statement made of scalar COUNT subqueries. The
+unread count uses the same predicate as the partial `contact_unread_idx`
+index, so it only reads that index. The result is cached for
+ADMIN_SUMMARY_CACHE_TTL seconds. Contact views drop the cached value when
+they change messages (bulk updates bypass model signals), and creating or
+deleting a project, post or experience drops it once committed (see
+core/signals.py), so the badge and the totals stay accurate.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Func, IntegerField
+
+from blog.models import Post
+from experiences.models import Experience
+from projects.models import Project
+from .models import ContactMessage
+
+CACHE_KEY = 'core:admin-summary'
+
+
+def _count_sql(queryset):
+    count = Func(template='COUNT(*)', output_field=IntegerField())
+    return queryset.order_by().annotate(n=count).values('n').query.sql_with_params()
+
+
+def compute_admin_summary():
+    counted = {
+        'unread_contacts': ContactMessage.objects.filter(is_read=False),
+        'total_contacts': ContactMessage.objects.all(),
+        'projects': Project.objects.all(),
+        'posts': Post.objects.all(),
+        'experiences': Experience.objects.all(),
+    }
+    columns, params = [], []
+    for alias, queryset in counted.items():
+        sql, sql_params = _count_sql(queryset)
+        columns.append(f"({sql}) AS {connection.ops.quote_name(alias)}")
+        params.extend(sql_params)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(columns)}", params)
+        row = cursor.fetchone()
+    return dict(zip(counted, row))
+
+
+def admin_summary():
+    return cache.get_or_set(CACHE_KEY, compute_admin_summary, settings.ADMIN_SUMMARY_CACHE_TTL)
+
+
+def invalidate_admin_summary():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,273 @@
+"""A small database-backed task queue.
+
+Declare work with the `task` decorator in an app's ``tasks.py`` and queue it
+with ``my_task.enqueue(*args, **kwargs)``; `manage.py run_worker` executes it
+off the request path. Arguments must be JSON serializable.
+
+    @task(max_attempts=3)
+    def send_welcome(user_id): ...
+
+    send_welcome.enqueue(user.pk, delay=60)
+
+Tasks declared with ``every=<seconds>`` are periodic: the worker keeps one
+instance of each scheduled and queues the next run when the current one ends.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, close_old_connections, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+# serializes claims between the threads of one worker where rows cannot be locked (SQLite)
+_claim_lock = threading.Lock()
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, priority, every):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.priority = priority
+        self.every = every
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<task {self.name}>"
+
+    def enqueue(self, *args, run_at=None, delay=None, priority=None, key=None, **kwargs):
+        """Queue a run. With `key`, an already queued run with the same key is reused
+        (and brought forward to `run_at` if that is earlier) instead of adding another."""
+        return enqueue(
+            self.name, args=list(args), kwargs=kwargs, run_at=run_at, delay=delay,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts, key=key,
+        )
+
+
+def task(func=None, *, name=None, max_attempts=5, priority=0, every=None):
+    """Register `func` as a task; usable as ``@task`` or ``@task(...)``."""
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        registered = TaskFunction(func, task_name, max_attempts, priority, every)
+        _registry[task_name] = registered
+        return registered
+
+    return decorator(func) if func is not None else decorator
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def get_task(name):
+    if name not in _registry:
+        autodiscover()
+    return _registry.get(name)
+
+
+def periodic_tasks():
+    autodiscover()
+    return [t for t in _registry.values() if t.every]
+
+
+def enqueue(name, args=None, kwargs=None, run_at=None, delay=None, priority=0, max_attempts=5, key=None):
+    now = timezone.now()
+    if run_at is None:
+        run_at = now + timedelta(seconds=delay or 0)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name, args=args or [], kwargs=kwargs or {}, run_at=run_at,
+                priority=priority, max_attempts=max_attempts, key=key,
+            )
+    except IntegrityError:
+        if key is None:
+            raise
+    # coalesce with the active task holding this key
+    Task.objects.filter(key=key, status=Task.STATUS_QUEUED, run_at__gt=run_at).update(run_at=run_at)
+    return Task.objects.filter(key=key, status__in=[Task.STATUS_QUEUED, Task.STATUS_RUNNING]).first()
+
+
+def _backoff(attempts):
+    # 30s, 1m, 2m, 4m, ... capped at one hour
+    return timedelta(seconds=min(30 * 2 ** max(attempts - 1, 0), 3600))
+
+
+def claim(worker_id, limit=1):
+    """Lock up to `limit` due tasks for `worker_id` and return them.
+
+    SKIP LOCKED keeps concurrent workers off each other's rows. Without it
+    (SQLite) the ids are read outside a transaction, since SQLite refuses to
+    upgrade a read transaction to a write one while another connection
+    writes; the conditional status update then decides which worker wins.
+    """
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            return _claim(worker_id, limit, lock_rows=True)
+    with _claim_lock:
+        return _claim(worker_id, limit, lock_rows=False)
+
+
+def _claim(worker_id, limit, lock_rows):
+    now = timezone.now()
+    qs = Task.objects.filter(status=Task.STATUS_QUEUED, run_at__lte=now).order_by('-priority', 'run_at', 'id')
+    if lock_rows:
+        qs = qs.select_for_update(skip_locked=True)
+    ids = list(qs.values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    Task.objects.filter(id__in=ids, status=Task.STATUS_QUEUED).update(
+        status=Task.STATUS_RUNNING, locked_at=now, locked_by=worker_id, attempts=F('attempts') + 1,
+    )
+    return list(Task.objects.filter(id__in=ids, status=Task.STATUS_RUNNING, locked_by=worker_id, locked_at=now))
+
+
+def _schedule_next(func):
+    enqueue(func.name, run_at=timezone.now() + timedelta(seconds=func.every), priority=func.priority,
+            max_attempts=func.max_attempts, key=func.name)
+
+
+def execute(task_row):
+    """Run a claimed task and record the outcome. Returns True on success."""
+    func = get_task(task_row.name)
+    now = timezone.now()
+    active = Task.objects.filter(pk=task_row.pk, status=Task.STATUS_RUNNING, locked_by=task_row.locked_by)
+    if func is None:
+        active.update(status=Task.STATUS_DEAD, finished_at=now, last_error=f"Unknown task {task_row.name!r}.")
+        return False
+
+    try:
+        func.func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Task %s #%s failed (attempt %d/%d)", task_row.name, task_row.pk,
+                       task_row.attempts, task_row.max_attempts, exc_info=True)
+        now = timezone.now()
+        if task_row.attempts >= task_row.max_attempts:
+            active.update(status=Task.STATUS_DEAD, finished_at=now, last_error=error)
+            if func.every:
+                _schedule_next(func)
+        else:
+            active.update(status=Task.STATUS_QUEUED, locked_at=None, locked_by='', last_error=error,
+                          run_at=now + _backoff(task_row.attempts))
+        return False
+
+    active.update(status=Task.STATUS_SUCCEEDED, finished_at=timezone.now(), last_error='')
+    if func.every:
+        _schedule_next(func)
+    return True
+
+
+def recover_stale_tasks(timeout=None):
+    """Requeue tasks whose worker disappeared mid-run (or bury them if out of attempts)."""
+    cutoff = timezone.now() - timedelta(seconds=timeout or settings.TASK_LOCK_TIMEOUT)
+    stale = Task.objects.filter(status=Task.STATUS_RUNNING, locked_at__lt=cutoff)
+    dead = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.STATUS_DEAD, finished_at=timezone.now(), last_error='Worker lost while running the task.',
+    )
+    requeued = stale.update(status=Task.STATUS_QUEUED, locked_at=None, locked_by='')
+    return requeued + dead
+
+
+def ensure_periodic_tasks():
+    for func in periodic_tasks():
+        enqueue(func.name, priority=func.priority, max_attempts=func.max_attempts, key=func.name)
+
+
+def purge_finished_tasks(older_than=None):
+    cutoff = timezone.now() - timedelta(seconds=older_than or settings.TASK_RESULT_TTL)
+    count, _ = Task.objects.filter(status=Task.STATUS_SUCCEEDED, finished_at__lt=cutoff).delete()
+    return count
+
+
+def queue_stats():
+    now = timezone.now()
+    counts = dict(Task.objects.values_list('status').annotate(n=Count('id')).order_by())
+    oldest_due = Task.objects.filter(status=Task.STATUS_QUEUED, run_at__lte=now).aggregate(m=Min('run_at'))['m']
+    return {
+        'counts': {status: counts.get(status, 0) for status, _ in Task.STATUS_CHOICES},
+        'due': Task.objects.filter(status=Task.STATUS_QUEUED, run_at__lte=now).count(),
+        'oldest_due_seconds': (now - oldest_due).total_seconds() if oldest_due else 0,
+    }
+
+
+class Worker:
+    """Polls the queue from `concurrency` threads until `stop()` is called.
+
+    With ``burst=True`` each thread exits as soon as no task is due, which is
+    handy for cron-driven deployments and tests.
+    """
+
+    def __init__(self, concurrency=1, poll_interval=None, burst=False):
+        self.concurrency = concurrency
+        self.poll_interval = settings.TASK_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.burst = burst
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        autodiscover()
+        recover_stale_tasks()
+        ensure_periodic_tasks()
+        close_old_connections()
+        threads = [
+            threading.Thread(target=self._loop, args=(f"{self._prefix}:{i}",), name=f"task-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+        return self.processed
+
+    def _loop(self, worker_id):
+        idle_polls = 0
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                try:
+                    batch = claim(worker_id)
+                except OperationalError as exc:
+                    # e.g. "database is locked" with several SQLite worker processes
+                    logger.warning("Could not claim tasks: %s", exc)
+                    batch = []
+                if not batch:
+                    if self.burst:
+                        break
+                    idle_polls += 1
+                    if idle_polls % 60 == 0:
+                        recover_stale_tasks()
+                    self._stop.wait(self.poll_interval)
+                    continue
+                for task_row in batch:
+                    execute(task_row)
+                    with self._lock:
+                        self.processed += 1
+        finally:
+            connection.close()
@@ -0,0 +1,39 @@
+"""Background maintenance tasks, run by `manage.py run_worker`."""
+from .taskqueue import purge_finished_tasks as _purge_finished_tasks, task
+
+
+@task(every=60, priority=-1)
+def drain_asset_deletions():
+    """Destroy queued Cloudinary assets until the due part of the queue is empty."""
+    from .assets import drain_asset_deletions as drain
+
+    while any(drain()):
+        pass
+
+
+@task(every=60, priority=10)
+def send_queued_email():
+    """Send due queued emails; password resets should not wait behind maintenance work."""
+    from .mail import flush_outbound_email
+
+    while any(flush_outbound_email()):
+        pass
+
+
+@task(every=3600, priority=-5)
+def purge_upload_sessions():
+    from .uploads import purge_expired_sessions
+
+    purge_expired_sessions()
+
+
+@task(every=3600, priority=-5)
+def purge_idempotency_keys():
+    from .idempotency import purge_expired_keys
+
+    purge_expired_keys()
+
+
+@task(every=24 * 3600, priority=-5)
+def purge_finished_tasks():
+    _purge_finished_tasks()
@@ -1,3 +1,1170 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import json
+import os
+import pstats
+import smtplib
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from PIL import Image as PILImage
+from prometheus_client import generate_latest
+from rest_framework.exceptions import ErrorDetail
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from blog.models import Link, Post, Image
+from experiences.models import Experience, ExperienceLink, ExperienceSkillRef
+from projects.models import Project, ProjectLink, ProjectMedia, ProjectSkillRef
+from projects.serializers import ProjectSkillRefSerializer
+from skills.models import Skill, SkillReference
+from users.authentication import issue_tokens
+from .assets import drain_asset_deletions, enqueue_asset_deletion, public_id_of
+from .async_reads import PublicReadPattern
+from .compression import ENCODINGS, compress, negotiate
+from .loadbench import compare, mann_whitney
+from .metrics import _registry
+from .nplusone import NPlusOneError, detect
+from .renderers import FastJSONRenderer
+from .seeding import seed_bench_data
+from .slow_queries import fingerprint, normalize
+from .summary import invalidate_admin_summary
+from . import contact_guard, taskqueue, uploads
+from .checks import check_ratelimit_cache
+from .mail import flush_outbound_email, queue_mail
+from .management.commands.startup_profile import by_package, parse_importtime
+from .middleware import StatefulMiddlewareStack
+from .models import (
+    About, ContactMessage, HeroSection, IdempotencyKey, OutboundEmail, PendingAssetDeletion, StoredAsset, Task,
+    SlowQuery, UploadSession,
+)
+from .urls import urlpatterns
+
+
+def _png_bytes(color='red'):
+    buf = BytesIO()
+    PILImage.new('RGB', (4, 4), color).save(buf, 'png')
+    return buf.getvalue()
+
+
+class AssetDeletionQueueTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(title='P', description='d')
+        ProjectMedia.objects.create(project=self.project, image='image/upload/v1/projects/a.jpg')
+        ProjectMedia.objects.create(project=self.project, image='image/upload/v1/projects/b.jpg')
+
+    def queued(self):
+        return set(PendingAssetDeletion.objects.values_list('resource_type', 'public_id'))
+
+    def test_cascade_delete_queues_assets(self):
+        self.project.delete()
+        self.assertEqual(self.queued(), {('image', 'projects/a'), ('image', 'projects/b')})
+
+    def test_queryset_delete_queues_blog_images(self):
+        post = Post.objects.create(title='T', content='c')
+        Image.objects.create(post=post, image='image/upload/v1/blog/x.png')
+        Post.objects.all().delete()
+        self.assertIn(('image', 'blog/x'), self.queued())
+
+    def test_replacing_hero_image_queues_previous_asset(self):
+        hero = HeroSection.objects.create(headline='Hi', image='image/upload/v1/hero/old.jpg')
+        hero.image = None
+        hero.save()
+        self.assertEqual(self.queued(), {('image', 'hero/old')})
+
+    def test_delivery_urls_keep_the_folders_of_the_public_id(self):
+        url = 'https://res.cloudinary.com/demo/image/upload/v1712/portfolio/projects/abc.jpg'
+        self.assertEqual(public_id_of(url), 'portfolio/projects/abc')
+        self.assertEqual(public_id_of('https://res.cloudinary.com/demo/image/upload/abc.jpg'), 'abc')
+        self.assertEqual(public_id_of('https://res.cloudinary.com/demo/raw/upload/v3/media/cv.pdf'), 'media/cv.pdf')
+        enqueue_asset_deletion(url)
+        self.assertEqual(self.queued(), {('image', 'portfolio/projects/abc')})
+
+    @mock.patch('cloudinary.api.delete_resources')
+    def test_drain_uses_one_bulk_call(self, delete_resources):
+        self.project.delete()
+        delete_resources.return_value = {'deleted': {'projects/a': 'deleted', 'projects/b': 'not_found'}}
+        self.assertEqual(drain_asset_deletions(), (2, 0))
+        delete_resources.assert_called_once()
+        self.assertEqual(sorted(delete_resources.call_args.args[0]), ['projects/a', 'projects/b'])
+        self.assertFalse(PendingAssetDeletion.objects.exists())
+
+    @override_settings(ASSET_DELETION_MAX_ATTEMPTS=1)
+    @mock.patch('cloudinary.api.delete_resources', side_effect=Exception('rate limited'))
+    def test_failures_are_rescheduled_until_max_attempts(self, delete_resources):
+        self.project.delete()
+        self.assertEqual(drain_asset_deletions(), (0, 2))
+        row = PendingAssetDeletion.objects.first()
+        self.assertEqual(row.attempts, 1)
+        self.assertIn('rate limited', row.last_error)
+        # exhausted rows are kept for inspection but never claimed again
+        self.assertEqual(drain_asset_deletions(), (0, 0))
+
+    @mock.patch('cloudinary.api.resources')
+    def test_orphan_sweep_is_scoped_and_only_reports_by_default(self, resources):
+        resources.side_effect = lambda **options: {'resources': [
+            {'public_id': f"{options['prefix']}a"}, {'public_id': f"{options['prefix']}orphan"},
+        ] if options['resource_type'] == 'image' else []}
+        with self.assertRaises(CommandError):
+            call_command('sweep_orphan_assets', stdout=StringIO())
+        call_command('sweep_orphan_assets', '--prefix', 'projects/', stdout=StringIO())
+        self.assertEqual(resources.call_args.kwargs['prefix'], 'projects/')
+        self.assertEqual(self.queued(), set())
+        call_command('sweep_orphan_assets', '--prefix', 'projects/', '--delete', stdout=StringIO())
+        self.assertEqual(self.queued(), {('image', 'projects/orphan')})
+
+
+def _fake_upload(file, **options):
+    _fake_upload.calls += 1
+    return {'public_id': f'uploaded/{_fake_upload.calls}', 'version': 1, 'format': 'png',
+            'type': 'upload', 'resource_type': options.get('resource_type', 'image')}
+
+
+@mock.patch('cloudinary.uploader.upload', side_effect=_fake_upload)
+class AssetDeduplicationTests(APITestCase):
+    def setUp(self):
+        _fake_upload.calls = 0
+        self.user = get_user_model().objects.create_user(username='admin', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(title='P', description='d')
+
+    def upload(self, name='a.png', color='red'):
+        return SimpleUploadedFile(name, _png_bytes(color), content_type='image/png')
+
+    def test_identical_images_share_one_asset(self, upload):
+        url = reverse('project-add-media', args=[self.project.id])
+        resp = self.client.post(url, {'images': [self.upload('a.png'), self.upload('b.png')]}, format='multipart')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(upload.call_count, 1)
+        public_ids = {m.image.public_id for m in self.project.media.all()}
+        self.assertEqual(public_ids, {'uploaded/1'})
+        self.assertEqual(StoredAsset.objects.get().ref_count, 2)
+
+    def test_asset_is_queued_only_when_last_reference_goes(self, upload):
+        url = reverse('project-add-media', args=[self.project.id])
+        self.client.post(url, {'images': [self.upload(), self.upload()]}, format='multipart')
+        first, second = self.project.media.all()
+        first.delete()
+        self.assertFalse(PendingAssetDeletion.objects.exists())
+        self.assertEqual(StoredAsset.objects.get().ref_count, 1)
+        second.delete()
+        self.assertFalse(StoredAsset.objects.exists())
+        self.assertTrue(PendingAssetDeletion.objects.filter(public_id='uploaded/1').exists())
+
+
+@mock.patch('cloudinary.uploader.upload', side_effect=_fake_upload)
+class ResumableUploadTests(APITestCase):
+    def setUp(self):
+        _fake_upload.calls = 0
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(UPLOAD_SESSION_DIR=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.admin = get_user_model().objects.create_superuser(username='admin', password='pass')
+        self.client.force_authenticate(user=self.admin)
+        self.content = _png_bytes('blue')
+
+    def start(self, sha256=None):
+        resp = self.client.post(reverse('upload_session_create'), {
+            'kind': 'image', 'filename': 'shot.png', 'content_type': 'image/png',
+            'size': len(self.content), 'sha256': sha256 or hashlib.sha256(self.content).hexdigest(),
+        }, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return resp.data['id']
+
+    def put(self, upload_id, start, end):
+        return self.client.generic(
+            'PUT', reverse('upload_session_detail', args=[upload_id]), self.content[start:end + 1],
+            content_type='application/octet-stream', HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}',
+        )
+
+    def test_chunked_upload_resume_and_attach(self, upload):
+        upload_id = self.start()
+        middle = len(self.content) // 2
+        self.assertEqual(self.put(upload_id, 0, middle - 1).data['received'], middle)
+        # resending from a stale offset is rejected with the offset to resume from
+        self.assertEqual(self.put(upload_id, 0, middle - 1).status_code, 409)
+        resp = self.client.get(reverse('upload_session_detail', args=[upload_id]))
+        self.assertEqual(resp.data['received'], middle)
+        self.put(upload_id, middle, len(self.content) - 1)
+
+        resp = self.client.post(reverse('upload_session_finalize', args=[upload_id]))
+        self.assertEqual(resp.data['status'], UploadSession.STATUS_COMPLETE)
+        self.assertEqual(upload.call_count, 1)
+
+        project = Project.objects.create(title='P')
+        resp = self.client.post(reverse('project-add-media', args=[project.id]), {'upload_ids': [upload_id]}, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(project.media.get().image.public_id, 'uploaded/1')
+        # an upload can only be attached once
+        resp = self.client.post(reverse('project-add-media', args=[project.id]), {'upload_ids': [upload_id]}, format='json')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_failed_attach_releases_the_stored_files(self, upload):
+        upload_id = self.start()
+        self.put(upload_id, 0, len(self.content) - 1)
+        self.client.post(reverse('upload_session_finalize', args=[upload_id]))
+        project = Project.objects.create(title='P')
+        image = SimpleUploadedFile('new.png', _png_bytes('yellow'), content_type='image/png')
+        # the same upload twice: the second attach fails after the file was stored
+        resp = self.client.post(reverse('project-add-media', args=[project.id]),
+                                {'images': [image], 'upload_ids': [upload_id, upload_id]}, format='multipart')
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(project.media.exists())
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, UploadSession.STATUS_COMPLETE)
+        self.assertFalse(StoredAsset.objects.filter(public_id='uploaded/2').exists())
+        self.assertTrue(PendingAssetDeletion.objects.filter(public_id='uploaded/2').exists())
+
+    def test_checksum_mismatch_is_rejected(self, upload):
+        upload_id = self.start(sha256='0' * 64)
+        self.put(upload_id, 0, len(self.content) - 1)
+        resp = self.client.post(reverse('upload_session_finalize', args=[upload_id]))
+        self.assertEqual(resp.status_code, 400)
+        upload.assert_not_called()
+        # the corrupted bytes are dropped: the client uploads again from the start
+        self.assertEqual(self.client.get(reverse('upload_session_detail', args=[upload_id])).data['received'], 0)
+        self.assertEqual(self.put(upload_id, 0, len(self.content) - 1).status_code, 200)
+
+    def test_finalizing_twice_stores_the_file_once(self, upload):
+        upload_id = self.start()
+        self.put(upload_id, 0, len(self.content) - 1)
+        stale = UploadSession.objects.get(pk=upload_id)
+        uploads.finalize(stale)
+        # a concurrent call still holding the session as it was before
+        self.assertEqual(uploads.finalize(stale).status, UploadSession.STATUS_COMPLETE)
+        self.assertEqual(upload.call_count, 1)
+
+    def test_invalid_image_restarts_the_upload(self, upload):
+        self.content = b'not an image at all'
+        upload_id = self.start()
+        self.put(upload_id, 0, len(self.content) - 1)
+        resp = self.client.post(reverse('upload_session_finalize', args=[upload_id]))
+        self.assertEqual((resp.status_code, resp.data['offset']), (400, '0'))
+        upload.assert_not_called()
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual((session.status, session.received), (UploadSession.STATUS_UPLOADING, 0))
+        self.assertEqual(self.put(upload_id, 0, len(self.content) - 1).status_code, 200)
+
+    def test_remote_upload_runs_once_the_session_is_taken(self, upload):
+        upload_id = self.start()
+        self.put(upload_id, 0, len(self.content) - 1)
+        statuses = []
+
+        def failing_upload(file, **options):
+            statuses.append(UploadSession.objects.get(pk=upload_id).status)
+            raise ConnectionError('storage unreachable')
+
+        upload.side_effect = failing_upload
+        with self.assertRaises(ConnectionError):
+            uploads.finalize(UploadSession.objects.get(pk=upload_id))
+        self.assertEqual(statuses, [UploadSession.STATUS_FINALIZING])
+        # the received file is kept: finalizing again does not need a new upload
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual((session.status, session.received), (UploadSession.STATUS_UPLOADING, len(self.content)))
+        upload.side_effect = _fake_upload
+        self.assertEqual(uploads.finalize(session).status, UploadSession.STATUS_COMPLETE)
+
+    def test_part_written_on_another_host_is_a_conflict(self, upload):
+        upload_id = self.start()
+        # a host that does not share UPLOAD_SESSION_DIR
+        with override_settings(UPLOAD_SESSION_DIR=os.path.join(settings.UPLOAD_SESSION_DIR, 'other-host')):
+            resp = self.put(upload_id, 0, len(self.content) - 1)
+        self.assertEqual(resp.status_code, 409)
+        self.assertIn('UPLOAD_SESSION_DIR', str(resp.data['detail']))
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).received, 0)
+
+
+@mock.patch('cloudinary.uploader.upload', side_effect=_fake_upload)
+class IdempotencyKeyTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # contact form throttle buckets
+        _fake_upload.calls = 0
+        self.user = get_user_model().objects.create_user(username='admin', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(title='P', description='d')
+        self.url = reverse('project-add-media', args=[self.project.id])
+
+    def post_image(self, key, color='red'):
+        image = SimpleUploadedFile('a.png', _png_bytes(color), content_type='image/png')
+        return self.client.post(self.url, {'images': [image]}, format='multipart', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self, upload):
+        first = self.post_image('k1')
+        self.assertEqual(first.status_code, 201, first.data)
+        retry = self.post_image('k1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(upload.call_count, 1)
+        self.assertEqual(self.project.media.count(), 1)
+
+    def test_reused_key_with_other_payload_is_rejected(self, upload):
+        self.post_image('k1')
+        resp = self.post_image('k1', color='green')
+        self.assertEqual(resp.status_code, 422)
+        self.assertEqual(self.project.media.count(), 1)
+
+    def test_reused_key_with_other_file_of_the_same_name_and_size_is_rejected(self, upload):
+        first, second = _png_bytes('red'), _png_bytes('green')
+        second = second[:len(first)].ljust(len(first), b'\0')
+        for content in (first, second):
+            image = SimpleUploadedFile('a.png', content, content_type='image/png')
+            resp = self.client.post(self.url, {'images': [image]}, format='multipart', HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(resp.status_code, 422)
+        self.assertEqual(self.project.media.count(), 1)
+
+    def test_duplicate_of_in_flight_request_gets_conflict(self, upload):
+        self.post_image('k1')
+        IdempotencyKey.objects.update(status=IdempotencyKey.STATUS_IN_PROGRESS)
+        resp = self.post_image('k1')
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(self.project.media.count(), 1)
+
+    def test_anonymous_contact_form_is_deduplicated(self, upload):
+        self.client.force_authenticate(user=None)
+        payload = {'name': 'Ana', 'email': 'a@example.com', 'message': 'Hello there, is this still open?', 'fill_ms': 30000}
+        for _ in range(2):
+            resp = self.client.post(reverse('contact_create'), payload, format='json', HTTP_IDEMPOTENCY_KEY='c1')
+            self.assertEqual(resp.status_code, 201)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+
+@taskqueue.task(name='core.tests.record', max_attempts=2)
+def record_task(value, fail=False):
+    if fail:
+        raise RuntimeError('boom')
+    record_task.calls.append(value)
+
+
+class TaskQueueTests(APITestCase):
+    def setUp(self):
+        record_task.calls = []
+
+    def run_due(self):
+        for task in taskqueue.claim('test-worker', limit=10):
+            taskqueue.execute(task)
+
+    def test_due_tasks_run_by_priority(self):
+        record_task.enqueue('low')
+        record_task.enqueue('high', priority=5)
+        record_task.enqueue('later', delay=3600)
+        self.run_due()
+        self.assertEqual(record_task.calls, ['high', 'low'])
+        self.assertEqual(Task.objects.filter(status=Task.STATUS_SUCCEEDED).count(), 2)
+        self.assertEqual(Task.objects.get(status=Task.STATUS_QUEUED).args, ['later'])
+
+    def test_failures_back_off_then_go_dead(self):
+        task = record_task.enqueue('x', fail=True)
+        with self.assertLogs('core.taskqueue', 'WARNING'):
+            self.run_due()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.STATUS_QUEUED, 1))
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('boom', task.last_error)
+
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.taskqueue', 'WARNING'):
+            self.run_due()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.STATUS_DEAD)
+
+    def test_keyed_enqueue_coalesces(self):
+        first = record_task.enqueue('a', key='k', delay=600)
+        second = record_task.enqueue('a', key='k')
+        self.assertEqual(first.pk, second.pk)
+        self.assertLessEqual(second.run_at, timezone.now())
+
+    def test_stale_running_task_is_requeued(self):
+        task = record_task.enqueue('x')
+        taskqueue.claim('gone-worker')
+        Task.objects.filter(pk=task.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(taskqueue.recover_stale_tasks(timeout=60), 1)
+        self.run_due()
+        self.assertEqual(record_task.calls, ['x'])
+
+    def test_status_endpoint_is_admin_only(self):
+        record_task.enqueue('x')
+        url = reverse('task_queue_status')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_authenticate(get_user_model().objects.create_superuser(username='root', password='pass'))
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['counts'][Task.STATUS_QUEUED], 1)
+
+
+class OutboundEmailTests(APITestCase):
+    def test_queued_messages_are_sent_over_one_connection(self):
+        for i in range(3):
+            queue_mail(f'Subject {i}', 'Body', ['a@example.com'])
+        self.assertEqual(len(mail.outbox), 0)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as open_:
+            self.assertEqual(flush_outbound_email(), (3, 0))
+        self.assertEqual(open_.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+    def test_transient_failures_are_retried_permanent_ones_are_not(self):
+        transient = queue_mail('Transient', 'Body', ['a@example.com'])
+        permanent = queue_mail('Permanent', 'Body', ['b@example.com'])
+        errors = [smtplib.SMTPServerDisconnected('gone'),
+                  smtplib.SMTPRecipientsRefused({'b@example.com': (550, b'no such user')})]
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=errors), \
+                self.assertLogs('core.mail', 'WARNING'):
+            self.assertEqual(flush_outbound_email(), (0, 2))
+        transient.refresh_from_db()
+        permanent.refresh_from_db()
+        self.assertEqual(transient.status, OutboundEmail.STATUS_QUEUED)
+        self.assertGreater(transient.send_after, timezone.now())
+        self.assertEqual(permanent.status, OutboundEmail.STATUS_FAILED)
+
+    def test_new_contact_message_notifies_hiring_email(self):
+        cache.clear()
+        About.objects.create(hiring_email='owner@example.com')
+        resp = self.client.post(reverse('contact_create'), {
+            'name': 'Ana', 'email': 'ana@example.com', 'message': 'Are you available in May?', 'fill_ms': 30000,
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.to, email.reply_to), (['owner@example.com'], ['ana@example.com']))
+
+
+class AdminSummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(get_user_model().objects.create_superuser(username='root', password='pass'))
+        ContactMessage.objects.create(email='a@example.com', message='m', is_read=True)
+        ContactMessage.objects.create(email='b@example.com', message='m')
+        Project.objects.create(title='P')
+
+    def test_counts_come_from_one_query_and_are_cached(self):
+        url = reverse('admin_summary')
+        with self.assertNumQueries(1):
+            resp = self.client.get(url)
+        self.assertEqual(resp.data, {'unread_contacts': 1, 'total_contacts': 2, 'projects': 1, 'posts': 0, 'experiences': 0})
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_creating_or_deleting_content_refreshes_the_totals(self):
+        url = reverse('admin_summary')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='Premier article', content='Texte')
+        self.assertEqual(self.client.get(url).data['posts'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.all().delete()
+        self.assertEqual(self.client.get(url).data['projects'], 0)
+        # an edit does not change the totals and keeps the cached value
+        self.client.get(url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            post.save()
+        self.assertNotIn(invalidate_admin_summary, callbacks)
+
+    def test_deleting_a_contact_refreshes_the_badge(self):
+        url = reverse('admin_summary')
+        self.client.get(url)
+        unread = ContactMessage.objects.get(is_read=False)
+        self.client.delete(reverse('contact_admin_detail', args=[unread.pk]))
+        self.assertEqual(self.client.get(url).data['unread_contacts'], 0)
+
+
+class ContactBulkActionTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(get_user_model().objects.create_superuser(username='root', password='pass'))
+        self.spam = [ContactMessage.objects.create(email=f'bot{i}@spam.test', message='buy') for i in range(3)]
+        self.real = ContactMessage.objects.create(email='ana@example.com', message='hello', is_read=True)
+        self.url = reverse('contact_admin_bulk')
+
+    def test_mark_read_by_ids_is_one_update(self):
+        with self.assertNumQueries(1):
+            resp = self.client.post(self.url, {'action': 'mark_read', 'ids': [m.pk for m in self.spam[:2]]}, format='json')
+        self.assertEqual(resp.data, {'action': 'mark_read', 'affected': 2})
+        self.assertEqual(ContactMessage.objects.filter(is_read=False).count(), 1)
+
+    def test_delete_by_filter(self):
+        resp = self.client.post(self.url, {'action': 'delete', 'filter': {'email_domain': 'spam.test', 'is_read': False}}, format='json')
+        self.assertEqual(resp.data['affected'], 3)
+        self.assertEqual(list(ContactMessage.objects.all()), [self.real])
+
+    def test_empty_or_unknown_filter_is_rejected(self):
+        for payload in ({'action': 'delete', 'filter': {}}, {'action': 'delete', 'filter': {'message': 'x'}},
+                        {'action': 'delete'}):
+            self.assertEqual(self.client.post(self.url, payload, format='json').status_code, 400)
+        self.assertEqual(ContactMessage.objects.count(), 4)
+
+    def test_list_is_filtered_and_paginated(self):
+        resp = self.client.get(reverse('contact_admin_list'), {'is_read': 'false', 'page_size': 2})
+        self.assertEqual(resp.data['count'], 3)
+        self.assertEqual(len(resp.data['results']), 2)
+
+    def test_export_streams_filtered_rows(self):
+        ContactMessage.objects.create(email='eve@example.com', subject='=HYPERLINK("x")', message='hi')
+        resp = self.client.get(reverse('contact_admin_export'), {'output': 'csv', 'email_domain': 'example.com'})
+        self.assertTrue(resp.streaming)
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,name,email,subject,message,created_at,is_read,is_archived')
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"\'=HYPERLINK(""x"")"', lines[2])
+
+        resp = self.client.get(reverse('contact_admin_export'), {'output': 'ndjson', 'is_read': 'true'})
+        rows = [json.loads(line) for line in b''.join(resp.streaming_content).splitlines()]
+        self.assertEqual([row['email'] for row in rows], ['ana@example.com'])
+
+
+class ContactGuardTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('contact_create')
+        self.payload = {
+            'name': 'Ana', 'email': 'ana@example.com', 'subject': 'Hi', 'message': 'Are you available in May?',
+            'fill_ms': 30000,
+        }
+
+    def post(self, **extra):
+        return self.client.post(self.url, {**self.payload, **extra}, format='json')
+
+    def test_duplicate_submission_is_dropped_without_writes(self):
+        stored = self.post()
+        with self.assertNumQueries(0):
+            dropped = self.post(email='ANA@example.com ')
+        self.assertEqual((dropped.status_code, dropped.data), (stored.status_code, stored.data))
+        self.assertEqual(ContactMessage.objects.count(), 1)
+        self.assertEqual(contact_guard.contact_counters()['duplicate'], 1)
+
+    def test_honeypot_and_fast_submissions_are_dropped(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post(website='http://spam.test').status_code, 201)
+            self.assertEqual(self.post(fill_ms=800).status_code, 201)
+            # a client that does not run the form's script sends no fill time
+            self.assertEqual(self.post(fill_ms=None).status_code, 201)
+            self.assertEqual(self.post(fill_ms='soon').status_code, 201)
+        self.assertEqual(self.post().status_code, 201)
+        counters = contact_guard.contact_counters()
+        self.assertEqual((counters['honeypot'], counters['too_fast'], counters['accepted']), (1, 3, 1))
+
+    @override_settings(CONTACT_THROTTLE_RATES={'ip': '2/minute', 'global': '100/minute'})
+    def test_per_ip_window(self):
+        with mock.patch('core.contact_guard.time.time', return_value=6000.0):
+            for i in range(2):
+                self.assertEqual(self.post(message=f'Message number {i} here').status_code, 201)
+            with self.assertNumQueries(0):
+                resp = self.post(message='One message too many')
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(resp['Retry-After'], '60')
+        with mock.patch('core.contact_guard.time.time', return_value=6060.0):
+            self.assertEqual(self.post(message='The next minute is a new window').status_code, 201)
+
+    def test_validation_error_releases_the_dedup_slot(self):
+        self.assertEqual(self.post(name='A').status_code, 400)
+        self.assertEqual(self.post().status_code, 201)
+
+    def test_deploy_check_reports_a_process_local_ratelimit_cache(self):
+        local = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'portfolio_ratelimit_cache'}
+        with override_settings(CACHES={'default': local, 'ratelimit': local}):
+            self.assertEqual([error.id for error in check_ratelimit_cache(None)], ['core.E001'])
+        with override_settings(CACHES={'default': local, 'ratelimit': shared}):
+            self.assertEqual(check_ratelimit_cache(None), [])
+
+
+class StatefulMiddlewareStackTests(TestCase):
+    def setUp(self):
+        self.seen = {}
+
+        def view(request):
+            self.seen = {name: hasattr(request, name) for name in ('session', 'user', '_messages')}
+            return HttpResponse('ok')
+
+        self.stack = StatefulMiddlewareStack(view)
+        self.factory = RequestFactory()
+
+    def test_api_paths_skip_the_stateful_middleware(self):
+        request = self.factory.post('/api/core/contact/', {}, HTTP_COOKIE='sessionid=abc')
+        self.assertIsNone(self.stack.process_view(request, lambda r: None, (), {}))
+        response = self.stack(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.seen, {'session': False, 'user': False, '_messages': False})
+        self.assertFalse(response.cookies)
+
+    def test_other_paths_keep_the_full_stack(self):
+        response = self.stack(self.factory.get('/'))
+        self.assertEqual(self.seen, {'session': True, 'user': True, '_messages': True})
+        self.assertEqual(response.status_code, 200)
+        # CsrfViewMiddleware's process_view still rejects unsafe requests without a token
+        request = self.factory.post('/contact/')
+        self.stack(request)
+        rejected = self.stack.process_view(request, lambda r: None, (), {})
+        self.assertEqual(rejected.status_code, 403)
+
+    def test_public_api_read_sets_no_cookies(self):
+        response = self.client.get(reverse('hero_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.cookies)
+
+
+class StartupProfileTests(TestCase):
+    def test_import_cost_is_grouped_by_package(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |     requests.compat\n"
+            "import time:       300 |        400 |   requests\n"
+            "import time:        50 |        450 | cloudinary_storage.storage\n"
+            "import time:        20 |         20 |   requests.api\n"
+            "import time:        10 |         30 | rest_framework.compat\n"
+        )
+        rows = parse_importtime(stderr)
+        self.assertEqual(rows[1], (300, 400, 1, 'requests'))
+        self.assertEqual(by_package(rows), [
+            (420, 'requests', 'cloudinary_storage.storage'),
+            (50, 'cloudinary_storage', '(top level)'),
+            (10, 'rest_framework', '(top level)'),
+        ])
+
+    def test_cv_storage_is_lazy_and_deconstructs_unchanged(self):
+        storage = About._meta.get_field('cv').storage
+        self.assertEqual(storage.deconstruct()[0], 'cloudinary_storage.storage.RawMediaCloudinaryStorage')
+        self.assertEqual(About._meta.get_field('cv').deconstruct()[3]['storage'], storage)
+
+
+@override_settings(PUBLIC_READ_CACHE_TTL=0)
+class AsyncPublicReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        HeroSection.objects.create(headline='Hello')
+        About.objects.create(hiring_email='me@example.com')
+        refs = [SkillReference.objects.create(name=name, id_icon=name.lower()) for name in ('Django', 'React')]
+        cls.skill = Skill.objects.create(reference=refs[0])
+        Skill.objects.create(reference=refs[1])
+        cls.project = Project.objects.create(title='Portfolio', description='Site')
+        ProjectMedia.objects.create(project=cls.project, image='image/upload/v1/projects/a.jpg')
+        ProjectLink.objects.create(project=cls.project, url='https://example.com', text='Demo')
+        ProjectSkillRef.objects.create(project=cls.project, skill_reference=refs[0])
+        cls.post = Post.objects.create(title='Premier article', content='Texte \u2028 é')
+        Image.objects.create(post=cls.post, image='image/upload/v1/blog/a.jpg', caption='Une image')
+        Link.objects.create(post=cls.post, url='https://example.com', text='Source')
+        for i in range(12):
+            experience = Experience.objects.create(title=f'Poste {i}', start_date=date(2020, 1, i + 1))
+            ExperienceLink.objects.create(experience=experience, url='https://example.com', text='Lien')
+            ExperienceSkillRef.objects.create(experience=experience, skill_reference=refs[i % 2])
+        cls.experience = experience
+
+    def paths(self):
+        return [
+            reverse('hero_list'), reverse('about_public'),
+            reverse('project-list'), reverse('project-detail', args=[self.project.pk]),
+            reverse('project-detail', args=[0]), reverse('project-detail', args=['abc']),
+            reverse('post-list'), reverse('post-detail', args=[self.post.slug]), reverse('post-detail', args=['missing']),
+            reverse('experience-list'), reverse('experience-list') + '?page=2',
+            reverse('experience-list') + '?page=9', reverse('experience-list') + '?page_size=5',
+            reverse('experience-detail', args=[self.experience.pk]),
+            reverse('skill-list'), reverse('skill-detail', args=[self.skill.pk]),
+        ]
+
+    def async_get(self, path, **extra):
+        with override_settings(ASYNC_PUBLIC_VIEWS=True):
+            return async_to_sync(self.async_client.get)(path, **extra)
+
+    def test_async_views_return_the_drf_responses(self):
+        for path in self.paths():
+            with self.subTest(path=path):
+                expected = self.client.get(path)
+                response = self.async_get(path)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response['Allow'], expected['Allow'])
+                self.assertEqual(response['Content-Type'], expected['Content-Type'])
+
+    def test_pattern_resolves_to_the_async_view_only_when_enabled(self):
+        pattern = next(p for p in urlpatterns if p.name == 'hero_list')
+        self.assertIsInstance(pattern, PublicReadPattern)
+        self.assertIs(pattern.callback, pattern.drf_view)
+        with override_settings(ASYNC_PUBLIC_VIEWS=True):
+            self.assertIs(pattern.callback, pattern.async_view)
+
+    def test_requests_outside_the_async_path_fall_back_to_drf(self):
+        path = reverse('project-list')
+        with mock.patch('projects.views.public_projects') as public_projects:
+            self.assertEqual(self.async_get(path + '?search=x').status_code, 200)
+            indented = self.async_get(path, headers={'accept': 'application/json; indent=2'})
+            self.assertTrue(indented.content.startswith(b'[\n  '))
+            self.assertEqual(self.async_get(path, headers={'authorization': 'Bearer x'}).status_code, 401)
+            with override_settings(ASYNC_PUBLIC_VIEWS=True):
+                response = async_to_sync(self.async_client.post)(path, {})
+            self.assertEqual(response.status_code, 401)
+        public_projects.assert_not_called()
+
+    @override_settings(PUBLIC_READ_CACHE_TTL=60)
+    def test_cached_responses_are_retired_on_save(self):
+        cache.clear()
+        path = reverse('hero_list')
+        self.async_get(path)
+        HeroSection.objects.update(headline='Stale')  # no signal: the cached body is served
+        self.assertIn(b'Hello', self.async_get(path).content)
+        hero = HeroSection.objects.get()
+        hero.headline = 'Nouveau'
+        with self.captureOnCommitCallbacks(execute=True):
+            hero.save()
+        self.assertIn(b'Nouveau', self.async_get(path).content)
+
+
+class FastJSONRendererTests(TestCase):
+    data = [{
+        'text': 'é \u2028 \u2029 \x1f \x7f "q" \\ / 😀', 'when': timezone.now(), 'day': date(2024, 2, 29),
+        'amount': Decimal('1.50'), 'error': ErrorDetail('Invalid.', code='invalid'), 'flag': True, 'none': None,
+        'big': 2 ** 70, 'keys': {1: 'one'},
+    }]
+
+    def test_same_bytes_as_the_drf_renderer(self):
+        for value in [self.data, *({key: value} for key, value in self.data[0].items()), None]:
+            with self.subTest(value=value):
+                self.assertEqual(FastJSONRenderer().render(value), JSONRenderer().render(value))
+        indented = 'application/json; indent=4'
+        self.assertEqual(FastJSONRenderer().render(self.data, indented), JSONRenderer().render(self.data, indented))
+
+    def test_stdlib_fallback_without_orjson(self):
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+
+@override_settings(COMPRESS_MIN_SIZE=1024)
+class CompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Post.objects.create(title='Long', content='Du contenu assez long. ' * 200)
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate('*'), 'gzip')
+        self.assertIsNone(negotiate('gzip;q=0, deflate'))
+        self.assertIsNone(negotiate(''))
+        self.assertIsNone(negotiate('identity'))
+
+    def test_large_api_json_is_gzipped(self):
+        plain = self.client.get(reverse('post-list'))
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        response = self.client.get(reverse('post-list'), headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) // 4)
+
+    def test_small_and_non_api_responses_are_not_compressed(self):
+        response = self.client.get(reverse('hero_list'), headers={'accept-encoding': 'gzip'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+        with override_settings(COMPRESS_MIN_SIZE=0):
+            response = self.client.get('/admin/login/', headers={'accept-encoding': 'gzip'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(ASYNC_PUBLIC_VIEWS=True, PUBLIC_READ_CACHE_TTL=60)
+    def test_cached_public_reads_are_compressed_once(self):
+        cache.clear()
+        path = reverse('post-list')
+        with mock.patch('core.compression.compress', wraps=compress) as spy:
+            first = async_to_sync(self.async_client.get)(path, headers={'accept-encoding': 'gzip'})
+            calls = spy.call_count
+            second = async_to_sync(self.async_client.get)(path, headers={'accept-encoding': 'gzip'})
+            plain = async_to_sync(self.async_client.get)(path)
+        self.assertEqual(calls, len(ENCODINGS))
+        self.assertEqual(spy.call_count, calls)
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(second.content), plain.content)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        cls.member = User.objects.create_user(username='member', email='member@example.com', password='pass')
+        project = Project.objects.create(title='Portfolio')
+        ProjectMedia.objects.create(project=project, image='image/upload/v1/projects/a.jpg')
+
+    def get(self, user=None):
+        headers = {'authorization': f"Bearer {issue_tokens(user)['access']}"} if user else {}
+        return self.client.get(reverse('project-list'), headers=headers)
+
+    def test_superusers_get_a_server_timing_header(self):
+        header = self.get(self.admin)['Server-Timing']
+        metrics = dict(part.split(';', 1) for part in header.split(', '))
+        self.assertEqual(list(metrics), ['total', 'sql', 'storage', 'render', 'app'])
+        self.assertRegex(metrics['sql'], r'^dur=[0-9.]+;desc="[1-9][0-9]* queries"$')
+        self.assertFalse(self.get(self.member).has_header('Server-Timing'))
+        self.assertFalse(self.get().has_header('Server-Timing'))
+
+    def test_only_sampled_requests_are_measured_without_metrics(self):
+        with override_settings(METRICS_ENABLED=False):
+            self.assertFalse(hasattr(self.get().wsgi_request, 'timings'))
+            with override_settings(REQUEST_TIMING_SAMPLE_RATE=1):
+                self.assertTrue(hasattr(self.get().wsgi_request, 'timings'))
+        with override_settings(METRICS_ENABLED=True):
+            self.assertTrue(hasattr(self.get().wsgi_request, 'timings'))
+
+    def test_sampled_requests_are_logged(self):
+        with self.assertNoLogs('core.instrumentation'):
+            self.get()
+        with override_settings(REQUEST_TIMING_SAMPLE_RATE=1), self.assertLogs('core.instrumentation') as logs:
+            response = self.get()
+        self.assertFalse(response.has_header('Server-Timing'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['path'], line['status']), (reverse('project-list'), 200))
+        self.assertGreater(line['queries'], 0)
+        self.assertGreaterEqual(line['total_ms'], line['sql_ms'])
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1, ASYNC_PUBLIC_VIEWS=True, PUBLIC_READ_CACHE_TTL=0)
+    def test_queries_of_async_views_are_counted(self):
+        with self.assertLogs('core.instrumentation') as logs:
+            async_to_sync(self.async_client.get)(reverse('project-list'))
+        self.assertGreater(json.loads(logs.records[0].getMessage())['queries'], 0)
+
+
+# increments the request counter of project-list once, in a worker process of its own
+_METRICS_WORKER = """
+import django
+django.setup()
+from django.test import RequestFactory
+from django.urls import resolve
+from core.metrics import record_request
+request = RequestFactory().get('/api/projects/')
+request.resolver_match = resolve('/api/projects/')
+record_request(request, 200, 0.02, 3)
+"""
+
+
+@override_settings(METRICS_TOKEN='scrape-token', METRICS_ENABLED=True)
+class MetricsTests(TestCase):
+    def scrape(self, token='scrape-token'):
+        return self.client.get('/metrics', headers={'authorization': f'Bearer {token}'})
+
+    def test_endpoint_requires_the_token(self):
+        self.assertEqual(self.scrape('wrong').status_code, 401)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.scrape('').status_code, 404)
+
+    def test_requests_are_counted_per_route(self):
+        before = self.scrape().content.decode()
+        self.client.get(reverse('project-list'))
+        self.client.get('/api/no-such-route/')
+        text = self.scrape().content.decode()
+        series = 'portfolio_http_requests_total{method="GET",route="project-list",status="200"}'
+        self.assertIn(series, text)
+        self.assertIn('route="unresolved",status="404"', text)
+        self.assertNotIn('no-such-route', text)
+        self.assertIn('portfolio_http_request_db_queries_bucket{le="0.0",route="project-list"}', text)
+        self.assertNotEqual(before, text)
+        self.assertIn('portfolio_task_queue_tasks{status="queued"} 0.0', text)
+        self.assertIn('portfolio_outbound_email_queued 0.0', text)
+
+    def test_worker_processes_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory, 'DJANGO_SETTINGS_MODULE': 'portfolio.settings'}
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', _METRICS_WORKER], env=env, check=True, cwd=settings.BASE_DIR)
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                text = generate_latest(_registry()).decode()
+        self.assertIn('portfolio_http_requests_total{method="GET",route="project-list",status="200"} 2.0', text)
+        self.assertIn('portfolio_http_request_db_queries_sum{route="project-list"} 6.0', text)
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        cls.member = User.objects.create_user(username='member', email='member@example.com', password='pass')
+        Project.objects.create(title='Portfolio')
+
+    def report(self, user, method='get', query=''):
+        headers = {'authorization': f"Bearer {issue_tokens(user)['access']}"}
+        return getattr(self.client, method)(reverse('slow_query_report') + query, headers=headers)
+
+    def test_literals_and_in_lists_share_a_fingerprint(self):
+        first = normalize('SELECT * FROM t WHERE a IN (%s, %s) AND b = \'x\'  LIMIT 21')
+        second = normalize('SELECT * FROM t WHERE a IN (%s) AND b = \'it\'\'s\' LIMIT 5')
+        self.assertEqual(first, 'SELECT * FROM t WHERE a IN (...) AND b = ? LIMIT ?')
+        self.assertEqual(fingerprint(first), fingerprint(second))
+
+    def test_slow_queries_of_a_view_are_logged_and_grouped(self):
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6), self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('project-list') + '?search=port')
+            self.client.get(reverse('project-list') + '?search=folio')
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        search = next(entry for entry in entries if 'LIKE' in entry['sql'])
+        self.assertEqual(search['view'], 'project-list')
+        self.assertRegex(search['frame'], r'^(core|projects)/\w+\.py:\d+ in \w+$')
+        self.assertIn("'%port%'", search['params'])
+        self.assertIn('SCAN', search['plan'])
+        recorded = SlowQuery.objects.get(fingerprint=search['fingerprint'])
+        self.assertEqual(recorded.count, 2)
+        self.assertIn("'%folio%'", recorded.params)
+        self.assertNotIn('port', recorded.statement)
+        self.assertGreaterEqual(recorded.total_ms, recorded.max_ms)
+
+    def test_queries_outside_requests_are_recorded_at_once(self):
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6), self.assertLogs('core.slow_queries', 'WARNING'):
+            Project.objects.filter(title='Portfolio').exists()
+        recorded = SlowQuery.objects.get(statement__contains='"projects_project"."title" = ?')
+        self.assertEqual(recorded.view, '')
+        self.assertTrue(recorded.frame.startswith('core/tests.py:'))
+
+    def test_fast_queries_are_not_logged(self):
+        with self.assertNoLogs('core.slow_queries'):
+            self.client.get(reverse('project-list'))
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_report_ranks_offenders_for_superusers(self):
+        SlowQuery.objects.create(fingerprint='a', statement='SELECT ?', count=9, total_ms=90, max_ms=20, frame='x')
+        SlowQuery.objects.create(fingerprint='b', statement='SELECT ?', count=1, total_ms=500, max_ms=500, frame='x')
+        self.assertEqual(self.report(self.member).status_code, 403)
+        ranked = self.report(self.admin).json()
+        self.assertEqual([row['fingerprint'] for row in ranked], ['b', 'a'])
+        self.assertEqual(ranked[1]['mean_ms'], 10)
+        by_count = self.report(self.admin, query='?sort=count').json()
+        self.assertEqual(by_count[0]['fingerprint'], 'a')
+        self.assertEqual(self.report(self.admin, query='?sort=sql').status_code, 400)
+        self.assertEqual(self.report(self.admin, 'delete').status_code, 204)
+        self.assertFalse(SlowQuery.objects.exists())
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        cls.member = User.objects.create_user(username='member', email='member@example.com', password='pass')
+        Project.objects.create(title='Portfolio')
+
+    def get(self, user=None, query='?_profile=1', **headers):
+        if user is not None:
+            headers['authorization'] = f"Bearer {issue_tokens(user)['access']}"
+        return self.client.get(reverse('project-list') + query, headers=headers)
+
+    def test_superusers_get_the_report_of_the_request(self):
+        response = self.get(self.admin)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(response['X-Profiled-Status'], '200')
+        report = response.content.decode()
+        self.assertTrue(report.startswith('GET /api/projects/?_profile=1 -> 200'))
+        self.assertIn('cumulative', report)
+        self.assertIn('core/projections.py', report)
+        self.assertIn('django/db/', report)
+        self.assertFalse(response.has_header('X-Profile-File'))
+
+        by_own_time = self.get(self.admin, query='', x_profile='tottime').content.decode()
+        self.assertIn('internal time', by_own_time)
+
+    def test_requests_served_under_asgi_are_profiled_too(self):
+        headers = {'authorization': f"Bearer {issue_tokens(self.admin)['access']}"}
+        response = async_to_sync(self.async_client.get)(reverse('project-list') + '?_profile=1', headers=headers)
+        self.assertEqual(response['X-Profiled-Status'], '200')
+        self.assertIn('core/projections.py', response.content.decode())
+
+    def test_flag_is_ignored_for_other_users(self):
+        for user in (None, self.member):
+            response = self.get(user)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertFalse(response.has_header('X-Profiled-Status'))
+        with mock.patch('core.profiling.cProfile.Profile') as profiler:
+            self.get(self.admin, query='')
+        profiler.assert_not_called()
+
+    def test_memory_mode_reports_the_peak_and_allocation_sites(self):
+        response = self.get(self.admin, query='?_profile=memory')
+        self.assertEqual(response['X-Profiled-Status'], '200')
+        self.assertGreater(int(response['X-Peak-Memory']), 0)
+        report = response.content.decode()
+        self.assertIn('Peak: ', report)
+        self.assertIn('allocation sites still held', report)
+        self.assertNotIn(str(settings.BASE_DIR), report)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_stats_are_saved_to_profile_dir(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILE_DIR=directory):
+            name = self.get(self.admin)['X-Profile-File']
+            self.assertRegex(name, r'^\d{8}T\d{12}-project-list-GET\.prof$')
+            stats = pstats.Stats(os.path.join(directory, name))
+        self.assertGreater(stats.total_calls, 0)
+
+
+class SeedBenchDataTests(TestCase):
+    sizes = {'skill_references': 20, 'skills': 10, 'projects': 30, 'posts': 15, 'experiences': 10, 'contacts': 40}
+
+    def seeded(self, seed):
+        with transaction.atomic():
+            counts = seed_bench_data(self.sizes, seed=seed, batch_size=7)
+            querysets = (
+                Project.objects.values_list('title', 'description', 'media__image'),
+                Post.objects.values_list('slug', 'links__url'),
+                Experience.objects.values_list('title', 'start_date', 'experienceskillref__skill_reference__name'),
+                ContactMessage.objects.values_list('email', 'created_at', 'is_read'),
+            )
+            rows = [sorted(tuple(map(str, row)) for row in queryset) for queryset in querysets]
+            transaction.set_rollback(True)
+        return counts, rows
+
+    def test_same_seed_same_rows(self):
+        counts, rows = self.seeded(3)
+        self.assertEqual(counts['projects.Project'], 30)
+        self.assertEqual(counts['skills.Skill'], 10)
+        self.assertEqual(counts['core.ContactMessage'], 40)
+        self.assertGreaterEqual(counts['projects.ProjectMedia'], 30)
+        self.assertTrue(all(image.startswith('bench/projects/bench3-') for _, _, image in rows[0]))
+        self.assertEqual(self.seeded(3), (counts, rows))
+        self.assertNotEqual(self.seeded(4)[1], rows)
+        self.assertFalse(PendingAssetDeletion.objects.exists())
+
+    def test_command_refuses_a_seed_already_used(self):
+        sizes = [f"--{name.replace('_', '-')}={size}" for name, size in self.sizes.items()]
+        out = StringIO()
+        call_command('seed_bench_data', '--seed=2', *sizes, stdout=out)
+        self.assertIn('projects.Project', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('seed_bench_data', '--seed=2', *sizes, stdout=StringIO())
+
+
+class LoadBenchTests(TransactionTestCase):
+    """The requests run in worker threads, on their own connections: the rows must be committed."""
+
+    @staticmethod
+    def result(latencies, queries=2.0):
+        route = {'p50_ms': sorted(latencies)[len(latencies) // 2], 'queries': queries, 'latencies_ms': latencies}
+        return {'servers': {'wsgi': {'routes': {'project-list': route}}}}
+
+    def test_mann_whitney(self):
+        # U = 0 for two samples of five: scipy's asymptotic p-value is 0.0122
+        self.assertAlmostEqual(mann_whitney([1, 2, 3, 4, 5], [6, 7, 8, 9, 10]), 0.0122, places=4)
+        self.assertEqual(mann_whitney([3, 3, 3], [3, 3, 3]), 1.0)
+
+    def test_compare_reports_significant_changes_only(self):
+        before = self.result([10 + i % 7 for i in range(200)])
+        (row,) = compare(before, self.result([14 + i % 7 for i in range(200)]))
+        self.assertEqual(row['verdict'], 'regression')
+        (row,) = compare(before, self.result([10 + (i + 3) % 7 for i in range(200)]))
+        self.assertEqual(row['verdict'], '')
+        (row,) = compare(before, self.result([10 + i % 7 for i in range(200)], queries=12.0))
+        self.assertEqual(row['verdict'], 'regression')
+
+    def test_command_runs_both_servers_and_compares(self):
+        seed_bench_data({'skill_references': 10, 'skills': 5, 'projects': 20, 'posts': 10, 'experiences': 5,
+                         'contacts': 20})
+        output = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        options = {'requests': 60, 'clients': 2, 'warmup': 0, 'stdout': StringIO(), 'stderr': StringIO()}
+        call_command('bench', output=output, **options)
+        with open(output) as source:
+            results = json.load(source)
+        self.assertEqual(set(results['servers']), {'wsgi', 'asgi'})
+        for result in results['servers'].values():
+            self.assertEqual(sum(route['requests'] for route in result['routes'].values()), 60)
+            self.assertEqual(sum(route['errors'] for route in result['routes'].values()), 0)
+        self.assertFalse(Project.objects.filter(title__startswith='bench-create ').exists())
+
+        out = StringIO()
+        call_command('bench', '--diff', output, output, stdout=out)
+        self.assertIn('project-list', out.getvalue())
+        self.assertNotIn('REGRESSION', out.getvalue())
+
+
+@override_settings(PUBLIC_READ_CACHE_TTL=0)
+class MemoryBudgetTests(TestCase):
+    """Peak Python allocations of the largest responses, at a fixed data size.
+
+    A budget failing means a list now holds much more per row, or stopped
+    being bounded; raise it only with the reason in the commit.
+    """
+    sizes = {'skill_references': 40, 'skills': 20, 'projects': 400, 'posts': 200, 'experiences': 100,
+             'contacts': 1000}
+    budgets = {  # url name: (query, bytes)
+        'project-list': ('', 5_500_000),
+        'post-list': ('', 2_750_000),
+        'experience-list': ('', 200_000),
+        'contact_admin_list': ('?page_size=500', 2_500_000),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bench_data(cls.sizes, seed=9)
+        admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        cls.token = issue_tokens(admin)['access']
+
+    def test_routes_stay_within_their_budget(self):
+        for name, (query, budget) in self.budgets.items():
+            with self.subTest(name):
+                response = self.client.get(reverse(name) + query, headers={
+                    'authorization': f'Bearer {self.token}', 'x-profile': 'memory',
+                })
+                self.assertEqual(response['X-Profiled-Status'], '200')
+                peak = int(response['X-Peak-Memory'])
+                self.assertLessEqual(peak, budget, f'{name} peaked at {peak} bytes\n{response.content.decode()}')
+
+
+class ProjectWithSkillsSerializer(serializers.ModelSerializer):
+    skills_list = ProjectSkillRefSerializer(source='projectskillref_set', many=True)
+
+    class Meta:
+        model = Project
+        fields = ('id', 'skills_list')
+
+
+class NPlusOneDetectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.references = [SkillReference.objects.create(name=name) for name in ('Python', 'Django', 'React')]
+        cls.project = Project.objects.create(title='Portfolio')
+        for reference in cls.references:
+            ProjectSkillRef.objects.create(project=cls.project, skill_reference=reference)
+
+    def test_lazy_loads_of_a_list_are_grouped_and_named(self):
+        with self.assertLogs('core.nplusone', 'WARNING') as logs, detect() as groups:
+            ProjectSkillRefSerializer(ProjectSkillRef.objects.all(), many=True).data
+        (load, count), = groups.values()
+        self.assertEqual((load.field, load.relation, count), ('ProjectSkillRefSerializer.name',
+                                                             'ProjectSkillRef.skill_reference', 3))
+        (message,) = logs.output
+        self.assertIn("add select_related('skill_reference') to the queryset", message)
+        self.assertIn('WHERE "skills_skillreference"."id" = ?', message)
+
+        with detect() as groups:
+            ProjectSkillRefSerializer(ProjectSkillRef.objects.select_related('skill_reference'), many=True).data
+        self.assertEqual(groups, {})
+
+    def test_nested_lists_name_the_prefetch_from_the_serialized_object(self):
+        with self.assertRaisesMessage(NPlusOneError, "add prefetch_related('projectskillref_set__skill_reference')"):
+            with detect('raise'):
+                ProjectWithSkillsSerializer(self.project).data
+        with detect('raise'):
+            project = Project.objects.prefetch_related('projectskillref_set__skill_reference').get()
+            self.assertEqual(len(ProjectWithSkillsSerializer(project).data['skills_list']), 3)
+
+    def test_requests_raise_in_tests(self):
+        self.assertEqual(settings.N_PLUS_ONE_DETECTION, 'raise')
+        admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        headers = {'authorization': f"Bearer {issue_tokens(admin)['access']}"}
+        body = {'title': 'Blog', 'description': 'Django', 'skills': [reference.pk for reference in self.references]}
+        response = self.client.post(reverse('project-list'), body, content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([skill['name'] for skill in response.json()['skills_list']], ['Python', 'Django', 'React'])
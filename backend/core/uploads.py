@@ -0,0 +1,247 @@
+"""Resumable chunked uploads.
+
+A client creates an `UploadSession` with the final size and SHA-256 of the
+file, PUTs byte ranges (``Content-Range: bytes <start>-<end>/<size>``) that are
+streamed straight to a temporary file, and finalizes the session. Finalizing
+verifies the checksum and stores the file through `store_upload`; the stored
+value can then be attached to a model field by upload id.
+
+Only one chunk is held in memory at a time, whatever the file size.
+
+The parts live in UPLOAD_SESSION_DIR on local disk. With several hosts
+(servers, containers, dynos) it must be a directory every host mounts,
+e.g. a network file system; otherwise a chunk or a finalize that lands on
+another host than the previous ones finds no part and gets a 409 instead
+of corrupting the upload. A single host needs no setup.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .assets import release_asset, store_upload
+from .models import UploadSession
+
+IMAGE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp"}
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # same limit as multipart image uploads
+READ_BLOCK = 64 * 1024
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Chunk does not start at the current upload offset.'
+    default_code = 'upload_conflict'
+
+
+def session_path(session):
+    return Path(settings.UPLOAD_SESSION_DIR) / f"{session.id}.part"
+
+
+def _part_path(session):
+    """The session file, which must exist: a missing one was written on another host."""
+    path = session_path(session)
+    if not path.exists():
+        raise UploadConflict('Upload data is not on this server; UPLOAD_SESSION_DIR must be shared by every host.')
+    return path
+
+
+def create_session(*, user, kind, filename, size, sha256, content_type=''):
+    if kind == 'image':
+        if content_type not in IMAGE_CONTENT_TYPES:
+            raise ValidationError({'content_type': f"Unsupported file type {content_type}. Allowed: JPEG, PNG, WEBP."})
+        if size > MAX_IMAGE_SIZE:
+            raise ValidationError({'size': 'Images are limited to 5MB.'})
+    if size > settings.UPLOAD_SESSION_MAX_SIZE:
+        raise ValidationError({'size': f"Uploads are limited to {settings.UPLOAD_SESSION_MAX_SIZE} bytes."})
+
+    session = UploadSession.objects.create(
+        kind=kind, filename=os.path.basename(filename), content_type=content_type, size=size,
+        sha256=sha256.lower(), created_by_id=user.pk if user and user.is_authenticated else None,
+        expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+    )
+    path = session_path(session)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return session
+
+
+def parse_content_range(header, session):
+    match = _CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise ValidationError({'Content-Range': 'Expected "bytes <start>-<end>/<size>".'})
+    start, end, total = (int(g) for g in match.groups())
+    if total != session.size or end < start or end >= total:
+        raise ValidationError({'Content-Range': f"Invalid range for an upload of {session.size} bytes."})
+    if end - start + 1 > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise ValidationError({'Content-Range': f"Chunks are limited to {settings.UPLOAD_CHUNK_MAX_SIZE} bytes."})
+    return start, end
+
+
+def write_chunk(session, start, end, stream):
+    """Append bytes [start, end] read from `stream` to the session file.
+
+    Progress is committed even when the client disconnects mid-chunk, so a
+    retry only has to resend what is missing.
+    """
+    if session.status != UploadSession.STATUS_UPLOADING:
+        raise UploadConflict('Upload is being finalized or already finalized.')
+    if start != session.received:
+        raise UploadConflict(f"Expected a chunk starting at byte {session.received}.")
+
+    remaining = end - start + 1
+    written = 0
+    with open(_part_path(session), 'r+b') as fh:
+        fh.seek(start)
+        while remaining:
+            block = stream.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            fh.write(block)
+            written += len(block)
+            remaining -= len(block)
+
+    # conditional update: a concurrent PUT for the same range loses the race
+    updated = UploadSession.objects.filter(pk=session.pk, received=start).update(received=start + written)
+    if not updated:
+        raise UploadConflict()
+    session.received = start + written
+    if remaining:
+        raise ValidationError({'detail': 'Chunk body shorter than its Content-Range.', 'offset': session.received})
+    return session.received
+
+
+def _file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(READ_BLOCK), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def finalize(session):
+    """Verify the assembled file and store it. Returns the updated session.
+
+    The session is first switched to ``finalizing`` in a short transaction,
+    so a concurrent finalize or chunk sees it taken without waiting on a row
+    lock held across the remote upload. A file that fails the checksum or,
+    for images, the image check is discarded and the upload starts over
+    from byte 0; a failed remote upload leaves the file in place for
+    another finalize.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status != UploadSession.STATUS_UPLOADING:
+            return session
+        if session.received != session.size:
+            raise UploadConflict(f"Upload incomplete: {session.received} of {session.size} bytes received.")
+        path = _part_path(session)
+        session.status = UploadSession.STATUS_FINALIZING
+        session.save(update_fields=['status'])
+
+    os.truncate(path, session.size)  # drop bytes left behind by an interrupted oversized chunk
+    if _file_sha256(path) != session.sha256:
+        _restart(session, path)
+        raise ValidationError({'sha256': 'Checksum mismatch; the upload is corrupted. Upload it again.', 'offset': 0})
+    if session.kind == 'image' and not _is_image(path):
+        _restart(session, path)
+        raise ValidationError({'detail': 'Upload is not a valid image. Upload it again.', 'offset': 0})
+
+    try:
+        with open(path, 'rb') as fh:
+            value = store_upload(File(fh, name=session.filename), resource_type=session.kind)
+    except Exception:
+        session.status = UploadSession.STATUS_UPLOADING
+        session.save(update_fields=['status'])
+        raise
+    session.stored_value = value.get_prep_value() if isinstance(value, CloudinaryResource) else value
+    session.status = UploadSession.STATUS_COMPLETE
+    session.save(update_fields=['stored_value', 'status'])
+    path.unlink(missing_ok=True)
+    return session
+
+
+def _is_image(path):
+    from PIL import Image as PILImage
+
+    try:
+        with PILImage.open(path) as img:
+            img.verify()
+    except Exception:
+        return False
+    return True
+
+
+def _restart(session, path):
+    """Discard the received bytes of a session being finalized; the client uploads again from 0."""
+    os.truncate(path, 0)
+    session.received = 0
+    session.status = UploadSession.STATUS_UPLOADING
+    session.save(update_fields=['received', 'status'])
+
+
+def attach_upload(session):
+    """Hand the stored asset of a finalized session over to a model row.
+
+    Returns the value to assign to the image/file field. Each session can be
+    attached once: its asset reference moves to the row.
+    """
+    claimed = UploadSession.objects.filter(pk=session.pk, status=UploadSession.STATUS_COMPLETE).update(
+        status=UploadSession.STATUS_ATTACHED
+    )
+    if not claimed:
+        raise ValidationError(f"Upload {session.pk} is not finalized or was already attached.")
+    return _field_value(session)
+
+
+def create_with_uploads(files, sessions, create):
+    """Store `files` and attach `sessions`, then `create(values)` the rows that use them.
+
+    Uploads run first, outside any transaction. Attaching and creating run
+    in one transaction: if any of it fails, the attachments roll back and
+    the references taken by the uploads are released, so no asset leaks.
+    Returns what `create` returns.
+    """
+    stored = []
+    try:
+        for file in files:
+            stored.append(store_upload(file))
+        with transaction.atomic():
+            return create(stored + [attach_upload(session) for session in sessions])
+    except Exception:
+        for value in stored:
+            release_asset(value)
+        raise
+
+
+def purge_expired_sessions(now=None):
+    """Delete expired sessions that were never attached, with their files and asset references."""
+    now = now or timezone.now()
+    expired = UploadSession.objects.filter(expires_at__lt=now).exclude(status=UploadSession.STATUS_ATTACHED)
+    count = 0
+    for session in expired.iterator():
+        if session.status == UploadSession.STATUS_COMPLETE and session.stored_value:
+            release_asset(_field_value(session), resource_type=session.kind)
+        session_path(session).unlink(missing_ok=True)
+        session.delete()
+        count += 1
+    return count
+
+
+def _field_value(session):
+    """The stored value as a model field expects it: a CloudinaryResource for images, a name for raw files."""
+    if session.kind == 'raw':
+        return session.stored_value
+    from cloudinary.models import CloudinaryField
+
+    return CloudinaryField().parse_cloudinary_resource(session.stored_value)
@@ -1,4 +1,6 @@
 from django.urls import path
+
+from .async_reads import async_public_reads
 from .views import (
     HeroListView,
     HeroAdminListCreateView,
@@ -9,6 +11,17 @@ from .views import (
     ContactCreateView,
     ContactListAdminView,
     ContactDetailAdminView,
+    ContactBulkActionView,
+    ContactExportView,
+    ContactGuardStatsView,
+    UploadSessionCreateView,
+    UploadSessionDetailView,
+    UploadSessionFinalizeView,
+    TaskQueueStatusView,
+    SlowQueryReportView,
+    AdminSummaryView,
+    read_about,
+    read_hero,
 )
 
 urlpatterns = [
@@ -23,5 +36,18 @@ urlpatterns = [
     path('admin/about/<int:pk>/', AboutDetailView.as_view(), name='about_admin_detail'),
     path('admin/about/', AboutCreateView.as_view(), name='about_admin_create'),
     path('admin/contacts/', ContactListAdminView.as_view(), name='contact_admin_list'),
+    path('admin/contacts/export/', ContactExportView.as_view(), name='contact_admin_export'),
+    path('admin/contacts/stats/', ContactGuardStatsView.as_view(), name='contact_admin_stats'),
+    path('admin/contacts/bulk/', ContactBulkActionView.as_view(), name='contact_admin_bulk'),
     path('admin/contacts/<int:pk>/', ContactDetailAdminView.as_view(), name='contact_admin_detail'),
+    path('admin/summary/', AdminSummaryView.as_view(), name='admin_summary'),
+    path('admin/tasks/', TaskQueueStatusView.as_view(), name='task_queue_status'),
+    path('admin/slow-queries/', SlowQueryReportView.as_view(), name='slow_query_report'),
+
+    # Resumable uploads
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload_session_create'),
+    path('uploads/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload_session_detail'),
+    path('uploads/<uuid:pk>/finalize/', UploadSessionFinalizeView.as_view(), name='upload_session_finalize'),
 ]
+
+urlpatterns = async_public_reads(urlpatterns, {'hero_list': read_hero, 'about_public': read_about})
@@ -1,7 +1,25 @@
-from rest_framework import generics, permissions
-from .models import HeroSection, About, ContactMessage
-from .serializers import HeroSectionSerializer, AboutSerializer, ContactMessageSerializer
+from io import BytesIO
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics, permissions, status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from .models import HeroSection, About, ContactMessage, SlowQuery, Task, UploadSession
+from .filters import ContactMessageFilter
+from .serializers import (
+    HeroSectionSerializer, AboutSerializer, ContactBulkActionSerializer, ContactMessageSerializer, TaskSerializer,
+    SlowQuerySerializer, UploadSessionSerializer,
+)
 from .permissions import IsSuperUser
+from .idempotency import idempotent
+from .async_reads import async_reader, fetch_list
+from .mail import notify_new_contact
+from .summary import admin_summary, invalidate_admin_summary
+from . import contact_guard, exports, taskqueue, uploads
 
 
 class HeroListView(generics.ListAPIView):
@@ -31,11 +49,7 @@ class HeroAdminDetailView(generics.RetrieveUpdateDestroyAPIView):
         # Support clearing the image from admin by passing image-clear=1 in form data
         instance = self.get_object()
         if request.data.get('image-clear') in ['1', 'true', 'True']:
-            try:
-                if instance.image:
-                    instance.image.delete(save=False)
-            except Exception:
-                pass
+            # the previous asset is queued for deletion by core.signals on save
             instance.image = None
             instance.save()
         return super().update(request, *args, **kwargs)
@@ -73,21 +87,203 @@ class PublicAboutView(generics.RetrieveAPIView):
 
 
 class ContactCreateView(generics.CreateAPIView):
+    """Public contact form, guarded by core.contact_guard.
+
+    Throttled requests get a 429 and invalid ones a 400. Every other
+    submission gets the same 201 answer, so bots cannot tell that a
+    honeypot, too-fast or duplicate message was dropped: nothing is
+    written for those.
+    """
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [contact_guard.ContactIPThrottle, contact_guard.ContactGlobalThrottle]
+
+    @idempotent  # first, so that a retry replays the original answer instead of looking like a duplicate
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reason = contact_guard.screen(request.data)
+        if reason is None:
+            reservation = contact_guard.claim_submission(serializer.validated_data)
+            if reservation is None:
+                reason = 'duplicate'
+        if reason:
+            contact_guard.record(reason)
+        else:
+            try:
+                self.perform_create(serializer)
+            except Exception:
+                contact_guard.release_submission(reservation)
+                raise
+            contact_guard.record('accepted')
+        return Response({'detail': 'Message received.'}, status=status.HTTP_201_CREATED)
+
+    def perform_create(self, serializer):
+        notify_new_contact(serializer.save())
+        invalidate_admin_summary()
+
+
+class ContactPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
 
 
 class ContactListAdminView(generics.ListAPIView):
-    queryset = ContactMessage.objects.all()
+    queryset = ContactMessage.objects.order_by('-created_at', '-id')
     serializer_class = ContactMessageSerializer
     permission_classes = [IsSuperUser]
+    pagination_class = ContactPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ContactMessageFilter
+
+
+class ContactExportView(generics.GenericAPIView):
+    """Stream the (filtered) contact messages as CSV or NDJSON: ?output=csv|ndjson.
+
+    Takes the same filters as the contact list. The parameter is not called
+    `format` because DRF reserves that one for renderer selection.
+    """
+    queryset = ContactMessage.objects.all()
+    permission_classes = [IsSuperUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ContactMessageFilter
+    OUTPUTS = {
+        'csv': (exports.stream_csv, 'text/csv; charset=utf-8'),
+        'ndjson': (exports.stream_ndjson, 'application/x-ndjson'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'csv')
+        if output not in self.OUTPUTS:
+            raise ValidationError({'output': f"Expected one of: {', '.join(self.OUTPUTS)}."})
+        stream, content_type = self.OUTPUTS[output]
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(stream(queryset, chunk_size=settings.EXPORT_CHUNK_SIZE), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="contacts-{timezone.now():%Y%m%d-%H%M}.{output}"'
+        return response
+
+
+class ContactGuardStatsView(generics.GenericAPIView):
+    """Counters of the contact form protection: accepted, throttled, honeypot, too fast, duplicate."""
+    permission_classes = [IsSuperUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(contact_guard.contact_counters())
+
+
+class ContactBulkActionView(generics.GenericAPIView):
+    """POST {"action": "mark_read", "ids": [1, 2]} or {"action": "delete", "filter": {"is_read": true}}."""
+    serializer_class = ContactBulkActionSerializer
+    permission_classes = [IsSuperUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        affected = serializer.save()
+        invalidate_admin_summary()
+        return Response({'action': serializer.validated_data['action'], 'affected': affected}, status=status.HTTP_200_OK)
 
 
 class ContactDetailAdminView(generics.RetrieveDestroyAPIView):
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
     permission_classes = [IsSuperUser]
-from django.shortcuts import render
 
-# Create your views here.
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_admin_summary()
+
+
+class AdminSummaryView(generics.GenericAPIView):
+    """Counts for the admin layout: unread/total contacts, projects, posts and experiences."""
+    permission_classes = [IsSuperUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(admin_summary())
+
+
+class UploadSessionCreateView(generics.CreateAPIView):
+    """Start a resumable upload: POST {kind, filename, content_type, size, sha256}."""
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsSuperUser]
+
+
+class UploadSessionDetailView(generics.RetrieveAPIView):
+    """GET reports the current offset to resume from; PUT appends one byte range.
+
+    PUT bodies are raw bytes with a ``Content-Range: bytes <start>-<end>/<size>``
+    header and are streamed to disk without going through the parsers.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsSuperUser]
+
+    def put(self, request, *args, **kwargs):
+        session = self.get_object()
+        start, end = uploads.parse_content_range(request.headers.get('Content-Range'), session)
+        uploads.write_chunk(session, start, end, request.stream or BytesIO())
+        return Response(self.get_serializer(session).data)
+
+
+class UploadSessionFinalizeView(generics.GenericAPIView):
+    """Verify the checksum of a fully received upload and store it."""
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsSuperUser]
+
+    def post(self, request, *args, **kwargs):
+        session = uploads.finalize(self.get_object())
+        return Response(self.get_serializer(session).data)
+
+
+class TaskQueueStatusView(generics.GenericAPIView):
+    """Background queue health: counts per status, due backlog, running and recently dead tasks."""
+    queryset = Task.objects.all()
+    serializer_class = TaskSerializer
+    permission_classes = [IsSuperUser]
+
+    def get(self, request, *args, **kwargs):
+        running = Task.objects.filter(status=Task.STATUS_RUNNING).order_by('locked_at')[:50]
+        dead = Task.objects.filter(status=Task.STATUS_DEAD).order_by('-finished_at')[:20]
+        return Response({
+            **taskqueue.queue_stats(),
+            'running': self.get_serializer(running, many=True).data,
+            'dead': self.get_serializer(dead, many=True).data,
+        })
+
+
+class SlowQueryReportView(generics.ListAPIView):
+    """Recorded slow queries, worst first: by total time, or ?sort=count|max_ms|last_seen. DELETE clears the log."""
+    serializer_class = SlowQuerySerializer
+    permission_classes = [IsSuperUser]
+    sort_fields = ('total_ms', 'count', 'max_ms', 'last_seen')
+    limit = 100
+
+    def get_queryset(self):
+        sort = self.request.query_params.get('sort', 'total_ms')
+        if sort not in self.sort_fields:
+            raise ValidationError({'sort': f"Expected one of: {', '.join(self.sort_fields)}."})
+        return SlowQuery.objects.order_by(f'-{sort}', 'fingerprint')[:self.limit]
+
+    def delete(self, request, *args, **kwargs):
+        SlowQuery.objects.all().delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# Async readers of the public endpoints, used under ASGI (see core/async_reads.py)
+
+@async_reader()
+async def read_hero(request):
+    heroes = await fetch_list(HeroSection.objects.filter(is_active=True))
+    return HeroSectionSerializer(heroes, many=True, context={'request': request}).data
+
+
+@async_reader()
+async def read_about(request):
+    about = await About.objects.afirst()
+    if not about:
+        raise NotFound("Aucune section About n'est disponible.")
+    return AboutSerializer(about, context={'request': request}).data
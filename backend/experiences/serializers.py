@@ -1,4 +1,6 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
+from core.projections import Nested, Projection
 from .models import Experience, ExperienceSkillRef, ExperienceLink
 
 class ExperienceSkillRefSerializer(serializers.ModelSerializer):
@@ -31,6 +33,12 @@ class ExperienceSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ("id",)
 
+    def to_representation(self, instance):
+        # created or updated experiences lack the viewset's prefetches (DRF drops them after an update);
+        # without them every skill would load its reference. A no-op when already prefetched.
+        prefetch_related_objects([instance], "experienceskillref_set__skill_reference")
+        return super().to_representation(instance)
+
     def create(self, validated_data):
         skills_data = validated_data.pop("skills_data", [])
         links_data = validated_data.pop("links_data", [])
@@ -73,3 +81,24 @@ class ExperienceSerializer(serializers.ModelSerializer):
                 ExperienceLink.objects.create(experience=instance, **link_data)
                 
         return instance
+
+
+# ExperienceSerializer's output built from values_list() rows, for the list endpoint (see core/projections.py)
+EXPERIENCE_LIST = Projection([
+    ("id", "id"),
+    ("skills", Nested(ExperienceSkillRef.objects.all(), "experience", [
+        ("id", "id"), ("experience", "experience"), ("skill_reference", "skill_reference"),
+        ("name", "skill_reference__name"), ("icon", "skill_reference__icon"),
+    ])),
+    ("links", Nested(ExperienceLink.objects.all(), "experience", [
+        ("id", "id"), ("url", "url"), ("text", "text"), ("order", "order"),
+    ])),
+    ("title", "title"),
+    ("company", "company"),
+    ("location", "location"),
+    ("experience_type", "experience_type"),
+    ("start_date", ("start_date", serializers.DateField().to_representation)),
+    ("end_date", ("end_date", serializers.DateField().to_representation)),
+    ("description", "description"),
+    ("is_current", "is_current"),
+])
@@ -1,3 +1,37 @@
+import json
+from datetime import date
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from skills.models import SkillReference
+from .models import Experience, ExperienceLink, ExperienceSkillRef
+from .serializers import EXPERIENCE_LIST, ExperienceSerializer
+
+
+class ExperienceListTests(TestCase):
+    def setUp(self):
+        django = SkillReference.objects.create(name='Django', icon='https://example.com/django.svg')
+        react = SkillReference.objects.create(name='React')
+        for i in range(12):
+            experience = Experience.objects.create(
+                title=f'Poste {i}', company='Société' if i % 2 else None, start_date=date(2020, 1, i + 1),
+                end_date=date(2021, 1, 1) if i % 3 else None, is_current=not i,
+            )
+            ExperienceLink.objects.create(experience=experience, url='https://example.com/b', text='B', order=2)
+            ExperienceLink.objects.create(experience=experience, url='https://example.com/a', text='A', order=1)
+            ExperienceSkillRef.objects.create(experience=experience, skill_reference=react)
+            if i % 2:
+                ExperienceSkillRef.objects.create(experience=experience, skill_reference=django)
 
-# Create your tests here.
+    def test_list_projection_matches_serializer(self):
+        queryset = Experience.objects.all()
+        expected = ExperienceSerializer(queryset, many=True).data
+        self.assertEqual(
+            JSONRenderer().render(EXPERIENCE_LIST.serialize(EXPERIENCE_LIST.rows(queryset))),
+            JSONRenderer().render(expected),
+        )
+        page = self.client.get(reverse('experience-list'), {'page': 2}).json()
+        self.assertEqual(page['count'], 12)
+        self.assertEqual(page['results'], json.loads(JSONRenderer().render(expected[10:])))
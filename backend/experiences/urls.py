@@ -1,8 +1,9 @@
 from rest_framework.routers import DefaultRouter
-from .views import ExperienceViewSet
+from core.async_reads import async_public_reads
+from .views import ExperienceViewSet, read_experience, read_experiences
 
 router = DefaultRouter()
 router.register(r'', ExperienceViewSet, basename='experience')
 
-urlpatterns = router.urls
+urlpatterns = async_public_reads(router.urls, {'experience-list': read_experiences, 'experience-detail': read_experience})
 
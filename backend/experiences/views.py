@@ -3,18 +3,22 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from .models import Experience, ExperienceLink
-from .serializers import ExperienceSerializer, ExperienceLinkSerializer
+from .serializers import EXPERIENCE_LIST, ExperienceSerializer, ExperienceLinkSerializer
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from core.async_reads import async_reader, fetch_object, paginate
+from core.idempotency import idempotent
+from core.projections import ProjectionListMixin
 
 class ExperiencePagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class ExperienceViewSet(viewsets.ModelViewSet):
-    queryset = Experience.objects.all()
+class ExperienceViewSet(ProjectionListMixin, viewsets.ModelViewSet):
+    queryset = Experience.objects.prefetch_related('links', 'experienceskillref_set__skill_reference')
     serializer_class = ExperienceSerializer
+    list_projection = EXPERIENCE_LIST
     pagination_class = ExperiencePagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
     search_fields = ["title", "company", "description"]
@@ -26,6 +30,10 @@ class ExperienceViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     @action(detail=False, methods=['delete'], permission_classes=[permissions.IsAuthenticated])
     def delete_all(self, request):
         count, _ = Experience.objects.all().delete()
@@ -35,6 +43,7 @@ class ExperienceViewSet(viewsets.ModelViewSet):
         )
         
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
     def add_links(self, request, pk=None):
         experience = self.get_object()
         serializer = ExperienceLinkSerializer(data=request.data, many=True)
@@ -81,3 +90,21 @@ class ExperienceViewSet(viewsets.ModelViewSet):
         links = experience.links.all().order_by('order')
         serializer = ExperienceLinkSerializer(links, many=True)
         return Response(serializer.data)
+
+
+# Async readers for ASGI (see core/async_reads.py); the prefetches cover everything ExperienceSerializer reads
+def public_experiences():
+    return Experience.objects.prefetch_related('links', 'experienceskillref_set__skill_reference')
+
+
+@async_reader(params=('page', 'page_size'))
+async def read_experiences(request):
+    rows, paginator = await paginate(EXPERIENCE_LIST.rows(Experience.objects.all()), request, ExperiencePagination)
+    data = await EXPERIENCE_LIST.aserialize(rows)
+    return paginator.get_paginated_response(data).data if paginator else data
+
+
+@async_reader()
+async def read_experience(request, pk):
+    experience = await fetch_object(public_experiences(), pk=pk)
+    return ExperienceSerializer(experience, context={'request': request}).data
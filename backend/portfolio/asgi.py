@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio.settings')
+# serve the public read endpoints with the async views of core/async_reads.py
+os.environ.setdefault('ASYNC_PUBLIC_VIEWS', 'True')
 
 application = get_asgi_application()
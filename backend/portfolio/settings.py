@@ -11,8 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
+import tempfile
 from pathlib import Path
-from dotenv import load_dotenv
 from decouple import config
 import dj_database_url
 from datetime import timedelta
@@ -26,7 +27,6 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-load_dotenv()
 
 # For local development provide safe defaults so the app doesn't crash when
 # a .env is not present. In production ensure these are provided.
@@ -61,16 +61,78 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Server-Timing for superusers and sampled timing logs (see core/instrumentation.py)
+    'core.instrumentation.RequestTimingMiddleware',
+    # relations lazy-loaded per item of a serialized list, with DEBUG and in tests (see core/nplusone.py)
+    'core.nplusone.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # gzip/brotli for API JSON (see core/compression.py)
+    'core.compression.CompressionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # runs STATEFUL_MIDDLEWARE except under STATELESS_PATH_PREFIXES (see core/middleware.py)
+    'core.middleware.StatefulMiddlewareStack',
+    'corsheaders.middleware.CorsMiddleware',
+    # ?_profile=1 or X-Profile: 1 from a superuser returns a cProfile report (see core/profiling.py)
+    'core.profiling.ProfilingMiddleware',
+]
+
+# Session, CSRF, messages and axes only matter for cookie-based pages; the
+# API authenticates with JWT and skips them.
+STATEFUL_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'axes.middleware.AxesMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
 ]
+STATELESS_PATH_PREFIXES = ('/api/', '/metrics')
+
+# Async views for the public read endpoints (core/async_reads.py); portfolio/asgi.py turns them on
+ASYNC_PUBLIC_VIEWS = config('ASYNC_PUBLIC_VIEWS', default=False, cast=bool)
+PUBLIC_READ_CACHE_TTL = config('PUBLIC_READ_CACHE_TTL', default=60, cast=int)  # seconds; 0 disables
+
+# Response compression (core/compression.py)
+COMPRESSED_PATH_PREFIXES = ('/api/',)
+COMPRESS_MIN_SIZE = config('COMPRESS_MIN_SIZE', default=1024, cast=int)  # bytes
+
+# Share of requests logged by core.instrumentation.RequestTimingMiddleware (0 to 1)
+REQUEST_TIMING_SAMPLE_RATE = config('REQUEST_TIMING_SAMPLE_RATE', default=0.01, cast=float)
+
+# Where core/profiling.py saves the stats of profiled requests; blank keeps them in the response only
+PROFILE_DIR = config('PROFILE_DIR', default='')
+
+# Prometheus metrics (core/metrics.py), scraped from /metrics with METRICS_TOKEN as bearer token
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# on by default only when the endpoint can be scraped; while on, every request is measured
+# and REQUEST_TIMING_SAMPLE_RATE only decides which of them are logged
+METRICS_ENABLED = config('METRICS_ENABLED', default=bool(METRICS_TOKEN), cast=bool)
+# directory shared by the worker processes, emptied before the server starts
+PROMETHEUS_MULTIPROC_DIR = config('PROMETHEUS_MULTIPROC_DIR', default='')
+if PROMETHEUS_MULTIPROC_DIR:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = PROMETHEUS_MULTIPROC_DIR
+
+# Slow query log (core/slow_queries.py): queries from these apps slower than the threshold; 0 disables
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=float)
+SLOW_QUERY_APPS = ('projects', 'blog', 'experiences', 'core', 'skills', 'users')
+
+# N+1 detection (core/nplusone.py): 'warn' logs each lazy load, 'raise' fails the request, blank is off
+N_PLUS_ONE_DETECTION = config(
+    'N_PLUS_ONE_DETECTION', default='raise' if sys.argv[1:2] == ['test'] else 'warn' if DEBUG else '',
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'core.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+        'core.nplusone': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
 
 ROOT_URLCONF = 'portfolio.urls'
 
@@ -96,8 +158,8 @@ WSGI_APPLICATION = 'portfolio.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 DATABASES = {
-    'default': dj_database_url.config(
-        default=config("DATABASE_URL"),
+    'default': dj_database_url.parse(
+        config("DATABASE_URL"),
         conn_max_age=600,  # Connection pooling - keep connections alive for 10 minutes
         conn_health_checks=True,  # Enable connection health checks
     )
@@ -106,11 +168,19 @@ DATABASES = {
 # Django REST Framework + Simple JWT settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed, same bytes as rest_framework.renderers.JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # reverse proxies in front of the app: client IPs (throttles, lockouts) are read from
+    # X-Forwarded-For only that many hops deep; 0 uses REMOTE_ADDR and ignores the header
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 SIMPLE_JWT = {
@@ -118,6 +188,9 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+# Auth versions checked by users.authentication.ClaimsJWTAuthentication (seconds)
+AUTH_VERSION_LOCAL_TTL = config('AUTH_VERSION_LOCAL_TTL', default=30, cast=int)  # per-process LRU
+AUTH_VERSION_CACHE_TTL = config('AUTH_VERSION_CACHE_TTL', default=3600, cast=int)  # shared cache
 
 # Email configuration (read from .env)
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='webmaster@localhost')
@@ -128,6 +201,13 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
 EMAIL_USE_SSL = config('EMAIL_USE_SSL', default=False, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)  # seconds, so a stuck SMTP server cannot hang the sender
+
+# Outgoing mail is queued and sent by the task worker (see core/mail.py)
+EMAIL_QUEUE_BATCH_SIZE = config('EMAIL_QUEUE_BATCH_SIZE', default=50, cast=int)
+EMAIL_MAX_ATTEMPTS = config('EMAIL_MAX_ATTEMPTS', default=5, cast=int)
+# Who is notified of new contact messages; defaults to the About section's hiring email
+CONTACT_NOTIFICATION_EMAILS = [e.strip() for e in config('CONTACT_NOTIFICATION_EMAILS', default='').split(',') if e.strip()]
 
 # If EMAIL_HOST is configured but EMAIL_BACKEND not explicitly set, use SMTP
 if not EMAIL_BACKEND and EMAIL_HOST:
@@ -173,7 +253,10 @@ USE_TZ = True
 # Cloudinary configuration
 CLOUDINARY_URL = config('CLOUDINARY_URL', default=None)
 
-if not CLOUDINARY_URL:
+if CLOUDINARY_URL:
+    # the Cloudinary SDK reads it from the environment when it is imported
+    os.environ.setdefault('CLOUDINARY_URL', CLOUDINARY_URL)
+else:
     CLOUDINARY_STORAGE = {
         'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME'),
         'API_KEY': config('CLOUDINARY_API_KEY'),
@@ -193,6 +276,68 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')  # pour collectstatic en pro
 
 MEDIA_URL = '/media/'
 
+# Cache: local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.db.DatabaseCache + a table name, or
+# django.core.cache.backends.redis.RedisCache + a redis:// URL) when running
+# several processes.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='portfolio'),
+    }
+}
+# The contact form throttles and the login lockouts (core/contact_guard.py, users/lockout.py)
+# count in 'ratelimit', which must be shared by every process. It is the default cache,
+# except when that one is local memory outside DEBUG and the tests: then it is a database
+# cache, whose table migrate creates (rerun manage.py createcachetable after changing it).
+# manage.py check --deploy reports a rate limit cache local to each process.
+_RATELIMIT_IN_DB = (
+    CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache'
+    and not DEBUG and sys.argv[1:2] != ['test']
+)
+CACHES['ratelimit'] = {
+    'BACKEND': config('RATELIMIT_CACHE_BACKEND', default=(
+        'django.core.cache.backends.db.DatabaseCache' if _RATELIMIT_IN_DB else CACHES['default']['BACKEND']
+    )),
+    'LOCATION': config('RATELIMIT_CACHE_LOCATION', default=(
+        'portfolio_ratelimit_cache' if _RATELIMIT_IN_DB else CACHES['default']['LOCATION']
+    )),
+}
+ADMIN_SUMMARY_CACHE_TTL = config('ADMIN_SUMMARY_CACHE_TTL', default=30, cast=int)  # seconds
+
+# Public contact form protection (see core/contact_guard.py)
+# '<limit>/<period>' fixed windows: per client IP and across all clients
+CONTACT_THROTTLE_RATES = {
+    'ip': config('CONTACT_THROTTLE_IP', default='5/minute'),
+    'global': config('CONTACT_THROTTLE_GLOBAL', default='120/minute'),
+}
+CONTACT_DUPLICATE_WINDOW = config('CONTACT_DUPLICATE_WINDOW', default=3600, cast=int)  # seconds
+CONTACT_HONEYPOT_FIELD = 'website'
+CONTACT_MIN_FILL_SECONDS = config('CONTACT_MIN_FILL_SECONDS', default=3, cast=float)
+
+# Rows fetched per round-trip (server-side cursor) by the streaming contact export
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Remote asset deletion queue (see core/assets.py and `manage.py process_asset_deletions`)
+ASSET_DELETION_BATCH_SIZE = config('ASSET_DELETION_BATCH_SIZE', default=100, cast=int)
+ASSET_DELETION_MAX_ATTEMPTS = config('ASSET_DELETION_MAX_ATTEMPTS', default=5, cast=int)
+
+# Resumable chunked uploads (see core/uploads.py); with several hosts, UPLOAD_SESSION_DIR
+# must be a directory they all mount (e.g. NFS), or resumable uploads need a single host
+UPLOAD_SESSION_DIR = config('UPLOAD_SESSION_DIR', default=os.path.join(tempfile.gettempdir(), 'portfolio-uploads'))
+UPLOAD_SESSION_MAX_SIZE = config('UPLOAD_SESSION_MAX_SIZE', default=50 * 1024 * 1024, cast=int)
+UPLOAD_CHUNK_MAX_SIZE = config('UPLOAD_CHUNK_MAX_SIZE', default=8 * 1024 * 1024, cast=int)
+UPLOAD_SESSION_TTL = config('UPLOAD_SESSION_TTL', default=24 * 3600, cast=int)  # seconds
+
+# Background task queue (see core/taskqueue.py and `manage.py run_worker`)
+TASK_POLL_INTERVAL = config('TASK_POLL_INTERVAL', default=1.0, cast=float)  # seconds between polls of an idle worker
+TASK_LOCK_TIMEOUT = config('TASK_LOCK_TIMEOUT', default=600, cast=int)  # running tasks older than this are requeued
+TASK_RESULT_TTL = config('TASK_RESULT_TTL', default=7 * 24 * 3600, cast=int)  # how long succeeded tasks are kept
+
+# Idempotency-Key replay for create endpoints (see core/idempotency.py)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 3600, cast=int)  # seconds
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=300, cast=int)  # in-progress keys older than this are abandoned
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -203,6 +348,37 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AXES_FAILURE_LIMIT = 10
 AXES_COOLOFF_TIME = 1  # durée en heures
 AXES_LOCKOUT_PARAMETERS = ['ip_address']
+# The API login does not go through authenticate(); it is protected by users/lockout.py.
+# Axes only keeps attempts in a shared cache (never AccessAttempt rows); with the
+# per-process local memory cache it has nothing reliable to count in and is disabled.
+AXES_HANDLER = config('AXES_HANDLER', default=(
+    'axes.handlers.dummy.AxesDummyHandler' if CACHES['default']['BACKEND'].endswith('LocMemCache')
+    else 'axes.handlers.cache.AxesCacheHandler'
+))
+# AxesMiddleware is listed in STATEFUL_MIDDLEWARE rather than MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ['axes.W002']
+
+# Login / forgot-password lockout (see users/lockout.py): 'limit' per (IP, account) pair,
+# 'ip_limit' per client IP; past 'account_limit' per account (from any IP), each attempt
+# holds the account for 'account_delay' instead of locking it; durations in seconds
+LOCKOUT_RULES = {
+    'login': {
+        'limit': config('LOGIN_LOCKOUT_LIMIT', default=5, cast=int),
+        'ip_limit': config('LOGIN_LOCKOUT_IP_LIMIT', default=20, cast=int),
+        'window': config('LOGIN_LOCKOUT_WINDOW', default=900, cast=int),
+        'cooloff': config('LOGIN_LOCKOUT_COOLOFF', default=900, cast=int),
+        'account_limit': config('LOGIN_LOCKOUT_ACCOUNT_LIMIT', default=50, cast=int),
+        'account_delay': config('LOGIN_LOCKOUT_ACCOUNT_DELAY', default=10, cast=int),
+    },
+    'forgot_password': {
+        'limit': config('FORGOT_PASSWORD_LOCKOUT_LIMIT', default=5, cast=int),
+        'ip_limit': config('FORGOT_PASSWORD_LOCKOUT_IP_LIMIT', default=20, cast=int),
+        'window': config('FORGOT_PASSWORD_LOCKOUT_WINDOW', default=3600, cast=int),
+        'cooloff': config('FORGOT_PASSWORD_LOCKOUT_COOLOFF', default=3600, cast=int),
+        'account_limit': config('FORGOT_PASSWORD_LOCKOUT_ACCOUNT_LIMIT', default=20, cast=int),
+        'account_delay': config('FORGOT_PASSWORD_LOCKOUT_ACCOUNT_DELAY', default=60, cast=int),
+    },
+}
 
 AUTHENTICATION_BACKENDS = [
     'axes.backends.AxesStandaloneBackend',
@@ -219,6 +395,7 @@ else:
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "cache-control",
+    "idempotency-key",
 ]
 
 # Security hardening - enable/override via environment variables in production
@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.metrics import metrics_view
+
 urlpatterns = [
     path('api/users/', include('users.urls')),
     path('api/core/', include('core.urls')),
@@ -26,6 +28,7 @@ urlpatterns = [
     path('api/projects/', include('projects.urls')),
     path('api/blog/', include('blog.urls')),
     path('api/experiences/', include('experiences.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -2,12 +2,31 @@ from rest_framework import serializers
 from .models import Project, ProjectMedia, ProjectSkillRef,ProjectLink
 from skills.models import Skill, SkillReference
 from django.db import transaction
-import cloudinary.uploader
+from django.db.models import prefetch_related_objects
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError as DjangoValidationError
-from .models import Project, ProjectMedia, ProjectSkillRef
+from core.assets import store_upload
+from core.projections import Nested, Projection
+from core.serializers import UploadIdField, safe_image_url
 import json
 
+def validate_image_uploads(files):
+    """Check the content type and size (5MB max) of uploaded project images."""
+    allowed_types = {"image/jpeg", "image/png", "image/webp"}
+    max_size = 5 * 1024 * 1024  # 5MB
+
+    for f in files:
+        if hasattr(f, "content_type") and f.content_type not in allowed_types:
+            raise serializers.ValidationError(
+                f"Unsupported file type {f.content_type}. Allowed: JPEG, PNG, WEBP."
+            )
+        if hasattr(f, "size") and f.size > max_size:
+            raise serializers.ValidationError(
+                f"File {f.name} is too large ({f.size/1024:.1f} KB). Max 5MB."
+            )
+    return files
+
+
 class ProjectMediaSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
 
@@ -17,45 +36,30 @@ class ProjectMediaSerializer(serializers.ModelSerializer):
         read_only_fields = ("project",)
 
     def get_image(self, obj):
-        """Return a Cloudinary URL only if it looks safe. Avoid returning malformed public IDs that would
-        generate invalid Cloudinary URLs (e.g. containing spaces or apostrophes)."""
-        try:
-            if not obj.image:
-                return None
-            url = obj.image.url
-            if not url:
-                return None
-            if '%20' in url or '%27' in url or ' ' in url:
-                return None
-            return url
-        except Exception:
-            return None
+        return safe_image_url(obj.image)
         
     def delete(self, instance):
-        # Delete the image from Cloudinary using public_id when available
-        try:
-            public_id = None
-            if hasattr(instance.image, 'public_id') and instance.image.public_id:
-                public_id = instance.image.public_id
-            if not public_id and isinstance(instance.image, str) and instance.image:
-                try:
-                    parts = instance.image.split('/upload/')
-                    if len(parts) > 1:
-                        tail = parts[1]
-                        tail = tail.split('/')[-1]
-                        public_id = tail.split('.')[0]
-                except Exception:
-                    public_id = None
-            if public_id:
-                try:
-                    import cloudinary.uploader
-                    cloudinary.uploader.destroy(public_id, invalidate=True)
-                except Exception:
-                    pass
-        finally:
-            instance.delete()
+        # The remote asset is queued for deletion by core.signals on post_delete
+        # and destroyed in batches by `manage.py process_asset_deletions`.
+        instance.delete()
         return instance
 
+class ProjectMediaUploadSerializer(serializers.Serializer):
+    """Payload for `add_media`: image files and/or ids of finalized resumable uploads, appended in order."""
+    images = serializers.ListField(child=serializers.ImageField(), required=False)
+    upload_ids = serializers.ListField(child=UploadIdField(kind='image'), required=False)
+    order = serializers.IntegerField(required=False, min_value=0)
+
+    def validate_images(self, value):
+        if len(value) > 5:
+            raise serializers.ValidationError("You can upload at most 5 images at once.")
+        return validate_image_uploads(value)
+
+    def validate(self, attrs):
+        if not attrs.get('images') and not attrs.get('upload_ids'):
+            raise serializers.ValidationError("Provide images or upload_ids.")
+        return attrs
+
 class ProjectSkillRefSerializer(serializers.ModelSerializer):
     # On renvoie seulement les infos utiles de SkillReference
     name = serializers.CharField(source="skill_reference.name", read_only=True)
@@ -166,20 +170,7 @@ class ProjectSerializer(serializers.ModelSerializer):
         """
         if len(value) > 5:
             raise serializers.ValidationError("You can upload at most 5 images per project.")
-
-        allowed_types = {"image/jpeg", "image/png", "image/webp"}
-        max_size = 5 * 1024 * 1024  # 5MB
-
-        for f in value:
-            if hasattr(f, "content_type") and f.content_type not in allowed_types:
-                raise serializers.ValidationError(
-                    f"Unsupported file type {f.content_type}. Allowed: JPEG, PNG, WEBP."
-                )
-            if hasattr(f, "size") and f.size > max_size:
-                raise serializers.ValidationError(
-                    f"File {f.name} is too large ({f.size/1024:.1f} KB). Max 5MB."
-                )
-        return value
+        return validate_image_uploads(value)
 
     def validate_links_data(self, value):
         """
@@ -208,9 +199,11 @@ class ProjectSerializer(serializers.ModelSerializer):
             cleaned.append({"url": url.strip(), "text": text.strip() if isinstance(text, str) else "", "order": int(order)})
         return cleaned
 
-
-    def get_skills_list(self, obj):
-        return [sr.name for sr in obj.skills.all()]
+    def to_representation(self, instance):
+        # created or updated projects lack the viewset's prefetches (DRF drops them after an update);
+        # without them every skill would load its reference. A no-op when already prefetched.
+        prefetch_related_objects([instance], "projectskillref_set__skill_reference")
+        return super().to_representation(instance)
 
     def create(self, validated_data):
         media_files = validated_data.pop("media_files", [])
@@ -220,9 +213,9 @@ class ProjectSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             project = Project.objects.create(**validated_data)
             
-            # Handle media files
+            # Handle media files (identical uploads reuse the stored asset)
             for media_file in media_files:
-                ProjectMedia.objects.create(project=project, image=media_file)
+                ProjectMedia.objects.create(project=project, image=store_upload(media_file))
                 
             # Handle skills
             for skill_id in skills_data:
@@ -249,7 +242,7 @@ class ProjectSerializer(serializers.ModelSerializer):
             # Add new media without deleting existing ones. The frontend is expected to
             # call DELETE on any media the user removed prior to submitting the form.
             for media_file in media_files:
-                ProjectMedia.objects.create(project=instance, image=media_file)
+                ProjectMedia.objects.create(project=instance, image=store_upload(media_file))
         
         # Handle skills if provided
         if skills_data is not None:
@@ -268,3 +261,23 @@ class ProjectSerializer(serializers.ModelSerializer):
                 ProjectLink.objects.create(project=instance, **link_data)
                 
         return instance
+
+
+# ProjectSerializer's output built from values_list() rows, for the list endpoint (see core/projections.py)
+PROJECT_LIST = Projection([
+    ("id", "id"),
+    ("title", "title"),
+    ("description", "description"),
+    ("created_by", "created_by"),
+    ("created_at", ("created_at", serializers.DateTimeField().to_representation)),
+    ("updated_at", ("updated_at", serializers.DateTimeField().to_representation)),
+    ("media", Nested(ProjectMedia.objects.all(), "project", [
+        ("id", "id"), ("image", ("image", safe_image_url)), ("order", "order"), ("project", "project"),
+    ])),
+    ("skills_list", Nested(ProjectSkillRef.objects.all(), "project", [
+        ("id", "id"), ("name", "skill_reference__name"), ("icon", "skill_reference__icon"),
+    ])),
+    ("links", Nested(ProjectLink.objects.all(), "project", [
+        ("id", "id"), ("url", "url"), ("text", "text"), ("order", "order"),
+    ])),
+])
@@ -3,7 +3,10 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.core.files.uploadedfile import SimpleUploadedFile
-from .models import Project, ProjectMedia
+from rest_framework.renderers import JSONRenderer
+from skills.models import SkillReference
+from .models import Project, ProjectLink, ProjectMedia, ProjectSkillRef
+from .serializers import PROJECT_LIST, ProjectSerializer
 import base64
 
 
@@ -75,3 +78,25 @@ class ProjectsAPITest(APITestCase):
 		url = reverse('project-detail', args=[self.project.id])
 		resp = self.client.delete(url)
 		self.assertIn(resp.status_code, (status.HTTP_204_NO_CONTENT, status.HTTP_200_OK))
+
+	def test_filter_by_skill_name(self):
+		other = Project.objects.create(title='Other', description='')
+		ProjectSkillRef.objects.create(project=self.project, skill_reference=SkillReference.objects.create(name='Django'))
+		ProjectSkillRef.objects.create(project=other, skill_reference=SkillReference.objects.create(name='React'))
+		resp = self.client.get(reverse('project-list'), {'skill': 'django'})
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual([project['id'] for project in resp.data], [self.project.id])
+
+	def test_list_projection_matches_serializer(self):
+		other = Project.objects.create(title='Deuxième projet \u2028 ✓', description='')
+		ProjectMedia.objects.create(project=self.project, image='image/upload/v1/projects/b.jpg', order=1)
+		ProjectMedia.objects.create(project=self.project, image='image/upload/v1/projects/a.jpg', order=0)
+		ProjectMedia.objects.create(project=other, image="image/upload/v1/projects/l'image.jpg")
+		ProjectLink.objects.create(project=self.project, url='https://example.com/2', text='B', order=2)
+		ProjectLink.objects.create(project=self.project, url='https://example.com/1', text='A', order=1)
+		for name, icon in (('React', None), ('Django', 'https://example.com/django.svg')):
+			ProjectSkillRef.objects.create(project=self.project, skill_reference=SkillReference.objects.create(name=name, icon=icon))
+		queryset = Project.objects.all()
+		expected = JSONRenderer().render(ProjectSerializer(queryset, many=True).data)
+		self.assertEqual(JSONRenderer().render(PROJECT_LIST.serialize(PROJECT_LIST.rows(queryset))), expected)
+		self.assertEqual(self.client.get(reverse('project-list')).content, expected)
@@ -1,7 +1,8 @@
 from rest_framework.routers import DefaultRouter
-from .views import ProjectViewSet
+from core.async_reads import async_public_reads
+from .views import ProjectViewSet, read_project, read_projects
 
 router = DefaultRouter()
 router.register(r'', ProjectViewSet, basename='project')
 
-urlpatterns = router.urls
+urlpatterns = async_public_reads(router.urls, {'project-list': read_projects, 'project-detail': read_project})
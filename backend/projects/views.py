@@ -3,12 +3,15 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Project, ProjectMedia, ProjectSkillRef, ProjectLink
-from .serializers import ProjectSerializer, ProjectMediaSerializer, ProjectLinkSerializer
+from .serializers import PROJECT_LIST, ProjectSerializer, ProjectMediaSerializer, ProjectMediaUploadSerializer, ProjectLinkSerializer
 from .filters import ProjectFilter
 from skills.models import SkillReference
 from core.permissions import IsSuperUser
+from core.async_reads import async_reader, fetch_object
+from core.idempotency import idempotent
+from core.projections import ProjectionListMixin
+from core.uploads import create_with_uploads
 from django.shortcuts import get_object_or_404
-import cloudinary.uploader
 
 
 class IsAuthenticatedForWrite(permissions.BasePermission):
@@ -18,10 +21,11 @@ class IsAuthenticatedForWrite(permissions.BasePermission):
         return request.user and request.user.is_authenticated
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
-    # skills is a ManyToMany to SkillReference, so prefetch the skills relation directly
-    queryset = Project.objects.all().prefetch_related('skills', 'media')
+class ProjectViewSet(ProjectionListMixin, viewsets.ModelViewSet):
+    # the prefetches cover everything ProjectSerializer reads: skills_list goes through projectskillref_set
+    queryset = Project.objects.prefetch_related('media', 'links', 'projectskillref_set__skill_reference')
     serializer_class = ProjectSerializer
+    list_projection = PROJECT_LIST
     permission_classes = (IsAuthenticatedForWrite,)
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['title', 'description']
@@ -31,12 +35,33 @@ class ProjectViewSet(viewsets.ModelViewSet):
         qs = super().get_queryset()
         skill = self.request.query_params.get('skill')
         if skill:
-            qs = qs.filter(skills__reference__name__iexact=skill)
+            qs = qs.filter(skills__name__iexact=skill)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
     def add_media(self, request, pk=None):
         project = self.get_object()
+        if request.FILES or (isinstance(request.data, dict) and 'upload_ids' in request.data):
+            # multipart upload (images=<file>&images=<file>) and/or resumable upload ids
+            upload = ProjectMediaUploadSerializer(data=request.data)
+            upload.is_valid(raise_exception=True)
+            order = upload.validated_data.get('order', 0)
+            media_items = create_with_uploads(
+                upload.validated_data.get('images', []), upload.validated_data.get('upload_ids', []),
+                lambda images: [
+                    ProjectMedia.objects.create(project=project, image=image, order=order + i)
+                    for i, image in enumerate(images)
+                ],
+            )
+            return Response(
+                ProjectMediaSerializer(media_items, many=True).data,
+                status=status.HTTP_201_CREATED
+            )
         serializer = ProjectMediaSerializer(data=request.data, many=True)
         if serializer.is_valid():
             media_items = []
@@ -86,6 +111,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
     
     # Link management endpoints
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
     def add_links(self, request, pk=None):
         project = self.get_object()
         serializer = ProjectLinkSerializer(data=request.data, many=True)
@@ -126,3 +152,19 @@ class ProjectViewSet(viewsets.ModelViewSet):
         links = project.links.all().order_by('order')
         serializer = ProjectLinkSerializer(links, many=True)
         return Response(serializer.data)
+
+
+# Async readers for ASGI (see core/async_reads.py); the prefetches cover everything ProjectSerializer reads
+def public_projects():
+    return Project.objects.prefetch_related('media', 'links', 'projectskillref_set__skill_reference')
+
+
+@async_reader()
+async def read_projects(request):
+    return await PROJECT_LIST.aserialize(PROJECT_LIST.rows(Project.objects.all()))
+
+
+@async_reader()
+async def read_project(request, pk):
+    project = await fetch_object(public_projects(), pk=pk)
+    return ProjectSerializer(project, context={'request': request}).data
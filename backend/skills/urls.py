@@ -1,10 +1,12 @@
 from rest_framework.routers import DefaultRouter
 
-from .views import SkillReferenceViewSet, SkillViewSet
+from core.async_reads import async_public_reads
+
+from .views import SkillReferenceViewSet, SkillViewSet, read_skill, read_skills
 
 router = DefaultRouter()
 router.register(r"references", SkillReferenceViewSet, basename="skillreference")
 # Mount SkillViewSet at the router root so when included at 'api/skills/' it becomes '/api/skills/'
 router.register(r"", SkillViewSet, basename="skill")
 
-urlpatterns = router.urls
+urlpatterns = async_public_reads(router.urls, {'skill-list': read_skills, 'skill-detail': read_skill})
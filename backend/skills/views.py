@@ -1,6 +1,8 @@
 from rest_framework import viewsets, filters
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
+from core.async_reads import async_reader, fetch_list, fetch_object
+
 from .models import Skill, SkillReference
 from .serializers import SkillSerializer, SkillReferenceSerializer
 
@@ -25,3 +27,16 @@ class SkillViewSet(viewsets.ModelViewSet):
 		if self.action in ["list", "retrieve"]:
 			return [AllowAny()]
 		return [IsAuthenticated()]
+
+
+# Async readers for ASGI (see core/async_reads.py)
+@async_reader()
+async def read_skills(request):
+	skills = await fetch_list(Skill.objects.select_related("reference"))
+	return SkillSerializer(skills, many=True, context={"request": request}).data
+
+
+@async_reader()
+async def read_skill(request, pk):
+	skill = await fetch_object(Skill.objects.select_related("reference"), pk=pk)
+	return SkillSerializer(skill, context={"request": request}).data
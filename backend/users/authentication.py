@@ -0,0 +1,157 @@
+"""JWT authentication that does not load the user row on every request.
+
+Tokens issued by `LoginSerializer` carry ``is_superuser``, ``is_staff``,
+``is_active`` and an ``auth_version`` claim. The version is a digest of the
+password hash and those flags, so it changes whenever the password or the
+privileges change. `ClaimsJWTAuthentication` builds a `ClaimsUser` straight
+from the claims and only checks the version, first against a small
+per-process LRU, then the shared cache, then the database. Saving a user
+drops its cached version, again once the save is committed (see
+users/signals.py); other processes see the
+change within AUTH_VERSION_LOCAL_TTL seconds.
+
+Views that need the full user (profile, password change) load it with
+`load_user`.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from core.metrics import count_cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+VERSION_CLAIM = 'auth_version'
+_CACHE_PREFIX = 'auth-version:'
+_MISSING = ''  # cached marker for deleted or inactive users
+
+
+def auth_version(password, is_active, is_superuser, is_staff):
+    raw = f"{password}|{int(is_active)}|{int(is_superuser)}|{int(is_staff)}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def user_auth_version(user):
+    return auth_version(user.password, user.is_active, user.is_superuser, user.is_staff)
+
+
+def add_auth_claims(token, user):
+    """Embed the privilege flags and auth version; access tokens derived from `token` inherit them."""
+    token['is_superuser'] = user.is_superuser
+    token['is_staff'] = user.is_staff
+    token['is_active'] = user.is_active
+    token[VERSION_CLAIM] = user_auth_version(user)
+    return token
+
+
+def issue_tokens(user):
+    refresh = add_auth_claims(RefreshToken.for_user(user), user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+class _LocalVersions:
+    """Thread-safe LRU of user id -> (auth version, expiry)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return entry[0]
+
+    def set(self, user_id, version):
+        with self._lock:
+            self._data[user_id] = (version, time.monotonic() + settings.AUTH_VERSION_LOCAL_TTL)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_versions = _LocalVersions(maxsize=256)
+
+
+def current_auth_version(user_id):
+    """The user's current auth version, or '' when the user is gone or inactive."""
+    version = local_versions.get(user_id)
+    if version is not None:
+        count_cache('auth_version', True)
+        return version
+    version = cache.get(f"{_CACHE_PREFIX}{user_id}")
+    count_cache('auth_version', version is not None)
+    if version is None:
+        row = (
+            get_user_model().objects.filter(pk=user_id)
+            .values_list('password', 'is_active', 'is_superuser', 'is_staff').first()
+        )
+        version = auth_version(*row) if row and row[1] else _MISSING
+        cache.set(f"{_CACHE_PREFIX}{user_id}", version, settings.AUTH_VERSION_CACHE_TTL)
+    local_versions.set(user_id, version)
+    return version
+
+
+def invalidate_auth_version(user_id):
+    local_versions.discard(user_id)
+    cache.delete(f"{_CACHE_PREFIX}{user_id}")
+
+
+def check_token_version(token):
+    """Raise AuthenticationFailed when the token predates a password or privilege change."""
+    user_id = token[api_settings.USER_ID_CLAIM]
+    version = current_auth_version(user_id)
+    if not version or version != token[VERSION_CLAIM]:
+        raise AuthenticationFailed('Token is no longer valid for this user.', code='token_not_valid')
+
+
+class ClaimsUser(TokenUser):
+    """Request user built from token claims; no database row behind it."""
+
+    @property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+
+def load_user(user):
+    """The model instance for `request.user`, which may be a ClaimsUser."""
+    if isinstance(user, TokenUser):
+        return get_user_model().objects.get(pk=user.pk)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            # token issued before the claims existed: fall back to loading the user
+            return super().get_user(validated_token)
+        try:
+            validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed('Token contained no recognizable user identification', code='token_not_valid')
+        check_token_version(validated_token)
+        return ClaimsUser(validated_token)
@@ -0,0 +1,134 @@
+"""Cache-backed lockout for login and password-reset requests.
+
+Attempts are counted per identity (the client IP, the account email from
+that IP, and the account email alone) with a sliding window approximated from two fixed cache buckets: the current
+window's count plus the previous window's count weighted by how much of it
+still overlaps. Reaching the limit sets a lock key for the cool-off period
+and writes one `LockoutEvent` audit row. Checking or counting an attempt
+only reads and writes the cache.
+
+Rules come from LOCKOUT_RULES[scope]: 'limit' attempts per (IP, account)
+pair and 'ip_limit' per client IP within 'window' seconds, locked for
+'cooloff' seconds. An account is never locked on its own, so failures sent
+from elsewhere cannot lock its owner out; the IP limit is higher so that
+people sharing an address are not locked out together. Guessing from many
+addresses is slowed down instead: past 'account_limit' attempts on one
+account, every further attempt holds the account for 'account_delay'
+seconds, and the first one logs a warning and writes an audit row.
+
+Counters and locks live in the 'ratelimit' cache, shared by every process
+(see CACHES in the settings). Client IPs come from DRF's
+get_ident(), which trusts X-Forwarded-For only as far as NUM_PROXIES says.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from .models import LockoutEvent
+
+logger = logging.getLogger(__name__)
+
+cache = ConnectionProxy(caches, 'ratelimit')
+
+
+def identities(request, email=None):
+    """The identities an attempt is counted against: the client IP and, when known, the account
+    from that IP, then the account alone."""
+    email = email.strip().lower() if email else None
+    if request is None:
+        return [f"account:{email}"] if email else []
+    ip = BaseThrottle().get_ident(request)
+    idents = [f"ip:{ip}"]
+    if email:
+        idents += [f"email:{email}|ip:{ip}", f"account:{email}"]
+    return idents
+
+
+def _bucket_keys(scope, ident, window, now):
+    bucket = int(now // window)
+    prefix = f"lockout:{scope}:{ident}:"
+    return prefix + str(bucket), prefix + str(bucket - 1), (now % window) / window
+
+
+def _lock_key(scope, ident):
+    return f"lockout:{scope}:{ident}:locked-until"
+
+
+def _count(scope, ident, rule, now):
+    current, previous, elapsed = _bucket_keys(scope, ident, rule['window'], now)
+    counts = cache.get_many([current, previous])
+    return counts.get(current, 0) + counts.get(previous, 0) * (1 - elapsed)
+
+
+def ensure_not_locked(scope, idents):
+    """Raise Throttled (429 with Retry-After) while any of `idents` is locked out."""
+    now = time.time()
+    locks = cache.get_many([_lock_key(scope, ident) for ident in idents])
+    until = max((value for value in locks.values() if value > now), default=None)
+    if until is not None:
+        raise Throttled(wait=until - now, detail='Too many attempts. Try again later.')
+
+
+def register_attempt(scope, idents, request=None):
+    """Count one attempt against each identity; lock out or slow down the ones that reach their limit."""
+    rule = settings.LOCKOUT_RULES[scope]
+    now = time.time()
+    for ident in idents:
+        current, _, _ = _bucket_keys(scope, ident, rule['window'], now)
+        cache.add(current, 0, timeout=2 * rule['window'])
+        try:
+            cache.incr(current)
+        except ValueError:  # evicted between add() and incr()
+            cache.set(current, 1, timeout=2 * rule['window'])
+        failures = _count(scope, ident, rule, now)
+        if ident.startswith('account:'):
+            if failures >= rule['account_limit']:
+                _slow_down(scope, ident, rule, now, failures, request)
+        elif failures >= rule['ip_limit' if ident.startswith('ip:') else 'limit']:
+            _lock(scope, ident, rule, now, failures, request)
+
+
+def _lock(scope, ident, rule, now, failures, request):
+    until = now + rule['cooloff']
+    # add() so that concurrent attempts write a single audit row per lockout
+    if not cache.add(_lock_key(scope, ident), until, timeout=rule['cooloff']):
+        return
+    _audit(scope, ident, failures, rule['cooloff'], request)
+
+
+def _slow_down(scope, ident, rule, now, failures, request):
+    # the owner waits at most account_delay seconds; a distributed guess gets one try per delay
+    cache.set(_lock_key(scope, ident), now + rule['account_delay'], timeout=rule['account_delay'])
+    # one alert per window while the guessing goes on
+    if cache.add(f"lockout:{scope}:{ident}:alerted", 1, timeout=rule['window']):
+        logger.warning("%s attempts on %s within %ss: slowing it down", round(failures), ident, rule['window'])
+        _audit(scope, ident, failures, rule['account_delay'], request)
+
+
+def _audit(scope, ident, failures, seconds, request):
+    meta = request.META if request is not None else {}
+    LockoutEvent.objects.create(
+        scope=scope,
+        identifier=ident[:255],
+        ip_address=meta.get('REMOTE_ADDR') or None,
+        user_agent=meta.get('HTTP_USER_AGENT', '')[:255],
+        failures=round(failures),
+        locked_until=timezone.now() + timedelta(seconds=seconds),
+    )
+
+
+def reset(scope, idents):
+    """Forget the attempts of `idents`, e.g. the (IP, account) pair after a successful login."""
+    rule = settings.LOCKOUT_RULES[scope]
+    keys = []
+    for ident in idents:
+        current, previous, _ = _bucket_keys(scope, ident, rule['window'], time.time())
+        keys += [current, previous]
+    cache.delete_many(keys)
@@ -1,3 +1,22 @@
 from django.db import models
 
-# Create your models here.
+
+class LockoutEvent(models.Model):
+	"""Audit row written when users.lockout locks an identity out.
+
+	Failed attempts themselves only live in the cache; a row is written once
+	per lockout, not per attempt.
+	"""
+	scope = models.CharField(max_length=50)
+	identifier = models.CharField(max_length=255)
+	ip_address = models.GenericIPAddressField(null=True, blank=True)
+	user_agent = models.CharField(max_length=255, blank=True)
+	failures = models.PositiveIntegerField()
+	created_at = models.DateTimeField(auto_now_add=True)
+	locked_until = models.DateTimeField()
+
+	class Meta:
+		ordering = ['-created_at']
+
+	def __str__(self):
+		return f"{self.scope} lockout of {self.identifier} at {self.created_at:%Y-%m-%d %H:%M}"
@@ -3,12 +3,14 @@ from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.core.mail import send_mail
-from django.conf import settings
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from rest_framework.exceptions import AuthenticationFailed
 
+from core.mail import queue_mail
+from . import lockout
+from .authentication import VERSION_CLAIM, check_token_version, issue_tokens
+
 User = get_user_model()
 
 
@@ -29,7 +31,7 @@ class ChangePasswordSerializer(serializers.Serializer):
         return value
 
     def validate_old_password(self, value):
-        user = self.context['request'].user
+        user = self.context.get('user') or self.context['request'].user
         if not user.check_password(value):
             raise serializers.ValidationError("Old password is incorrect")
         return value
@@ -51,12 +53,11 @@ class ForgotPasswordSerializer(serializers.Serializer):
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         reset_link = f"{request.scheme}://{request.get_host()}/reset-password/{uid}/{token}/"
 
-        # Send email
-        send_mail(
+        # Queued: sent by the task worker, the request does not wait for SMTP
+        queue_mail(
             subject="Password Reset Request",
-            message=f"Click the link to reset your password: {reset_link}",
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@example.com'),
-            recipient_list=[email],
+            body=f"Click the link to reset your password: {reset_link}",
+            to=[email],
         )
         return {"message": "Password reset link has been sent to your email"}
 
@@ -103,20 +104,35 @@ class LoginSerializer(serializers.Serializer):
     def validate(self, attrs):
         email = attrs.get('email')
         password = attrs.get('password')
+        request = self.context.get('request')
+        idents = lockout.identities(request, email)
+        lockout.ensure_not_locked('login', idents)
         try:
             user = User.objects.get(email=email)
         except User.DoesNotExist:
+            lockout.register_attempt('login', idents, request)
             raise AuthenticationFailed('No active account found with the given credentials')
 
         if not user.check_password(password):
+            lockout.register_attempt('login', idents, request)
             raise AuthenticationFailed('No active account found with the given credentials')
 
         # Only allow superusers to authenticate via this login endpoint
         if not user.is_superuser:
+            lockout.register_attempt('login', idents, request)
             raise AuthenticationFailed('User does not have superuser privileges')
 
-        refresh = RefreshToken.for_user(user)
-        return {
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
-        }
+        # the (IP, account) counter restarts; the IP and the account keep theirs
+        lockout.reset('login', idents[1:2])
+        return issue_tokens(user)
+
+
+# ------------------ Token Refresh ------------------ #
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse to refresh tokens issued before a password or privilege change."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if VERSION_CLAIM in refresh:
+            check_token_version(refresh)
+        return super().validate(attrs)
@@ -0,0 +1,17 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_auth_version
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def drop_cached_auth_version(sender, instance, **kwargs):
+    # password or privilege changes must reach ClaimsJWTAuthentication right away; a request
+    # reading the row before the commit may cache the old version again, so drop it once more
+    # when the change is committed
+    invalidate_auth_version(instance.pk)
+    transaction.on_commit(partial(invalidate_auth_version, instance.pk))
@@ -1,3 +1,151 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.models import OutboundEmail
+from .models import LockoutEvent
+from .authentication import current_auth_version, local_versions
+
+
+class ForgotPasswordTests(APITestCase):
+    def test_reset_email_is_queued_not_sent_inline(self):
+        cache.clear()
+        get_user_model().objects.create_user(username='u', email='u@example.com', password='pass')
+        resp = self.client.post(reverse('forgot_password'), {'email': 'u@example.com'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to, ['u@example.com'])
+        self.assertIn('/reset-password/', email.body)
+
+
+class ClaimsAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_versions.clear()
+        self.user = get_user_model().objects.create_superuser(username='root', email='root@example.com', password='old-pass-123')
+        self.tokens = self.login('old-pass-123')
+
+    def login(self, password):
+        resp = self.client.post(reverse('login'), {'email': 'root@example.com', 'password': password}, format='json')
+        self.assertEqual(resp.status_code, 200, resp.data)
+        return resp.data
+
+    def get_stats(self, access):
+        # superuser-only endpoint that does not touch the database itself
+        return self.client.get(reverse('contact_admin_stats'), HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_authenticated_requests_skip_the_user_query(self):
+        self.assertEqual(self.get_stats(self.tokens['access']).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_stats(self.tokens['access']).status_code, 200)
+
+    def test_password_change_revokes_old_tokens(self):
+        resp = self.client.put(
+            reverse('change_password'), {'old_password': 'old-pass-123', 'new_password': 'N3w-passphrase!'},
+            format='json', HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}",
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(self.get_stats(self.tokens['access']).status_code, 401)
+        refresh = self.client.post(reverse('token_refresh'), {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(refresh.status_code, 401)
+        self.assertEqual(self.get_stats(resp.data['access']).status_code, 200)
+
+    def test_privilege_change_revokes_tokens(self):
+        self.get_stats(self.tokens['access'])
+        self.user.is_superuser = False
+        self.user.save()
+        self.assertEqual(self.get_stats(self.tokens['access']).status_code, 401)
+
+    def test_version_cached_before_the_commit_is_dropped_on_commit(self):
+        old_version = current_auth_version(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.user.set_password('N3w-passphrase!')
+            self.user.save()
+            # a concurrent request read the row before the commit and cached the old version
+            cache.set(f'auth-version:{self.user.pk}', old_version)
+            self.assertEqual(self.get_stats(self.tokens['access']).status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.get_stats(self.tokens['access']).status_code, 401)
+
+    def test_profile_reads_the_user_row(self):
+        resp = self.client.get(reverse('profile'), HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        self.assertEqual(resp.data['email'], 'root@example.com')
+
+
+class LockoutTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        get_user_model().objects.create_superuser(username='root', email='root@example.com', password='right-pass-123')
+
+    def login(self, password):
+        return self.client.post(reverse('login'), {'email': 'root@example.com', 'password': password}, format='json')
+
+    def test_repeated_failures_lock_the_account_out(self):
+        for _ in range(5):
+            self.assertEqual(self.login('wrong').status_code, 401)
+        with self.assertNumQueries(0):
+            resp = self.login('right-pass-123')
+        self.assertEqual(resp.status_code, 429)
+        self.assertIn('Retry-After', resp)
+        # one audit row for the locked (IP, account) pair, none per attempt
+        self.assertEqual(list(LockoutEvent.objects.values_list('identifier', flat=True)),
+                         ['email:root@example.com|ip:127.0.0.1'])
+
+    def test_failures_from_another_ip_do_not_lock_the_owner_out(self):
+        for _ in range(5):
+            self.client.post(reverse('login'), {'email': 'root@example.com', 'password': 'wrong'},
+                             format='json', REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(self.login('right-pass-123').status_code, 200)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        for i in range(5):
+            self.client.post(reverse('login'), {'email': 'root@example.com', 'password': 'wrong'},
+                             format='json', HTTP_X_FORWARDED_FOR=f'198.51.100.{i}')
+        self.assertEqual(self.login('right-pass-123').status_code, 429)
+
+    def test_successful_login_resets_the_account_counter(self):
+        for _ in range(4):
+            self.login('wrong')
+        self.assertEqual(self.login('right-pass-123').status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertFalse(LockoutEvent.objects.exists())
+
+    @override_settings(LOCKOUT_RULES={**settings.LOCKOUT_RULES, 'login': {
+        **settings.LOCKOUT_RULES['login'], 'limit': 100, 'ip_limit': 3, 'window': 60, 'cooloff': 60}})
+    def test_client_ip_is_locked_across_accounts(self):
+        for i in range(3):
+            self.client.post(reverse('login'), {'email': f'guess{i}@example.com', 'password': 'x'}, format='json')
+        self.assertEqual(self.login('right-pass-123').status_code, 429)
+
+    @override_settings(LOCKOUT_RULES={**settings.LOCKOUT_RULES, 'login': {
+        **settings.LOCKOUT_RULES['login'], 'account_limit': 4, 'account_delay': 10}})
+    def test_guessing_from_many_ips_slows_the_account_down(self):
+        def guess(i):
+            return self.client.post(reverse('login'), {'email': 'root@example.com', 'password': 'wrong'},
+                                    format='json', REMOTE_ADDR=f'203.0.113.{i}')
+
+        with mock.patch('users.lockout.time.time', return_value=6000.0):
+            with self.assertLogs('users.lockout', 'WARNING'):
+                for i in range(4):
+                    self.assertEqual(guess(i).status_code, 401)
+            resp = guess(4)
+            self.assertEqual((resp.status_code, resp['Retry-After']), (429, '10'))
+            self.assertEqual(self.login('right-pass-123').status_code, 429)
+        # the owner only has to wait for the delay, not for a lockout
+        with mock.patch('users.lockout.time.time', return_value=6011.0):
+            self.assertEqual(self.login('right-pass-123').status_code, 200)
+        self.assertEqual(list(LockoutEvent.objects.values_list('identifier', flat=True)), ['account:root@example.com'])
+
+    def test_forgot_password_requests_are_limited(self):
+        for _ in range(5):
+            self.client.post(reverse('forgot_password'), {'email': 'root@example.com'}, format='json')
+        resp = self.client.post(reverse('forgot_password'), {'email': 'root@example.com'}, format='json')
+        self.assertEqual(resp.status_code, 429)
 
-# Create your tests here.
@@ -21,6 +21,8 @@ User = get_user_model()
 
 
 from core.permissions import IsSuperUser
+from . import lockout
+from .authentication import issue_tokens, load_user
 
 
 # Registration endpoint removed. Superusers should create users via admin React or manage.py createsuperuser.
@@ -31,7 +33,8 @@ class ProfileView(generics.RetrieveUpdateAPIView):
 	permission_classes = [IsAuthenticated]
 
 	def get_object(self):
-		return self.request.user
+		# request.user is built from the token claims; the profile needs the row
+		return load_user(self.request.user)
 
 
 class ChangePasswordView(generics.UpdateAPIView):
@@ -39,7 +42,12 @@ class ChangePasswordView(generics.UpdateAPIView):
 	permission_classes = [IsAuthenticated]
 
 	def get_object(self):
-		return self.request.user
+		if not hasattr(self, '_user'):
+			self._user = load_user(self.request.user)
+		return self._user
+
+	def get_serializer_context(self):
+		return {**super().get_serializer_context(), 'user': self.get_object()}
 
 	def update(self, request, *args, **kwargs):
 		user = self.get_object()
@@ -50,7 +58,8 @@ class ChangePasswordView(generics.UpdateAPIView):
 			return Response({'old_password': ['Wrong password.']}, status=status.HTTP_400_BAD_REQUEST)
 		user.set_password(serializer.validated_data['new_password'])
 		user.save()
-		return Response({'detail': 'Password updated successfully.'})
+		# tokens issued before the change are now rejected: hand out fresh ones
+		return Response({'detail': 'Password updated successfully.', **issue_tokens(user)})
 
 
 class LoginView(generics.GenericAPIView):
@@ -73,9 +82,14 @@ class ForgotPasswordView(generics.GenericAPIView):
     permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
+        # every request counts, whether or not the email is known
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        idents = lockout.identities(request, email if isinstance(email, str) else None)
+        lockout.ensure_not_locked('forgot_password', idents)
+        lockout.register_attempt('forgot_password', idents, request)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(request=request)  # Le serializer envoie l'email
+        serializer.save(request=request)  # Le serializer met l'email en file (envoyé par run_worker)
         return Response(
             {"detail": "Si l'email est enregistré, un lien de réinitialisation a été envoyé."},
             status=status.HTTP_200_OK
@@ -18,14 +18,12 @@ export default function AdminLayout() {
   useEffect(() => {
     const loadUnread = async () => {
       try {
-        const url = getApiUrl('/api/core/admin/contacts/?page_size=100');
+        const url = getApiUrl('/api/core/admin/summary/');
         if (!url) return;
         const res = await fetchWithAuth(url, { cache: 'no-store' });
         if (!res.ok) return;
         const data = await res.json();
-        const list = Array.isArray(data) ? data : (data.results || []);
-        const count = list.filter((m: any) => !m.is_read).length;
-        setUnreadMessages(count);
+        setUnreadMessages(Number(data.unread_contacts) || 0);
       } catch (e) {
         // ignore
       }
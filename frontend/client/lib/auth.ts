@@ -94,7 +94,14 @@ export async function ensureFreshAccessToken(): Promise<string | null> {
 
 export async function fetchWithAuth(input: RequestInfo | URL, init: RequestInit = {}): Promise<Response> {
   let token = await ensureFreshAccessToken();
+  // One key per logical POST: a retry (including the one after a token refresh)
+  // is replayed by the server instead of creating the rows/uploads twice.
+  const idempotencyHeaders: Record<string, string> =
+    (init.method || "GET").toUpperCase() === "POST" && typeof crypto !== "undefined" && "randomUUID" in crypto
+      ? { "Idempotency-Key": crypto.randomUUID() }
+      : {};
   const headers: HeadersInit = {
+    ...idempotencyHeaders,
     ...(init.headers || {}),
     ...(token ? { Authorization: `Bearer ${token}` } : {}),
   };
@@ -103,6 +110,7 @@ export async function fetchWithAuth(input: RequestInfo | URL, init: RequestInit
     token = await refreshAccessToken();
     if (token) {
       const retryHeaders: HeadersInit = {
+        ...idempotencyHeaders,
         ...(init.headers || {}),
         Authorization: `Bearer ${token}`,
       };
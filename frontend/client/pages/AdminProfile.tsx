@@ -3,7 +3,7 @@ import { Input } from "@/components/ui/input";
 import { Button } from "@/components/ui/button";
 import AdminBack from "@/components/ui/AdminBack";
 import { Tabs, TabsList, TabsTrigger, TabsContent } from "@/components/ui/tabs";
-import { fetchWithAuth } from "@/lib/auth";
+import { fetchWithAuth, setTokens } from "@/lib/auth";
 import { getApiUrl } from "@/lib/config";
 import { useToast } from "@/hooks/use-toast";
 import { useNavigate } from "react-router-dom";
@@ -82,6 +82,9 @@ export default function AdminProfile() {
         toast({ title: "Error", description: errMsg, duration: 4000 });
         return;
       }
+      // the old tokens are revoked by the password change; keep the session with the new ones
+      const data = await res.json().catch(() => ({}));
+      if (data.access && data.refresh) setTokens(data.access, data.refresh);
       toast({ title: "Success", description: "Password changed.", duration: 2000 });
       setOldPassword("");
       setNewPassword("");
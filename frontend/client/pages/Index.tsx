@@ -229,6 +229,9 @@ export default function Index() {
   const [contactEmail, setContactEmail] = useState("");
   const [contactSubject, setContactSubject] = useState("");
   const [contactMessage, setContactMessage] = useState("");
+  // spam checks: a field humans never see, and when the form was shown
+  const [contactWebsite, setContactWebsite] = useState("");
+  const contactStartedAt = useRef(Date.now());
   const [contactLoading, setContactLoading] = useState(false);
   const [contactError, setContactError] = useState<string | null>(null);
   const [contactSuccess, setContactSuccess] = useState<string | null>(null);
@@ -545,7 +548,7 @@ export default function Index() {
       const res = await fetch(url, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ name, email, subject, message }),
+        body: JSON.stringify({ name, email, subject, message, website: contactWebsite, fill_ms: Date.now() - contactStartedAt.current }),
       });
       if (!res.ok) throw new Error(String(res.status));
       setContactSuccess("Message sent successfully.");
@@ -553,6 +556,7 @@ export default function Index() {
       setContactEmail("");
       setContactSubject("");
       setContactMessage("");
+      contactStartedAt.current = Date.now();
     } catch (err) {
       setContactError("Failed to send message. Please try again.");
     } finally {
@@ -1646,6 +1650,21 @@ export default function Index() {
                   )}
                 </div>
 
+                {/* honeypot: hidden from people, filled in by naive bots */}
+                <div aria-hidden="true" style={{ position: "absolute", left: "-10000px", width: 1, height: 1, overflow: "hidden" }}>
+                  <label>
+                    Website
+                    <input
+                      type="text"
+                      name="website"
+                      tabIndex={-1}
+                      autoComplete="off"
+                      value={contactWebsite}
+                      onChange={(e) => setContactWebsite(e.target.value)}
+                    />
+                  </label>
+                </div>
+
                 {contactError && (
                   <div className="text-red-200 bg-red-500/20 border border-red-400/50 rounded-xl px-4 py-2">
                     {contactError}